@@ -0,0 +1,27 @@
+# apps/attendance/management/commands/detectar_alertas_asistencia.py
+
+from django.core.management.base import BaseCommand
+
+from apps.attendance.services import DetectorAusencias
+
+
+class Command(BaseCommand):
+    help = 'Procesa los cambios de asistencia pendientes y sincroniza las alertas de ausencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--racha', type=int, default=3, help='Ausencias consecutivas que disparan una alerta')
+        parser.add_argument('--ventana', type=int, default=10, help='Cantidad de clases de la ventana deslizante')
+        parser.add_argument('--tasa', type=float, default=30, help='Porcentaje de ausencias en la ventana que dispara una alerta')
+
+    def handle(self, *args, **options):
+        detector = DetectorAusencias(
+            racha_minima=options['racha'],
+            ventana=options['ventana'],
+            tasa_maxima=options['tasa']
+        )
+        resultado = detector.ejecutar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Procesados {resultado['procesados']} registros de {resultado['claves']} estudiantes por materia, "
+            f"{resultado['alertas']} alertas generadas y {resultado['descartadas']} descartadas. "
+            f"Último cambio: {resultado['ultimo_cambio']}"
+        ))
@@ -0,0 +1,33 @@
+# apps/attendance/management/commands/reconstruir_resumen_asistencia.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.attendance.models import Asistencia
+from apps.attendance.services import ResumenAsistencia, LineaTiempo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes mensuales y líneas de tiempo de asistencia a partir de los registros originales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', help='Código de curso a reconstruir')
+        parser.add_argument('--materia', help='Código de materia a reconstruir')
+        parser.add_argument('--estudiante', help='CI de estudiante a reconstruir')
+
+    def handle(self, *args, **options):
+        filtro = Q()
+        if options['curso']:
+            filtro &= Q(codigo_curso=options['curso'])
+        if options['materia']:
+            filtro &= Q(codigo_materia=options['materia'])
+        if options['estudiante']:
+            filtro &= Q(ci_estudiante=options['estudiante'])
+
+        total = ResumenAsistencia.reconstruir(filtro)
+        self.stdout.write(self.style.SUCCESS(f'Se generaron {total} resúmenes de asistencia'))
+
+        claves = Asistencia.objects.filter(filtro)._claves_resumen()
+        LineaTiempo.recalcular(claves)
+        gestiones = {(ci, curso, materia, mes.year) for ci, curso, materia, mes in claves}
+        self.stdout.write(self.style.SUCCESS(f'Se regeneraron {len(gestiones)} líneas de tiempo de asistencia'))
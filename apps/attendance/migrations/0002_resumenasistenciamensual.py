@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-19 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+        ('courses', '__first__'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAsistenciaMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('estado', models.CharField(choices=[('presente', 'Presente'), ('ausente', 'Ausente'), ('tardanza', 'Tardanza'), ('justificado', 'Justificado')], max_length=12)),
+                ('total', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ci_estudiante', models.ForeignKey(db_column='ci_estudiante', on_delete=django.db.models.deletion.CASCADE, to='students.estudiante')),
+                ('codigo_curso', models.ForeignKey(db_column='codigo_curso', on_delete=django.db.models.deletion.CASCADE, to='courses.curso')),
+                ('codigo_materia', models.ForeignKey(db_column='codigo_materia', on_delete=django.db.models.deletion.CASCADE, to='subjects.materia')),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Asistencia',
+                'verbose_name_plural': 'Resúmenes Mensuales de Asistencia',
+                'db_table': 'resumen_asistencia_mensual',
+                'indexes': [models.Index(fields=['codigo_curso', 'codigo_materia', 'mes'], name='resumen_asist_curso_mes_idx')],
+                'unique_together': {('ci_estudiante', 'codigo_curso', 'codigo_materia', 'mes', 'estado')},
+            },
+        ),
+    ]
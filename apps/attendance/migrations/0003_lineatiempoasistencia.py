@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 04:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_resumenasistenciamensual'),
+        ('courses', '__first__'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineaTiempoAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gestion', models.SmallIntegerField()),
+                ('registrados', models.BinaryField()),
+                ('estados', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ci_estudiante', models.ForeignKey(db_column='ci_estudiante', on_delete=django.db.models.deletion.CASCADE, to='students.estudiante')),
+                ('codigo_curso', models.ForeignKey(db_column='codigo_curso', on_delete=django.db.models.deletion.CASCADE, to='courses.curso')),
+                ('codigo_materia', models.ForeignKey(db_column='codigo_materia', on_delete=django.db.models.deletion.CASCADE, to='subjects.materia')),
+            ],
+            options={
+                'verbose_name': 'Línea de Tiempo de Asistencia',
+                'verbose_name_plural': 'Líneas de Tiempo de Asistencia',
+                'db_table': 'linea_tiempo_asistencia',
+                'unique_together': {('ci_estudiante', 'codigo_curso', 'codigo_materia', 'gestion')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_lineatiempoasistencia'),
+        ('courses', '__first__'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['fecha', 'codigo_curso', 'codigo_materia'], name='asistencia_fecha_curso_idx'),
+        ),
+    ]
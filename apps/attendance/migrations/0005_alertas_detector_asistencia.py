@@ -0,0 +1,72 @@
+# Generated by Django 5.2.1 on 2026-10-19 04:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_asistencia_fecha_curso_idx'),
+        ('courses', '__first__'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaProcesamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Procesamiento',
+                'verbose_name_plural': 'Marcas de Procesamiento',
+                'db_table': 'marca_procesamiento',
+            },
+        ),
+        migrations.CreateModel(
+            name='AlertaAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RACHA_AUSENCIAS', 'Ausencias consecutivas'), ('TASA_AUSENCIAS', 'Tasa de ausencias elevada')], max_length=20)),
+                ('fecha', models.DateField(help_text='Fecha de la clase que disparó la alerta')),
+                ('valor', models.DecimalField(decimal_places=2, help_text='Ausencias consecutivas o tasa de ausencias (%)', max_digits=6)),
+                ('detalle', models.CharField(max_length=200)),
+                ('atendida', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ci_estudiante', models.ForeignKey(db_column='ci_estudiante', on_delete=django.db.models.deletion.CASCADE, to='students.estudiante')),
+                ('codigo_curso', models.ForeignKey(db_column='codigo_curso', on_delete=django.db.models.deletion.CASCADE, to='courses.curso')),
+                ('codigo_materia', models.ForeignKey(db_column='codigo_materia', on_delete=django.db.models.deletion.CASCADE, to='subjects.materia')),
+            ],
+            options={
+                'verbose_name': 'Alerta de Asistencia',
+                'verbose_name_plural': 'Alertas de Asistencia',
+                'db_table': 'alerta_asistencia',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadoDetectorAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_fecha', models.DateField()),
+                ('racha_actual', models.IntegerField(default=0)),
+                ('ventana', models.CharField(default='', help_text='Últimos estados como iniciales (P/A/T/J)', max_length=100)),
+                ('alerta_tasa_activa', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ci_estudiante', models.ForeignKey(db_column='ci_estudiante', on_delete=django.db.models.deletion.CASCADE, to='students.estudiante')),
+                ('codigo_curso', models.ForeignKey(db_column='codigo_curso', on_delete=django.db.models.deletion.CASCADE, to='courses.curso')),
+                ('codigo_materia', models.ForeignKey(db_column='codigo_materia', on_delete=django.db.models.deletion.CASCADE, to='subjects.materia')),
+            ],
+            options={
+                'verbose_name': 'Estado del Detector de Asistencia',
+                'verbose_name_plural': 'Estados del Detector de Asistencia',
+                'db_table': 'estado_detector_asistencia',
+                'unique_together': {('ci_estudiante', 'codigo_curso', 'codigo_materia')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_alertas_detector_asistencia'),
+        ('courses', '__first__'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['-fecha', '-id'], name='asistencia_fecha_id_idx'),
+        ),
+    ]
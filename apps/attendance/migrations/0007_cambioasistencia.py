@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def registrar_pendientes(apps, schema_editor):
+    """
+    La marca del detector pasa a contar ids de CambioAsistencia: los registros
+    que quedaron sin procesar con la marca anterior se registran como cambios
+    """
+    Asistencia = apps.get_model('attendance', 'Asistencia')
+    CambioAsistencia = apps.get_model('attendance', 'CambioAsistencia')
+    MarcaProcesamiento = apps.get_model('attendance', 'MarcaProcesamiento')
+
+    marca = MarcaProcesamiento.objects.filter(nombre='detector_ausencias').first()
+    if marca is None:
+        return
+    claves = Asistencia.objects.filter(id__gt=marca.ultimo_id).order_by().values_list(
+        'ci_estudiante', 'codigo_curso', 'codigo_materia'
+    ).distinct()
+    CambioAsistencia.objects.bulk_create([
+        CambioAsistencia(ci_estudiante_id=ci, codigo_curso_id=curso, codigo_materia_id=materia)
+        for ci, curso, materia in claves.iterator()
+    ], batch_size=1000)
+    marca.ultimo_id = 0
+    marca.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_asistencia_fecha_id_idx'),
+        ('courses', '__first__'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ci_estudiante', models.ForeignKey(db_column='ci_estudiante', on_delete=django.db.models.deletion.CASCADE, to='students.estudiante')),
+                ('codigo_curso', models.ForeignKey(db_column='codigo_curso', on_delete=django.db.models.deletion.CASCADE, to='courses.curso')),
+                ('codigo_materia', models.ForeignKey(db_column='codigo_materia', on_delete=django.db.models.deletion.CASCADE, to='subjects.materia')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Asistencia',
+                'verbose_name_plural': 'Cambios de Asistencia',
+                'db_table': 'cambio_asistencia',
+            },
+        ),
+        migrations.RunPython(registrar_pendientes, migrations.RunPython.noop),
+    ]
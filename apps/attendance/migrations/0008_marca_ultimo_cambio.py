@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_cambioasistencia'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='marcaprocesamiento',
+            old_name='ultimo_id',
+            new_name='ultimo_cambio',
+        ),
+        migrations.AlterField(
+            model_name='marcaprocesamiento',
+            name='ultimo_cambio',
+            field=models.BigIntegerField(default=0, help_text='Id del último CambioAsistencia procesado'),
+        ),
+    ]
@@ -1,6 +1,54 @@
 # apps/attendance/models.py
 
-from django.db import models
+from django.db import models, transaction
+from django.utils.dateparse import parse_date
+
+# Campos de Asistencia que afectan los resúmenes mensuales y líneas de tiempo
+CAMPOS_RESUMEN = {'estado', 'is_active', 'fecha', 'ci_estudiante', 'codigo_curso', 'codigo_materia'}
+CAMPOS_CLAVE = {'fecha', 'ci_estudiante', 'codigo_curso', 'codigo_materia'}
+
+class AsistenciaQuerySet(models.QuerySet):
+    """QuerySet que mantiene actualizados los datos derivados en operaciones masivas"""
+    
+    def _claves_resumen(self):
+        from django.db.models.functions import TruncMonth
+        return set(
+            self.order_by().annotate(mes=TruncMonth('fecha')).values_list(
+                'ci_estudiante', 'codigo_curso', 'codigo_materia', 'mes'
+            ).distinct()
+        )
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        from .services import sincronizar_derivados
+        with transaction.atomic(using=self.db):
+            creados = super().bulk_create(objs, *args, **kwargs)
+            sincronizar_derivados(obj.clave_resumen for obj in creados)
+        return creados
+    
+    def update(self, **kwargs):
+        from .services import sincronizar_derivados
+        if not CAMPOS_RESUMEN.intersection(kwargs):
+            return super().update(**kwargs)
+        
+        with transaction.atomic(using=self.db):
+            claves = self._claves_resumen()
+            if CAMPOS_CLAVE.intersection(kwargs):
+                # Si cambia la clave también se recalculan los meses de destino
+                pks = list(self.values_list('pk', flat=True))
+                filas = super().update(**kwargs)
+                claves |= self.model.objects.filter(pk__in=pks)._claves_resumen()
+            else:
+                filas = super().update(**kwargs)
+            sincronizar_derivados(claves)
+        return filas
+    
+    def delete(self):
+        from .services import sincronizar_derivados
+        with transaction.atomic(using=self.db):
+            claves = self._claves_resumen()
+            resultado = super().delete()
+            sincronizar_derivados(claves)
+        return resultado
 
 class Asistencia(models.Model):
     ESTADO_CHOICES = [
@@ -20,15 +68,51 @@ class Asistencia(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    objects = AsistenciaQuerySet.as_manager()
+    
     class Meta:
         db_table = 'asistencia'
         verbose_name = 'Asistencia'
         verbose_name_plural = 'Asistencias'
         unique_together = ('codigo_curso', 'codigo_materia', 'ci_estudiante', 'fecha')
+        indexes = [
+            models.Index(fields=['fecha', 'codigo_curso', 'codigo_materia'], name='asistencia_fecha_curso_idx'),
+            models.Index(fields=['-fecha', '-id'], name='asistencia_fecha_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.ci_estudiante.nombre_completo} - {self.fecha} ({self.get_estado_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Recordar la clave original para recalcular el resumen anterior si cambia
+        if not CAMPOS_RESUMEN.intersection(instancia.get_deferred_fields()):
+            instancia._clave_resumen_original = instancia.clave_resumen
+        return instancia
+    
+    @property
+    def clave_resumen(self):
+        """Clave (estudiante, curso, materia, mes) del resumen mensual afectado"""
+        fecha = parse_date(self.fecha) if isinstance(self.fecha, str) else self.fecha
+        return (self.ci_estudiante_id, self.codigo_curso_id, self.codigo_materia_id, fecha.replace(day=1))
+    
+    def save(self, *args, **kwargs):
+        from .services import sincronizar_derivados
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            claves = {self.clave_resumen, getattr(self, '_clave_resumen_original', None)} - {None}
+            sincronizar_derivados(claves)
+        self._clave_resumen_original = self.clave_resumen
+    
+    def delete(self, *args, **kwargs):
+        from .services import sincronizar_derivados
+        with transaction.atomic():
+            clave = self.clave_resumen
+            resultado = super().delete(*args, **kwargs)
+            sincronizar_derivados([clave])
+        return resultado
+    
     @property
     def asistio_efectivamente(self):
         """Devuelve True si el estudiante asistió (presente o tardanza)"""
@@ -37,62 +121,177 @@ class Asistencia(models.Model):
     @classmethod
     def calcular_porcentaje_asistencia(cls, estudiante, materia, curso, fecha_inicio=None, fecha_fin=None):
         """Calcula el porcentaje de asistencia de un estudiante en una materia"""
-        queryset = cls.objects.filter(
-            ci_estudiante=estudiante,
-            codigo_materia=materia,
-            codigo_curso=curso,
-            is_active=True
-        )
-        
-        if fecha_inicio:
-            queryset = queryset.filter(fecha__gte=fecha_inicio)
-        if fecha_fin:
-            queryset = queryset.filter(fecha__lte=fecha_fin)
-            
-        total_clases = queryset.count()
-        if total_clases == 0:
-            return 0
-            
         # Considerar como asistencia efectiva: presente y tardanza
-        asistencias_efectivas = queryset.filter(estado__in=['presente', 'tardanza']).count()
-        return (asistencias_efectivas / total_clases) * 100
+        return cls.obtener_estadisticas_detalladas(
+            estudiante, materia, curso, fecha_inicio, fecha_fin
+        )['porcentaje_asistencia']
     
     @classmethod
     def obtener_estadisticas_detalladas(cls, estudiante, materia, curso, fecha_inicio=None, fecha_fin=None):
         """Obtiene estadísticas detalladas de asistencia por estado"""
-        queryset = cls.objects.filter(
-            ci_estudiante=estudiante,
-            codigo_materia=materia,
-            codigo_curso=curso,
-            is_active=True
+        estadisticas = cls.obtener_estadisticas_lote(
+            [estudiante], [materia], curso, fecha_inicio, fecha_fin
         )
+        return next(iter(estadisticas.values()))
+    
+    @classmethod
+    def obtener_estadisticas_lote(cls, estudiantes, materias, curso=None, fecha_inicio=None, fecha_fin=None):
+        """
+        Estadísticas de asistencia para varios estudiantes y materias a la vez.
+        Acepta instancias o claves primarias y retorna un dict
+        {(ci_estudiante, codigo_materia): {total_clases, presente, ausente,
+        tardanza, justificado, porcentaje_asistencia}} con todas las
+        combinaciones solicitadas (en cero si no tienen registros).
+        """
+        from .services import ResumenAsistencia
         
-        if fecha_inicio:
-            queryset = queryset.filter(fecha__gte=fecha_inicio)
-        if fecha_fin:
-            queryset = queryset.filter(fecha__lte=fecha_fin)
+        cis = [getattr(estudiante, 'pk', estudiante) for estudiante in estudiantes]
+        codigos = [getattr(materia, 'pk', materia) for materia in materias]
         
-        total = queryset.count()
-        if total == 0:
-            return {
-                'total_clases': 0,
-                'presente': 0,
-                'ausente': 0,
-                'tardanza': 0,
-                'justificado': 0,
-                'porcentaje_asistencia': 0
-            }
+        filtro = models.Q(ci_estudiante__in=cis, codigo_materia__in=codigos)
+        if curso is not None:
+            filtro &= models.Q(codigo_curso=curso)
         
-        stats = {
-            'total_clases': total,
-            'presente': queryset.filter(estado='presente').count(),
-            'ausente': queryset.filter(estado='ausente').count(),
-            'tardanza': queryset.filter(estado='tardanza').count(),
-            'justificado': queryset.filter(estado='justificado').count(),
-        }
+        conteos = ResumenAsistencia.contar_estados(
+            filtro, fecha_inicio, fecha_fin,
+            agrupar_por=('ci_estudiante', 'codigo_materia')
+        )
+        
+        estadisticas = {}
+        for ci in cis:
+            for codigo in codigos:
+                stats = ResumenAsistencia.con_porcentaje(conteos.get((ci, codigo), {}))
+                estadisticas[(ci, codigo)] = {
+                    'total_clases': stats['total_clases'],
+                    'presente': stats['presente'],
+                    'ausente': stats['ausente'],
+                    'tardanza': stats['tardanza'],
+                    'justificado': stats['justificado'],
+                    'porcentaje_asistencia': stats['porcentaje_asistencia']
+                }
+        return estadisticas
+
+class ResumenAsistenciaMensual(models.Model):
+    """Conteo de asistencias por estudiante, curso, materia, mes y estado"""
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    mes = models.DateField(help_text="Primer día del mes")
+    estado = models.CharField(max_length=12, choices=Asistencia.ESTADO_CHOICES)
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'resumen_asistencia_mensual'
+        verbose_name = 'Resumen Mensual de Asistencia'
+        verbose_name_plural = 'Resúmenes Mensuales de Asistencia'
+        unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia', 'mes', 'estado')
+        indexes = [
+            models.Index(fields=['codigo_curso', 'codigo_materia', 'mes'], name='resumen_asist_curso_mes_idx'),
+        ]
         
-        # Calcular porcentaje considerando presente y tardanza como asistencia
-        asistencias_efectivas = stats['presente'] + stats['tardanza']
-        stats['porcentaje_asistencia'] = (asistencias_efectivas / total) * 100
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.codigo_materia_id} {self.mes:%Y-%m} ({self.estado}: {self.total})"
+
+
+class LineaTiempoAsistencia(models.Model):
+    """
+    Asistencia anual codificada de un estudiante en una materia.
+    Cada día del año ocupa 1 bit en `registrados` (hubo clase) y
+    2 bits en `estados` (código del estado, ver CODIGOS_ESTADO).
+    """
+    CODIGOS_ESTADO = {'presente': 0, 'ausente': 1, 'tardanza': 2, 'justificado': 3}
+    
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    gestion = models.SmallIntegerField()
+    registrados = models.BinaryField()
+    estados = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'linea_tiempo_asistencia'
+        verbose_name = 'Línea de Tiempo de Asistencia'
+        verbose_name_plural = 'Líneas de Tiempo de Asistencia'
+        unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia', 'gestion')
         
-        return stats
\ No newline at end of file
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.codigo_materia_id} ({self.gestion})"
+
+class AlertaAsistencia(models.Model):
+    TIPOS_CHOICES = [
+        ('RACHA_AUSENCIAS', 'Ausencias consecutivas'),
+        ('TASA_AUSENCIAS', 'Tasa de ausencias elevada'),
+    ]
+    
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    tipo = models.CharField(max_length=20, choices=TIPOS_CHOICES)
+    fecha = models.DateField(help_text="Fecha de la clase que disparó la alerta")
+    valor = models.DecimalField(max_digits=6, decimal_places=2, help_text="Ausencias consecutivas o tasa de ausencias (%)")
+    detalle = models.CharField(max_length=200)
+    atendida = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'alerta_asistencia'
+        verbose_name = 'Alerta de Asistencia'
+        verbose_name_plural = 'Alertas de Asistencia'
+        
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.get_tipo_display()} ({self.fecha})"
+
+class EstadoDetectorAsistencia(models.Model):
+    """Estado del detector de ausencias por estudiante, curso y materia"""
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    ultima_fecha = models.DateField()
+    racha_actual = models.IntegerField(default=0)
+    ventana = models.CharField(max_length=100, default='', help_text="Últimos estados como iniciales (P/A/T/J)")
+    alerta_tasa_activa = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'estado_detector_asistencia'
+        verbose_name = 'Estado del Detector de Asistencia'
+        verbose_name_plural = 'Estados del Detector de Asistencia'
+        unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia')
+        
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.codigo_materia_id} (racha: {self.racha_actual})"
+
+class CambioAsistencia(models.Model):
+    """
+    Estudiante, curso y materia con registros de asistencia creados,
+    modificados o eliminados, pendientes de revisar por el detector de ausencias
+    """
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'cambio_asistencia'
+        verbose_name = 'Cambio de Asistencia'
+        verbose_name_plural = 'Cambios de Asistencia'
+        
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.codigo_materia_id} ({self.created_at:%Y-%m-%d %H:%M})"
+
+class MarcaProcesamiento(models.Model):
+    """Último CambioAsistencia procesado por un proceso incremental (y bloqueo entre ejecuciones)"""
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_cambio = models.BigIntegerField(default=0, help_text="Id del último CambioAsistencia procesado")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'marca_procesamiento'
+        verbose_name = 'Marca de Procesamiento'
+        verbose_name_plural = 'Marcas de Procesamiento'
+        
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_cambio}"
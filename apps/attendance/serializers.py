@@ -1,7 +1,7 @@
 # apps/attendance/serializers.py
 
 from rest_framework import serializers
-from .models import Asistencia
+from .models import Asistencia, AlertaAsistencia
 
 class AsistenciaSerializer(serializers.ModelSerializer):
     estudiante_nombre = serializers.CharField(source='ci_estudiante.nombre_completo', read_only=True)
@@ -60,6 +60,44 @@ class AsistenciaMasivaSerializer(serializers.Serializer):
         
         return value
 
+class ExcepcionAsistenciaSerializer(serializers.Serializer):
+    """Estudiante que no estuvo presente en la clase"""
+    ci_estudiante = serializers.CharField(max_length=20)
+    estado = serializers.ChoiceField(choices=['ausente', 'tardanza', 'justificado'])
+    observacion = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class AsistenciaSesionSerializer(serializers.Serializer):
+    """Registro de una clase completa: todos presentes salvo las excepciones"""
+    codigo_curso = serializers.CharField()
+    codigo_materia = serializers.CharField()
+    fecha = serializers.DateField()
+    excepciones = ExcepcionAsistenciaSerializer(many=True, required=False, default=list)
+    
+    def validate_fecha(self, value):
+        from datetime import date
+        if value > date.today():
+            raise serializers.ValidationError("No se puede registrar asistencia para fechas futuras")
+        return value
+    
+    def validate_excepciones(self, value):
+        cis = [excepcion['ci_estudiante'] for excepcion in value]
+        if len(cis) != len(set(cis)):
+            raise serializers.ValidationError("Un estudiante no puede aparecer más de una vez en las excepciones")
+        return value
+
+class JustificacionRangoSerializer(serializers.Serializer):
+    """Justificación de todas las ausencias de un estudiante en un rango de fechas"""
+    ci_estudiante = serializers.CharField(max_length=20)
+    fecha_inicio = serializers.DateField()
+    fecha_fin = serializers.DateField()
+    materias = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    observacion = serializers.CharField(max_length=200)
+    
+    def validate(self, attrs):
+        if attrs['fecha_inicio'] > attrs['fecha_fin']:
+            raise serializers.ValidationError("La fecha de inicio no puede ser posterior a la fecha de fin")
+        return attrs
+
 class EstadisticasAsistenciaSerializer(serializers.Serializer):
     estudiante = serializers.DictField()
     periodo = serializers.DictField()
@@ -74,4 +112,15 @@ class EstadisticasDetalladasSerializer(serializers.Serializer):
     ausente = serializers.IntegerField()
     tardanza = serializers.IntegerField()
     justificado = serializers.IntegerField()
-    porcentaje_asistencia = serializers.DecimalField(max_digits=5, decimal_places=2)
\ No newline at end of file
+    porcentaje_asistencia = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+class AlertaAsistenciaSerializer(serializers.ModelSerializer):
+    estudiante_nombre = serializers.CharField(source='ci_estudiante.nombre_completo', read_only=True)
+    materia_nombre = serializers.CharField(source='codigo_materia.nombre', read_only=True)
+    curso_nombre = serializers.CharField(source='codigo_curso.nombre', read_only=True)
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+    
+    class Meta:
+        model = AlertaAsistencia
+        fields = '__all__'
+        read_only_fields = ['created_at', 'updated_at']
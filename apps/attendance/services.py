@@ -0,0 +1,495 @@
+# apps/attendance/services.py
+
+import calendar
+import operator
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import reduce
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    Asistencia, ResumenAsistenciaMensual, LineaTiempoAsistencia,
+    AlertaAsistencia, EstadoDetectorAsistencia, MarcaProcesamiento, CambioAsistencia
+)
+
+ESTADOS = [choice[0] for choice in Asistencia.ESTADO_CHOICES]
+
+
+def _fin_de_mes(mes):
+    return mes.replace(day=calendar.monthrange(mes.year, mes.month)[1])
+
+
+def _a_fecha(valor):
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor))
+
+
+def sincronizar_derivados(claves):
+    """
+    Actualiza resúmenes mensuales y líneas de tiempo para las claves
+    (estudiante, curso, materia, mes) y las deja pendientes para el detector de ausencias
+    """
+    claves = set(claves)
+    if not claves:
+        return
+    ResumenAsistencia.recalcular(claves)
+    LineaTiempo.recalcular(claves)
+    CambioAsistencia.objects.bulk_create([
+        CambioAsistencia(
+            ci_estudiante_id=ci_estudiante,
+            codigo_curso_id=codigo_curso,
+            codigo_materia_id=codigo_materia
+        ) for ci_estudiante, codigo_curso, codigo_materia in {clave[:3] for clave in claves}
+    ])
+
+
+class ResumenAsistencia:
+    """Servicio para mantener y consultar los resúmenes mensuales de asistencia"""
+
+    @staticmethod
+    def recalcular(claves):
+        """
+        Recalcula los resúmenes de las claves (estudiante, curso, materia, mes)
+        a partir de los registros de asistencia de cada mes afectado.
+        """
+        agrupadas = defaultdict(set)
+        for ci_estudiante, codigo_curso, codigo_materia, mes in set(claves):
+            agrupadas[(codigo_curso, codigo_materia, mes)].add(ci_estudiante)
+
+        with transaction.atomic():
+            for (codigo_curso, codigo_materia, mes), estudiantes in agrupadas.items():
+                conteos = Asistencia.objects.filter(
+                    codigo_curso=codigo_curso,
+                    codigo_materia=codigo_materia,
+                    ci_estudiante__in=estudiantes,
+                    fecha__range=(mes, _fin_de_mes(mes)),
+                    is_active=True
+                ).values('ci_estudiante', 'estado').annotate(total=Count('id'))
+                totales = {(fila['ci_estudiante'], fila['estado']): fila['total'] for fila in conteos}
+
+                # Upsert de todas las combinaciones (en cero las que ya no tienen
+                # registros) para que recálculos concurrentes de la misma clave
+                # no choquen con la restricción única
+                ResumenAsistenciaMensual.objects.bulk_create(
+                    [
+                        ResumenAsistenciaMensual(
+                            ci_estudiante_id=ci_estudiante,
+                            codigo_curso_id=codigo_curso,
+                            codigo_materia_id=codigo_materia,
+                            mes=mes,
+                            estado=estado,
+                            total=totales.get((ci_estudiante, estado), 0)
+                        ) for ci_estudiante in estudiantes for estado in ESTADOS
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['ci_estudiante', 'codigo_curso', 'codigo_materia', 'mes', 'estado'],
+                    update_fields=['total', 'updated_at']
+                )
+
+    @staticmethod
+    def reconstruir(filtro=None):
+        """Reconstruye todos los resúmenes que coinciden con el filtro (backfill)"""
+        filtro = filtro or Q()
+        conteos = Asistencia.objects.filter(filtro, is_active=True).order_by().values(
+            'ci_estudiante', 'codigo_curso', 'codigo_materia', 'fecha__year', 'fecha__month', 'estado'
+        ).annotate(total=Count('id'))
+
+        with transaction.atomic():
+            ResumenAsistenciaMensual.objects.filter(filtro).delete()
+            resumenes = ResumenAsistenciaMensual.objects.bulk_create([
+                ResumenAsistenciaMensual(
+                    ci_estudiante_id=fila['ci_estudiante'],
+                    codigo_curso_id=fila['codigo_curso'],
+                    codigo_materia_id=fila['codigo_materia'],
+                    mes=date(fila['fecha__year'], fila['fecha__month'], 1),
+                    estado=fila['estado'],
+                    total=fila['total']
+                ) for fila in conteos.iterator()
+            ], batch_size=1000)
+        return len(resumenes)
+
+    @staticmethod
+    def contar_estados(filtro=None, fecha_inicio=None, fecha_fin=None, agrupar_por=()):
+        """
+        Cuenta asistencias por estado agrupadas por los campos indicados.
+        Los meses completos del rango se leen de los resúmenes y solo los
+        meses parciales de los extremos se leen de los registros originales.
+
+        Cada fuente se resuelve con una sola consulta de agregados condicionales.
+
+        Retorna un dict {clave_agrupacion: {'presente': n, 'ausente': n, ...}}
+        donde la clave es una tupla con los valores de `agrupar_por`.
+        """
+        filtro = filtro or Q()
+        fecha_inicio = _a_fecha(fecha_inicio)
+        fecha_fin = _a_fecha(fecha_fin)
+        campos = list(agrupar_por)
+
+        # Rango de meses completos cubierto por los resúmenes
+        primer_mes = None
+        if fecha_inicio:
+            primer_mes = fecha_inicio if fecha_inicio.day == 1 else _fin_de_mes(fecha_inicio) + timedelta(days=1)
+        ultimo_mes = None
+        if fecha_fin:
+            ultimo_mes = fecha_fin.replace(day=1) if fecha_fin == _fin_de_mes(fecha_fin) else (
+                fecha_fin.replace(day=1) - timedelta(days=1)
+            ).replace(day=1)
+
+        hay_meses_completos = not (primer_mes and ultimo_mes and primer_mes > ultimo_mes)
+        resultado = defaultdict(lambda: dict.fromkeys(ESTADOS, 0))
+        rangos_originales = []
+
+        if hay_meses_completos:
+            resumenes = ResumenAsistenciaMensual.objects.filter(filtro)
+            if primer_mes:
+                resumenes = resumenes.filter(mes__gte=primer_mes)
+            if ultimo_mes:
+                resumenes = resumenes.filter(mes__lte=ultimo_mes)
+            ResumenAsistencia._acumular(resultado, resumenes, campos, {
+                estado: Sum('total', filter=Q(estado=estado)) for estado in ESTADOS
+            })
+
+            # Solo los meses parciales de los extremos se leen de los registros originales
+            if fecha_inicio and fecha_inicio < primer_mes:
+                rangos_originales.append(Q(fecha__gte=fecha_inicio, fecha__lt=primer_mes))
+            if fecha_fin and fecha_fin > _fin_de_mes(ultimo_mes):
+                rangos_originales.append(Q(fecha__gt=_fin_de_mes(ultimo_mes), fecha__lte=fecha_fin))
+        else:
+            rangos_originales.append(Q(fecha__gte=fecha_inicio, fecha__lte=fecha_fin))
+
+        if rangos_originales:
+            registros = Asistencia.objects.filter(
+                filtro, reduce(operator.or_, rangos_originales), is_active=True
+            )
+            ResumenAsistencia._acumular(resultado, registros, campos, {
+                estado: Count('id', filter=Q(estado=estado)) for estado in ESTADOS
+            })
+
+        return dict(resultado)
+
+    @staticmethod
+    def _acumular(resultado, queryset, campos, agregados):
+        """Suma en `resultado` los conteos por estado de una consulta con agregados condicionales"""
+        if campos:
+            filas = queryset.values(*campos).annotate(**agregados).order_by()
+        else:
+            filas = [queryset.aggregate(**agregados)]
+        for fila in filas:
+            conteos = resultado[tuple(fila[campo] for campo in campos)]
+            for estado in ESTADOS:
+                conteos[estado] += fila[estado] or 0
+
+    @staticmethod
+    def con_porcentaje(conteos):
+        """Agrega total_clases y porcentaje_asistencia (presente + tardanza) a un dict de conteos"""
+        stats = dict.fromkeys(ESTADOS, 0)
+        stats.update(conteos)
+        total = sum(stats[estado] for estado in ESTADOS)
+        stats['total_clases'] = total
+        stats['porcentaje_asistencia'] = (
+            (stats['presente'] + stats['tardanza']) / total * 100 if total > 0 else 0
+        )
+        return stats
+
+
+class LineaTiempo:
+    """Servicio para codificar y analizar la línea de tiempo anual de asistencia"""
+
+    CODIGOS = LineaTiempoAsistencia.CODIGOS_ESTADO
+    ESTADOS_POR_CODIGO = {codigo: estado for estado, codigo in CODIGOS.items()}
+    SIN_REGISTRO = -1
+
+    @staticmethod
+    def _dias_del_anio(gestion):
+        return 366 if calendar.isleap(gestion) else 365
+
+    @classmethod
+    def codificar(cls, gestion, registros):
+        """Codifica pares (fecha, estado) en los campos (registrados, estados)"""
+        dias = cls._dias_del_anio(gestion)
+        codigos = np.zeros(dias + (-dias) % 4, dtype=np.uint8)
+        registrados = np.zeros(dias, dtype=np.uint8)
+        inicio = date(gestion, 1, 1)
+        for fecha, estado in registros:
+            indice = (fecha - inicio).days
+            codigos[indice] = cls.CODIGOS[estado]
+            registrados[indice] = 1
+
+        estados = codigos[0::4] | (codigos[1::4] << 2) | (codigos[2::4] << 4) | (codigos[3::4] << 6)
+        return (
+            np.packbits(registrados, bitorder='little').tobytes(),
+            estados.astype(np.uint8).tobytes()
+        )
+
+    @classmethod
+    def decodificar(cls, linea):
+        """Arreglo con un código por día del año (SIN_REGISTRO si no hubo clase)"""
+        dias = cls._dias_del_anio(linea.gestion)
+        registrados = np.unpackbits(
+            np.frombuffer(bytes(linea.registrados), dtype=np.uint8), bitorder='little'
+        )[:dias].astype(bool)
+        empaquetados = np.frombuffer(bytes(linea.estados), dtype=np.uint8)
+        codigos = np.stack(
+            [(empaquetados >> desplazamiento) & 3 for desplazamiento in (0, 2, 4, 6)], axis=1
+        ).ravel()[:dias].astype(np.int8)
+        codigos[~registrados] = cls.SIN_REGISTRO
+        return codigos
+
+    @classmethod
+    def recalcular(cls, claves):
+        """Regenera las líneas de tiempo de los años afectados por las claves (estudiante, curso, materia, mes)"""
+        agrupadas = defaultdict(set)
+        for ci_estudiante, codigo_curso, codigo_materia, mes in set(claves):
+            agrupadas[(codigo_curso, codigo_materia, mes.year)].add(ci_estudiante)
+
+        with transaction.atomic():
+            for (codigo_curso, codigo_materia, gestion), estudiantes in agrupadas.items():
+                registros = defaultdict(list)
+                for ci_estudiante, fecha, estado in Asistencia.objects.filter(
+                    codigo_curso=codigo_curso,
+                    codigo_materia=codigo_materia,
+                    ci_estudiante__in=estudiantes,
+                    fecha__year=gestion,
+                    is_active=True
+                ).values_list('ci_estudiante', 'fecha', 'estado'):
+                    registros[ci_estudiante].append((fecha, estado))
+
+                lineas = []
+                for ci_estudiante in estudiantes:
+                    registrados, estados = cls.codificar(gestion, registros[ci_estudiante])
+                    lineas.append(LineaTiempoAsistencia(
+                        ci_estudiante_id=ci_estudiante,
+                        codigo_curso_id=codigo_curso,
+                        codigo_materia_id=codigo_materia,
+                        gestion=gestion,
+                        registrados=registrados,
+                        estados=estados
+                    ))
+                LineaTiempoAsistencia.objects.bulk_create(
+                    lineas,
+                    update_conflicts=True,
+                    unique_fields=['ci_estudiante', 'codigo_curso', 'codigo_materia', 'gestion'],
+                    update_fields=['registrados', 'estados', 'updated_at']
+                )
+
+    @classmethod
+    def _rango(cls, linea, codigos, fecha_inicio=None, fecha_fin=None):
+        inicio = date(linea.gestion, 1, 1)
+        desde = (_a_fecha(fecha_inicio) - inicio).days if fecha_inicio else 0
+        hasta = (_a_fecha(fecha_fin) - inicio).days + 1 if fecha_fin else len(codigos)
+        return codigos[max(desde, 0):max(hasta, 0)]
+
+    @classmethod
+    def porcentaje_rango(cls, linea, fecha_inicio=None, fecha_fin=None):
+        """Porcentaje de asistencia efectiva (presente + tardanza) en un rango de fechas"""
+        codigos = cls._rango(linea, cls.decodificar(linea), fecha_inicio, fecha_fin)
+        registrados = codigos[codigos != cls.SIN_REGISTRO]
+        if registrados.size == 0:
+            return 0
+        efectivos = np.isin(registrados, [cls.CODIGOS['presente'], cls.CODIGOS['tardanza']]).sum()
+        return float(efectivos) / registrados.size * 100
+
+    @classmethod
+    def racha_ausencias_mas_larga(cls, linea, fecha_inicio=None, fecha_fin=None):
+        """Mayor cantidad de clases consecutivas con estado ausente (ignora días sin clase)"""
+        codigos = cls._rango(linea, cls.decodificar(linea), fecha_inicio, fecha_fin)
+        ausente = (codigos[codigos != cls.SIN_REGISTRO] == cls.CODIGOS['ausente']).astype(np.int8)
+        if not ausente.any():
+            return 0
+        bordes = np.diff(np.concatenate(([0], ausente, [0])))
+        return int((np.flatnonzero(bordes == -1) - np.flatnonzero(bordes == 1)).max())
+
+    @classmethod
+    def patron_dia_semana(cls, linea):
+        """Conteo por estado para cada día de la semana (0 = lunes)"""
+        codigos = cls.decodificar(linea)
+        dias_semana = (np.arange(codigos.size) + date(linea.gestion, 1, 1).weekday()) % 7
+        con_clase = codigos != cls.SIN_REGISTRO
+        matriz = np.zeros((7, len(cls.CODIGOS)), dtype=np.int64)
+        np.add.at(matriz, (dias_semana[con_clase], codigos[con_clase]), 1)
+        return {
+            dia: {cls.ESTADOS_POR_CODIGO[codigo]: int(matriz[dia, codigo]) for codigo in range(len(cls.CODIGOS))}
+            for dia in range(7)
+        }
+
+    @classmethod
+    def calendario(cls, linea):
+        """Lista de (fecha, estado) de los días con clase"""
+        codigos = cls.decodificar(linea)
+        inicio = date(linea.gestion, 1, 1)
+        return [
+            (inicio + timedelta(days=int(indice)), cls.ESTADOS_POR_CODIGO[int(codigos[indice])])
+            for indice in np.flatnonzero(codigos != cls.SIN_REGISTRO)
+        ]
+
+
+class DetectorAusencias:
+    """
+    Detector incremental de ausencias consecutivas y tasas de ausencia elevadas.
+
+    Trabaja sobre un registro de cambios en lugar de una marca por id de
+    Asistencia: sincronizar_derivados anota en CambioAsistencia cada
+    estudiante-curso-materia con altas, modificaciones o bajas, así que las
+    correcciones (upserts, justificaciones) y los registros cargados tarde
+    también llegan al detector. Por cada materia-curso con cambios se recorre
+    en una sola pasada con iterator() el historial ordenado de los estudiantes
+    afectados, reconstruyendo su racha desde el inicio; las alertas que siguen
+    vigentes se conservan y las no atendidas que dejan de cumplirse se eliminan.
+
+    MarcaProcesamiento.ultimo_cambio guarda el id del último CambioAsistencia
+    procesado y serializa ejecuciones concurrentes.
+    """
+
+    MARCA = 'detector_ausencias'
+    INICIALES = {'presente': 'P', 'ausente': 'A', 'tardanza': 'T', 'justificado': 'J'}
+    CAMPOS_ESTADO = ['ultima_fecha', 'racha_actual', 'ventana', 'alerta_tasa_activa', 'updated_at']
+    LOTE_CAMBIOS = 500
+
+    def __init__(self, racha_minima=3, ventana=10, tasa_maxima=30):
+        if not 1 <= ventana <= 100:
+            raise ValueError("La ventana debe estar entre 1 y 100 clases")
+        self.racha_minima = racha_minima
+        self.ventana = ventana
+        self.tasa_maxima = tasa_maxima
+
+    def ejecutar(self):
+        """Procesa los cambios pendientes y sincroniza las alertas"""
+        resultado = {'procesados': 0, 'claves': 0, 'alertas': 0, 'descartadas': 0}
+        with transaction.atomic():
+            marca, _ = MarcaProcesamiento.objects.select_for_update().get_or_create(nombre=self.MARCA)
+
+            ids, agrupadas = [], defaultdict(set)
+            for id_cambio, ci_estudiante, codigo_curso, codigo_materia in CambioAsistencia.objects.order_by(
+                'id'
+            ).values_list('id', 'ci_estudiante', 'codigo_curso', 'codigo_materia').iterator(chunk_size=2000):
+                ids.append(id_cambio)
+                agrupadas[(codigo_curso, codigo_materia)].add(ci_estudiante)
+            if not ids:
+                return dict(resultado, ultimo_cambio=marca.ultimo_cambio)
+
+            for (codigo_curso, codigo_materia), estudiantes in agrupadas.items():
+                parcial = self._recalcular(codigo_curso, codigo_materia, estudiantes)
+                for campo, valor in parcial.items():
+                    resultado[campo] += valor
+
+            # Se borran exactamente los cambios leídos: los que se confirman
+            # durante la ejecución (aunque tengan un id menor) quedan para la siguiente
+            for inicio in range(0, len(ids), self.LOTE_CAMBIOS):
+                CambioAsistencia.objects.filter(id__in=ids[inicio:inicio + self.LOTE_CAMBIOS]).delete()
+
+            marca.ultimo_cambio = ids[-1]
+            marca.save()
+
+        return dict(resultado, ultimo_cambio=marca.ultimo_cambio)
+
+    def _recalcular(self, codigo_curso, codigo_materia, estudiantes):
+        """Recorre en una pasada el historial de los estudiantes en una materia-curso y concilia estados y alertas"""
+        previos = {
+            estado.ci_estudiante_id: estado
+            for estado in EstadoDetectorAsistencia.objects.select_for_update().filter(
+                codigo_curso=codigo_curso,
+                codigo_materia=codigo_materia,
+                ci_estudiante__in=estudiantes
+            )
+        }
+
+        registros = Asistencia.objects.filter(
+            codigo_curso=codigo_curso,
+            codigo_materia=codigo_materia,
+            ci_estudiante__in=estudiantes,
+            is_active=True
+        ).order_by('ci_estudiante', 'fecha', 'id').values_list('ci_estudiante', 'fecha', 'estado')
+
+        estados, esperadas = {}, {}
+        actual = None
+        procesados = 0
+        for ci_estudiante, fecha, estado in registros.iterator(chunk_size=2000):
+            if actual is None or actual.ci_estudiante_id != ci_estudiante:
+                # Primer registro del estudiante: la racha se reconstruye desde cero
+                actual = previos.get(ci_estudiante) or EstadoDetectorAsistencia(
+                    ci_estudiante_id=ci_estudiante,
+                    codigo_curso_id=codigo_curso,
+                    codigo_materia_id=codigo_materia
+                )
+                actual.racha_actual, actual.ventana, actual.alerta_tasa_activa = 0, '', False
+                actual.updated_at = timezone.now()
+                estados[ci_estudiante] = actual
+            for alerta in self._procesar(actual, fecha, estado):
+                esperadas.setdefault((ci_estudiante, alerta.tipo, alerta.fecha), alerta)
+            procesados += 1
+
+        # Se conservan las alertas que siguen vigentes (y su estado de atención)
+        descartadas = []
+        for id_alerta, ci_estudiante, tipo, fecha, atendida in AlertaAsistencia.objects.filter(
+            codigo_curso=codigo_curso,
+            codigo_materia=codigo_materia,
+            ci_estudiante__in=estudiantes
+        ).values_list('id', 'ci_estudiante', 'tipo', 'fecha', 'atendida'):
+            if esperadas.pop((ci_estudiante, tipo, fecha), None) is None and not atendida:
+                descartadas.append(id_alerta)
+
+        # Estudiantes que ya no tienen registros activos
+        EstadoDetectorAsistencia.objects.filter(
+            pk__in=[anterior.pk for ci_estudiante, anterior in previos.items() if ci_estudiante not in estados]
+        ).delete()
+        EstadoDetectorAsistencia.objects.bulk_update(
+            [estado for estado in estados.values() if estado.pk], self.CAMPOS_ESTADO, batch_size=500
+        )
+        EstadoDetectorAsistencia.objects.bulk_create(
+            [estado for estado in estados.values() if not estado.pk], batch_size=500
+        )
+        AlertaAsistencia.objects.filter(id__in=descartadas).delete()
+        AlertaAsistencia.objects.bulk_create(esperadas.values(), batch_size=500)
+
+        return {
+            'procesados': procesados,
+            'claves': len(estudiantes),
+            'alertas': len(esperadas),
+            'descartadas': len(descartadas)
+        }
+
+    def _procesar(self, actual, fecha, estado):
+        """Aplica un registro al estado de la racha y retorna las alertas disparadas"""
+        alertas = []
+        claves = {
+            'ci_estudiante_id': actual.ci_estudiante_id,
+            'codigo_curso_id': actual.codigo_curso_id,
+            'codigo_materia_id': actual.codigo_materia_id,
+            'fecha': fecha
+        }
+
+        # Las ausencias justificadas no suman ni interrumpen la racha
+        if estado == 'ausente':
+            actual.racha_actual += 1
+            if actual.racha_actual == self.racha_minima:
+                alertas.append(AlertaAsistencia(
+                    tipo='RACHA_AUSENCIAS',
+                    valor=Decimal(actual.racha_actual),
+                    detalle=f"{actual.racha_actual} ausencias consecutivas",
+                    **claves
+                ))
+        elif estado in ('presente', 'tardanza'):
+            actual.racha_actual = 0
+
+        actual.ventana = (actual.ventana + self.INICIALES[estado])[-self.ventana:]
+        if len(actual.ventana) == self.ventana:
+            tasa = actual.ventana.count('A') / self.ventana * 100
+            if tasa >= self.tasa_maxima and not actual.alerta_tasa_activa:
+                actual.alerta_tasa_activa = True
+                alertas.append(AlertaAsistencia(
+                    tipo='TASA_AUSENCIAS',
+                    valor=Decimal(str(round(tasa, 2))),
+                    detalle=f"{actual.ventana.count('A')} ausencias en las últimas {self.ventana} clases",
+                    **claves
+                ))
+            elif tasa < self.tasa_maxima:
+                actual.alerta_tasa_activa = False
+
+        actual.ultima_fecha = fecha
+        return alertas
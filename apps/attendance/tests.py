@@ -1,3 +1,355 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.courses.models import Curso
+from apps.students.models import Estudiante
+from apps.subjects.models import Materia
+from .models import AlertaAsistencia, Asistencia, CambioAsistencia, ResumenAsistenciaMensual
+from .services import DetectorAusencias, ResumenAsistencia
+
+
+class AsistenciaBaseTestCase(TestCase):
+    """Curso, materia y estudiantes comunes; el cliente entra como administrador"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(codigo='C1', nombre='1A', nivel='1', paralelo='A', gestion=2026)
+        cls.materia = Materia.objects.create(codigo='M1', nombre='Matemática')
+        cls.estudiantes = [
+            Estudiante.objects.create(
+                ci=f'E{i}', nombre=f'Nombre{i}', apellido=f'Apellido{i}',
+                email=f'e{i}@colegio.com', fecha_nacimiento=date(2012, 1, 1)
+            )
+            for i in range(3)
+        ]
+        cls.admin = User.objects.create_user('admin', password='clave12345')
+        cls.admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def registrar(self, estudiante, fecha, estado):
+        return Asistencia.objects.create(
+            codigo_curso=self.curso, codigo_materia=self.materia,
+            ci_estudiante=estudiante, fecha=fecha, estado=estado
+        )
+
+
+class PaginacionCursorTests(AsistenciaBaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        inicio = date(2026, 3, 2)
+        for dia in range(5):
+            for estudiante in self.estudiantes:
+                self.registrar(estudiante, inicio + timedelta(days=dia), 'presente')
+
+    def test_recorrido_por_cursor_sigue_el_orden_de_la_clave(self):
+        esperado = list(Asistencia.objects.order_by('-fecha', '-id').values_list('id', flat=True))
+        obtenido = []
+        url = '/api/attendance/?paginacion=cursor&page_size=4'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertNotIn('count', respuesta.data)
+            obtenido += [fila['id'] for fila in respuesta.data['results']]
+            url = respuesta.data['next']
+        self.assertEqual(obtenido, esperado)
+
+    def test_cursor_invalido_devuelve_404(self):
+        respuesta = self.client.get('/api/attendance/?cursor=no-es-un-cursor')
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_listas_agrupadas_ignoran_el_cursor(self):
+        respuesta = self.client.get(
+            '/api/attendance/estadisticas_curso/?codigo_curso=C1&paginacion=cursor&page_size=2'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.data['estudiantes']), 2)
+        self.assertIsNotNone(respuesta.data['paginacion']['next'])
+        self.assertTrue(all(e['estadisticas']['total_clases'] == 5 for e in respuesta.data['estudiantes']))
+
+
+class DetectorAusenciasTests(AsistenciaBaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.estudiante = self.estudiantes[0]
+        self.inicio = date(2026, 3, 2)
+        for dia, estado in enumerate(['presente', 'ausente', 'ausente', 'ausente']):
+            self.registrar(self.estudiante, self.inicio + timedelta(days=dia), estado)
+        self.detector = DetectorAusencias(racha_minima=3, ventana=10, tasa_maxima=30)
+
+    def alertas(self):
+        return list(AlertaAsistencia.objects.order_by('fecha').values_list('tipo', 'fecha'))
+
+    def test_detecta_racha_y_no_duplica_alertas(self):
+        ultimo_cambio = CambioAsistencia.objects.order_by('-id').values_list('id', flat=True).first()
+        resultado = self.detector.ejecutar()
+        self.assertEqual(resultado['ultimo_cambio'], ultimo_cambio)
+        self.assertEqual(resultado['alertas'], 1)
+        self.assertEqual(self.alertas(), [('RACHA_AUSENCIAS', self.inicio + timedelta(days=3))])
+        self.assertFalse(CambioAsistencia.objects.exists())
+
+        self.assertEqual(self.detector.ejecutar()['procesados'], 0)
+        self.assertEqual(len(self.alertas()), 1)
+
+    def test_correccion_por_update_elimina_la_alerta(self):
+        self.detector.ejecutar()
+        Asistencia.objects.filter(
+            ci_estudiante=self.estudiante, fecha=self.inicio + timedelta(days=2)
+        ).update(estado='justificado')
+        Asistencia.objects.filter(
+            ci_estudiante=self.estudiante, fecha=self.inicio + timedelta(days=3)
+        ).update(estado='presente')
+
+        resultado = self.detector.ejecutar()
+        self.assertEqual(resultado['descartadas'], 1)
+        self.assertEqual(self.alertas(), [])
+
+    def test_registro_masivo_corrige_la_alerta(self):
+        self.detector.ejecutar()
+        respuesta = self.client.post('/api/attendance/registro_masivo/', {
+            'codigo_curso': 'C1', 'codigo_materia': 'M1',
+            'fecha': str(self.inicio + timedelta(days=2)),
+            'estudiantes': [{'ci_estudiante': self.estudiante.ci, 'estado': 'presente'}]
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+
+        self.detector.ejecutar()
+        self.assertEqual(self.alertas(), [])
+
+    def test_registro_atrasado_se_considera(self):
+        self.registrar(self.estudiantes[1], self.inicio + timedelta(days=5), 'ausente')
+        self.detector.ejecutar()
+        for dia in (3, 4):
+            self.registrar(self.estudiantes[1], self.inicio + timedelta(days=dia), 'ausente')
+
+        self.detector.ejecutar()
+        self.assertTrue(AlertaAsistencia.objects.filter(
+            ci_estudiante=self.estudiantes[1], tipo='RACHA_AUSENCIAS', fecha=self.inicio + timedelta(days=5)
+        ).exists())
+
+    def test_conserva_alertas_atendidas(self):
+        self.detector.ejecutar()
+        AlertaAsistencia.objects.update(atendida=True)
+        Asistencia.objects.filter(ci_estudiante=self.estudiante, estado='ausente').update(estado='presente')
+
+        self.detector.ejecutar()
+        self.assertEqual(AlertaAsistencia.objects.filter(atendida=True).count(), 1)
+
+
+class ResumenMensualTests(AsistenciaBaseTestCase):
+
+    def totales(self):
+        return {
+            (fila.ci_estudiante_id, fila.mes, fila.estado): fila.total
+            for fila in ResumenAsistenciaMensual.objects.filter(total__gt=0)
+        }
+
+    def esperado(self):
+        conteos = {}
+        for ci, fecha, estado in Asistencia.objects.filter(is_active=True).values_list(
+            'ci_estudiante', 'fecha', 'estado'
+        ):
+            clave = (ci, fecha.replace(day=1), estado)
+            conteos[clave] = conteos.get(clave, 0) + 1
+        return conteos
+
+    def test_resumen_coincide_con_los_registros_tras_cada_operacion(self):
+        estudiante = self.estudiantes[0]
+        for dia in range(1, 6):
+            self.registrar(estudiante, date(2026, 3, dia), 'presente')
+        self.registrar(self.estudiantes[1], date(2026, 4, 1), 'ausente')
+        self.assertEqual(self.totales(), self.esperado())
+
+        Asistencia.objects.filter(fecha__lte=date(2026, 3, 2)).update(estado='ausente')
+        self.assertEqual(self.totales(), self.esperado())
+
+        asistencia = Asistencia.objects.get(ci_estudiante=estudiante, fecha=date(2026, 3, 3))
+        asistencia.fecha = date(2026, 4, 3)
+        asistencia.save()
+        self.assertEqual(self.totales(), self.esperado())
+
+        Asistencia.objects.filter(fecha=date(2026, 3, 4)).update(is_active=False)
+        Asistencia.objects.filter(fecha=date(2026, 3, 5)).delete()
+        self.assertEqual(self.totales(), self.esperado())
+
+    def test_recalcular_es_idempotente(self):
+        self.registrar(self.estudiantes[0], date(2026, 3, 2), 'tardanza')
+        clave = (self.estudiantes[0].ci, 'C1', 'M1', date(2026, 3, 1))
+        ResumenAsistencia.recalcular([clave])
+        ResumenAsistencia.recalcular([clave])
+        self.assertEqual(self.totales(), {(self.estudiantes[0].ci, date(2026, 3, 1), 'tardanza'): 1})
+
+    def test_fecha_como_texto(self):
+        asistencia = Asistencia(
+            codigo_curso=self.curso, codigo_materia=self.materia,
+            ci_estudiante=self.estudiantes[2], fecha='2026-03-01', estado='ausente'
+        )
+        asistencia.save()
+        self.assertEqual(self.totales(), {(self.estudiantes[2].ci, date(2026, 3, 1), 'ausente'): 1})
+
+
+class CalendarioTests(AsistenciaBaseTestCase):
+
+    URL = '/api/attendance/calendario/?ci_estudiante=E0&codigo_curso=C1&codigo_materia=M1'
+
+    def test_gestion_invalida_devuelve_400(self):
+        respuesta = self.client.get(f'{self.URL}&gestion=abc')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('gestion', respuesta.data['error'])
+
+    def test_calendario_de_la_gestion(self):
+        self.registrar(self.estudiantes[0], date(2026, 3, 2), 'ausente')
+        respuesta = self.client.get(f'{self.URL}&gestion=2026')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['dias'], [{'fecha': date(2026, 3, 2), 'estado': 'ausente'}])
+
+
+class RegistroMasivoTests(AsistenciaBaseTestCase):
+    URL = '/api/attendance/registro_masivo/'
+
+    def enviar(self, estudiantes, fecha='2026-03-02'):
+        return self.client.post(self.URL, {
+            'codigo_curso': 'C1', 'codigo_materia': 'M1', 'fecha': fecha, 'estudiantes': estudiantes
+        }, format='json')
+
+    def test_crea_y_actualiza_en_un_solo_envio(self):
+        self.registrar(self.estudiantes[0], date(2026, 3, 2), 'ausente')
+        respuesta = self.enviar([
+            {'ci_estudiante': 'E0', 'estado': 'presente'},
+            {'ci_estudiante': 'E1', 'estado': 'tardanza', 'observacion': 'Llegó 10 min tarde'},
+        ])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            [(fila['ci'], fila['accion']) for fila in respuesta.data['resultados']],
+            [('E0', 'actualizado'), ('E1', 'creado')]
+        )
+        self.assertEqual(
+            dict(Asistencia.objects.values_list('ci_estudiante', 'estado')),
+            {'E0': 'presente', 'E1': 'tardanza'}
+        )
+        self.assertEqual(
+            ResumenAsistencia.contar_estados(agrupar_por=('ci_estudiante',))[('E0',)]['presente'], 1
+        )
+
+    def test_informa_estudiantes_inexistentes_y_duplicados(self):
+        respuesta = self.enviar([
+            {'ci_estudiante': 'E0', 'estado': 'presente'},
+            {'ci_estudiante': 'E0', 'estado': 'ausente'},
+            {'ci_estudiante': 'NOEXISTE', 'estado': 'presente'},
+        ])
+
+        self.assertEqual(respuesta.data['exitosos'], 1)
+        self.assertEqual(
+            [error['ci'] for error in respuesta.data['errores']], ['E0', 'NOEXISTE']
+        )
+        self.assertEqual(Asistencia.objects.get().estado, 'presente')
+
+    def test_estado_invalido(self):
+        respuesta = self.enviar([{'ci_estudiante': 'E0', 'estado': 'desconocido'}])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Asistencia.objects.exists())
+
+
+class EstadisticasCursoTests(AsistenciaBaseTestCase):
+
+    def test_estadisticas_por_estudiante_coinciden_con_el_calculo_individual(self):
+        estados = {
+            'E0': ['presente', 'ausente', 'tardanza', 'presente'],
+            'E1': ['ausente', 'ausente', 'justificado', 'presente'],
+            'E2': ['presente', 'presente', 'presente', 'presente'],
+        }
+        for estudiante in self.estudiantes:
+            for dia, estado in enumerate(estados[estudiante.ci]):
+                self.registrar(estudiante, date(2026, 3, 2 + dia), estado)
+
+        respuesta = self.client.get('/api/attendance/estadisticas_curso/?codigo_curso=C1')
+        self.assertEqual(respuesta.status_code, 200)
+
+        obtenidas = respuesta.data['estudiantes']
+        # Por defecto primero los de menor asistencia
+        self.assertEqual([fila['estudiante']['ci'] for fila in obtenidas], ['E1', 'E0', 'E2'])
+        for fila in obtenidas:
+            esperadas = Asistencia.obtener_estadisticas_detalladas(
+                fila['estudiante']['ci'], self.materia, self.curso
+            )
+            esperadas['porcentaje_asistencia'] = round(esperadas['porcentaje_asistencia'], 2)
+            self.assertEqual(fila['estadisticas'], esperadas)
+
+
+class RegistroSesionTests(AsistenciaBaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from apps.students.models import Inscripcion
+        for estudiante, estado in zip(self.estudiantes, ['ACTIVO', 'ACTIVO', 'RETIRADO']):
+            Inscripcion.objects.create(
+                ci_estudiante=estudiante, codigo_curso=self.curso,
+                fecha_inscripcion=date(2026, 2, 1), estado=estado
+            )
+
+    def estados(self, fecha):
+        return dict(Asistencia.objects.filter(fecha=fecha).values_list('ci_estudiante', 'estado'))
+
+    def test_equivale_al_registro_masivo_de_toda_la_lista(self):
+        respuesta = self.client.post('/api/attendance/registro_sesion/', {
+            'codigo_curso': 'C1', 'codigo_materia': 'M1', 'fecha': '2026-03-02',
+            'excepciones': [
+                {'ci_estudiante': 'E1', 'estado': 'ausente'},
+                {'ci_estudiante': 'E2', 'estado': 'tardanza'},
+            ]
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['presentes'], 1)
+        self.assertEqual([error['ci'] for error in respuesta.data['errores']], ['E2'])
+
+        # Misma clase enviando explícitamente a cada estudiante inscrito
+        self.client.post('/api/attendance/registro_masivo/', {
+            'codigo_curso': 'C1', 'codigo_materia': 'M1', 'fecha': '2026-03-03',
+            'estudiantes': [
+                {'ci_estudiante': 'E0', 'estado': 'presente'},
+                {'ci_estudiante': 'E1', 'estado': 'ausente'},
+            ]
+        }, format='json')
+        self.assertEqual(self.estados(date(2026, 3, 2)), self.estados(date(2026, 3, 3)))
+        self.assertEqual(self.estados(date(2026, 3, 2)), {'E0': 'presente', 'E1': 'ausente'})
+
+
+class JustificarRangoTests(AsistenciaBaseTestCase):
+
+    def test_solo_justifica_ausencias_del_rango_y_las_materias(self):
+        otra = Materia.objects.create(codigo='M2', nombre='Lenguaje')
+        estudiante = self.estudiantes[0]
+        for dia, estado in enumerate(['ausente', 'presente', 'ausente', 'ausente']):
+            self.registrar(estudiante, date(2026, 3, 2 + dia), estado)
+        Asistencia.objects.create(
+            codigo_curso=self.curso, codigo_materia=otra, ci_estudiante=estudiante,
+            fecha=date(2026, 3, 3), estado='ausente'
+        )
+        self.registrar(self.estudiantes[1], date(2026, 3, 3), 'ausente')
+
+        # Lo que hacía la justificación fila por fila
+        esperadas = set(Asistencia.objects.filter(
+            ci_estudiante=estudiante, codigo_materia='M1', estado='ausente',
+            fecha__range=(date(2026, 3, 2), date(2026, 3, 4))
+        ).values_list('id', flat=True))
 
-# Create your tests here.
+        respuesta = self.client.post('/api/attendance/justificar_rango/', {
+            'ci_estudiante': 'E0', 'fecha_inicio': '2026-03-02', 'fecha_fin': '2026-03-04',
+            'materias': ['M1'], 'observacion': 'Certificado médico'
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['ausencias_justificadas'], len(esperadas))
+        self.assertEqual(
+            set(Asistencia.objects.filter(estado='justificado').values_list('id', flat=True)), esperadas
+        )
+        self.assertEqual(
+            Asistencia.obtener_estadisticas_detalladas(estudiante, self.materia, self.curso)['justificado'], 2
+        )
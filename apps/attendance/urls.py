@@ -5,6 +5,7 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
+router.register(r'alertas', views.AlertaAsistenciaViewSet)
 router.register(r'', views.AsistenciaViewSet)
 
 urlpatterns = [
@@ -6,18 +6,52 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Count, Q
+from django.db.models import Count, Q, F, FloatField
+from django.db.models.functions import Cast
 from django.db import transaction
+from django.utils import timezone
 from datetime import date, timedelta
-from .models import Asistencia
+from .models import Asistencia, LineaTiempoAsistencia, AlertaAsistencia
+from .services import ResumenAsistencia, LineaTiempo, ESTADOS
 from .serializers import (
     AsistenciaSerializer, AsistenciaCreateSerializer, 
     AsistenciaMasivaSerializer, EstadisticasAsistenciaSerializer,
-    EstadisticasDetalladasSerializer
+    EstadisticasDetalladasSerializer, AlertaAsistenciaSerializer,
+    AsistenciaSesionSerializer, JustificacionRangoSerializer
 )
 from apps.authentication.permissions import IsDocenteOrAdministrador
+from apps.authentication.contexto import obtener_contexto
 
-class AsistenciaViewSet(viewsets.ModelViewSet):
+class FiltroRolAsistenciaMixin:
+    """Restringe el queryset según el rol del usuario (docente, estudiante o administrador)"""
+    
+    def get_queryset(self):
+        filtro = self._filtro_rol()
+        if filtro is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(filtro)
+    
+    def _filtro_rol(self):
+        """
+        Filtro de visibilidad según el rol del usuario, aplicable a todos los
+        modelos con ci_estudiante, codigo_curso y codigo_materia. None si no
+        puede ver nada.
+        """
+        contexto = obtener_contexto(self.request)
+        
+        # Si es docente, solo puede ver asistencia de sus materias
+        if contexto.es_docente:
+            return contexto.filtro_asignaciones()
+        
+        # Si es estudiante, solo puede ver su propia asistencia
+        elif contexto.es_estudiante:
+            if contexto.ci_estudiante is None:
+                return None
+            return Q(ci_estudiante=contexto.ci_estudiante)
+        
+        return Q()
+
+class AsistenciaViewSet(FiltroRolAsistenciaMixin, viewsets.ModelViewSet):
     queryset = Asistencia.objects.filter(is_active=True)
     serializer_class = AsistenciaSerializer
     permission_classes = [IsAuthenticated, IsDocenteOrAdministrador]
@@ -25,57 +59,102 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
     filterset_fields = ['codigo_curso', 'codigo_materia', 'ci_estudiante', 'fecha', 'estado']
     search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido']
     ordering = ['-fecha', 'codigo_curso', 'ci_estudiante']
+    orden_cursor = ('-fecha', '-id')
+    
+    ORDENAMIENTOS_ESTADISTICAS = [
+        'porcentaje_asistencia', 'total_clases', 'presente', 'ausente',
+        'tardanza', 'justificado', 'ci_estudiante__apellido'
+    ]
     
     def get_serializer_class(self):
         if self.action == 'create':
             return AsistenciaCreateSerializer
         elif self.action == 'registro_masivo':
             return AsistenciaMasivaSerializer
+        elif self.action == 'registro_sesion':
+            return AsistenciaSesionSerializer
+        elif self.action == 'justificar_rango':
+            return JustificacionRangoSerializer
         return AsistenciaSerializer
     
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
-        
-        # Si es docente, solo puede ver asistencia de sus materias
-        if user.groups.filter(name='Docente').exists():
-            from apps.teachers.models import Docente, AsignacionCurso
-            try:
-                docente = Docente.objects.get(usuario=user)
-                asignaciones = AsignacionCurso.objects.filter(
-                    ci_docente=docente,
-                    is_active=True
-                ).values('codigo_curso', 'codigo_materia')
-                
-                filters = Q()
-                for asignacion in asignaciones:
-                    filters |= Q(
-                        codigo_curso=asignacion['codigo_curso'],
-                        codigo_materia=asignacion['codigo_materia']
-                    )
-                queryset = queryset.filter(filters)
-            except Docente.DoesNotExist:
-                queryset = queryset.none()
-        
-        # Si es estudiante, solo puede ver su propia asistencia
-        elif user.groups.filter(name='Estudiante').exists():
-            from apps.students.models import Estudiante
-            try:
-                estudiante = Estudiante.objects.get(usuario=user)
-                queryset = queryset.filter(ci_estudiante=estudiante)
-            except Estudiante.DoesNotExist:
-                queryset = queryset.none()
-        
-        return queryset
-    
     def get_permissions(self):
         """Solo docentes y administradores pueden crear/modificar asistencia"""
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'registro_masivo']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'registro_masivo', 'registro_sesion', 'justificar_rango']:
             permission_classes = [IsAuthenticated, IsDocenteOrAdministrador]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    def _respuesta_paginada(self, page, clave, items, payload):
+        """Agrega la lista (paginada si corresponde) bajo `clave` al resto del payload"""
+        if page is None:
+            payload[clave] = items
+            return Response(payload)
+        
+        paginado = self.get_paginated_response(items).data
+        payload[clave] = paginado.pop('results')
+        payload['paginacion'] = paginado
+        return Response(payload)
+    
+    def _verificar_asignacion_docente(self, user, codigo_curso, codigo_materia):
+        """Retorna una respuesta 403 si el docente no está asignado a la materia-curso"""
+        contexto = obtener_contexto(self.request)
+        if contexto.es_docente and not contexto.tiene_asignacion(codigo_curso, codigo_materia):
+            return Response(
+                {'error': 'No tiene permisos para registrar asistencia en esta materia-curso'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return None
+    
+    def _guardar_asistencias(self, curso, materia, fecha, filas):
+        """
+        Crea o actualiza en un único INSERT ... ON CONFLICT las asistencias
+        de una clase. `filas` es una lista de (estudiante, estado, observacion).
+        """
+        existentes = set(
+            Asistencia.objects.filter(
+                codigo_curso=curso,
+                codigo_materia=materia,
+                fecha=fecha,
+                ci_estudiante__in=[estudiante.ci for estudiante, _, _ in filas]
+            ).values_list('ci_estudiante', flat=True)
+        )
+        
+        with transaction.atomic():
+            Asistencia.objects.bulk_create(
+                [
+                    Asistencia(
+                        codigo_curso=curso,
+                        codigo_materia=materia,
+                        ci_estudiante=estudiante,
+                        fecha=fecha,
+                        estado=estado,
+                        observacion=observacion
+                    ) for estudiante, estado, observacion in filas
+                ],
+                update_conflicts=True,
+                unique_fields=['codigo_curso', 'codigo_materia', 'ci_estudiante', 'fecha'],
+                update_fields=['estado', 'observacion', 'updated_at']
+            )
+        
+        estados_display = dict(Asistencia.ESTADO_CHOICES)
+        return [
+            {
+                'ci': estudiante.ci,
+                'nombre': estudiante.nombre_completo,
+                'estado': estado,
+                'estado_display': estados_display[estado],
+                'accion': 'actualizado' if estudiante.ci in existentes else 'creado'
+            } for estudiante, estado, _ in filas
+        ]
+    
+    @staticmethod
+    def _limpiar_observacion(observacion):
+        # ✅ MANEJAR CORRECTAMENTE LAS OBSERVACIONES NULAS/VACÍAS
+        if observacion == 'null' or observacion is None:
+            return ''
+        return observacion
+    
     @action(detail=False, methods=['post'])
     def registro_masivo(self, request):
         """Registrar asistencia de múltiples estudiantes"""
@@ -86,70 +165,52 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
         data = serializer.validated_data
         
         # Verificar que el docente puede registrar en esta materia-curso
-        user = request.user
-        if user.groups.filter(name='Docente').exists():
-            from apps.teachers.models import Docente, AsignacionCurso
-            try:
-                docente = Docente.objects.get(usuario=user)
-                asignacion = AsignacionCurso.objects.get(
-                    ci_docente=docente,
-                    codigo_curso__codigo=data['codigo_curso'],
-                    codigo_materia__codigo=data['codigo_materia'],
-                    is_active=True
-                )
-            except (Docente.DoesNotExist, AsignacionCurso.DoesNotExist):
-                return Response(
-                    {'error': 'No tiene permisos para registrar asistencia en esta materia-curso'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-        
-        # Procesar estudiantes
-        resultados = []
+        sin_permiso = self._verificar_asignacion_docente(
+            request.user, data['codigo_curso'], data['codigo_materia']
+        )
+        if sin_permiso:
+            return sin_permiso
+        
+        from apps.students.models import Estudiante
+        from apps.courses.models import Curso
+        from apps.subjects.models import Materia
+        
+        # Curso y materia son los mismos para toda la solicitud
+        try:
+            curso = Curso.objects.get(codigo=data['codigo_curso'])
+            materia = Materia.objects.get(codigo=data['codigo_materia'])
+        except (Curso.DoesNotExist, Materia.DoesNotExist):
+            return Response(
+                {'error': 'Curso o materia no encontrados'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Resolver todos los estudiantes en una sola consulta
+        cis = [estudiante_data['ci_estudiante'] for estudiante_data in data['estudiantes']]
+        estudiantes = Estudiante.objects.in_bulk(cis)
+        
+        filas = []
         errores = []
+        procesados = set()
         
-        with transaction.atomic():
-            for estudiante_data in data['estudiantes']:
-                try:
-                    from apps.students.models import Estudiante
-                    from apps.courses.models import Curso
-                    from apps.subjects.models import Materia
-                    
-                    # ✅ CORREGIR: usar 'ci_estudiante' en lugar de 'ci'
-                    estudiante = Estudiante.objects.get(ci=estudiante_data['ci_estudiante'])
-                    curso = Curso.objects.get(codigo=data['codigo_curso'])
-                    materia = Materia.objects.get(codigo=data['codigo_materia'])
-                    
-                    estado = estudiante_data['estado']
-                    # ✅ MANEJAR CORRECTAMENTE LAS OBSERVACIONES NULAS/VACÍAS
-                    observacion = estudiante_data.get('observacion', '')
-                    if observacion == 'null' or observacion is None:
-                        observacion = ''
-                
-                    # Crear o actualizar asistencia
-                    asistencia, created = Asistencia.objects.update_or_create(
-                        codigo_curso=curso,
-                        codigo_materia=materia,
-                        ci_estudiante=estudiante,
-                        fecha=data['fecha'],
-                        defaults={
-                            'estado': estado,
-                            'observacion': observacion  
-                        }
-                    )
-                    
-                    resultados.append({
-                        'ci': estudiante_data['ci_estudiante'],  # ✅ CORREGIR: usar 'ci_estudiante'
-                        'nombre': estudiante.nombre_completo,
-                        'estado': estado,
-                        'estado_display': asistencia.get_estado_display(),
-                        'accion': 'creado' if created else 'actualizado'
-                    })
-                    
-                except Exception as e:
-                    errores.append({
-                        'ci': estudiante_data['ci_estudiante'],  # ✅ CORREGIR: usar 'ci_estudiante'
-                        'error': str(e)
-                    })
+        for estudiante_data in data['estudiantes']:
+            ci = estudiante_data['ci_estudiante']
+            estudiante = estudiantes.get(ci)
+            if estudiante is None:
+                errores.append({'ci': ci, 'error': 'Estudiante no encontrado'})
+                continue
+            if ci in procesados:
+                errores.append({'ci': ci, 'error': 'Estudiante duplicado en la solicitud'})
+                continue
+            procesados.add(ci)
+            
+            filas.append((
+                estudiante,
+                estudiante_data['estado'],
+                self._limpiar_observacion(estudiante_data.get('observacion', ''))
+            ))
+        
+        resultados = self._guardar_asistencias(curso, materia, data['fecha'], filas)
         
         return Response({
             'fecha': data['fecha'],
@@ -162,6 +223,114 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
             'errores': errores
         })
     
+    @action(detail=False, methods=['post'])
+    def registro_sesion(self, request):
+        """
+        Registrar la asistencia de una clase enviando solo las excepciones.
+        Todos los estudiantes con inscripción activa en el curso quedan como
+        presentes salvo los incluidos en `excepciones`.
+        """
+        serializer = AsistenciaSesionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        
+        sin_permiso = self._verificar_asignacion_docente(
+            request.user, data['codigo_curso'], data['codigo_materia']
+        )
+        if sin_permiso:
+            return sin_permiso
+        
+        from apps.students.models import Inscripcion
+        from apps.courses.models import Curso
+        from apps.subjects.models import Materia
+        
+        try:
+            curso = Curso.objects.get(codigo=data['codigo_curso'])
+            materia = Materia.objects.get(codigo=data['codigo_materia'])
+        except (Curso.DoesNotExist, Materia.DoesNotExist):
+            return Response(
+                {'error': 'Curso o materia no encontrados'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Lista de estudiantes activos del curso en una sola consulta
+        inscripciones = Inscripcion.objects.filter(
+            codigo_curso=curso,
+            estado='ACTIVO',
+            ci_estudiante__is_active=True
+        ).select_related('ci_estudiante').order_by('ci_estudiante__apellido', 'ci_estudiante__nombre')
+        
+        excepciones = {
+            excepcion['ci_estudiante']: excepcion for excepcion in data['excepciones']
+        }
+        
+        filas = []
+        for inscripcion in inscripciones:
+            estudiante = inscripcion.ci_estudiante
+            excepcion = excepciones.pop(estudiante.ci, None)
+            if excepcion:
+                filas.append((
+                    estudiante,
+                    excepcion['estado'],
+                    self._limpiar_observacion(excepcion.get('observacion', ''))
+                ))
+            else:
+                filas.append((estudiante, 'presente', ''))
+        
+        errores = [
+            {'ci': ci, 'error': 'Estudiante sin inscripción activa en el curso'}
+            for ci in excepciones
+        ]
+        
+        resultados = self._guardar_asistencias(curso, materia, data['fecha'], filas)
+        presentes = sum(1 for _, estado, _ in filas if estado == 'presente')
+        
+        return Response({
+            'fecha': data['fecha'],
+            'curso': data['codigo_curso'],
+            'materia': data['codigo_materia'],
+            'total_estudiantes': len(filas),
+            'presentes': presentes,
+            'excepciones': len(filas) - presentes,
+            'resultados': resultados,
+            'errores': errores
+        })
+    
+    @action(detail=False, methods=['post'])
+    def justificar_rango(self, request):
+        """Justificar en un solo UPDATE las ausencias de un estudiante en un rango de fechas"""
+        serializer = JustificacionRangoSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        queryset = self.get_queryset().filter(
+            ci_estudiante=data['ci_estudiante'],
+            fecha__range=(data['fecha_inicio'], data['fecha_fin']),
+            estado='ausente'
+        )
+        if data['materias']:
+            queryset = queryset.filter(codigo_materia__in=data['materias'])
+        
+        # El UPDATE recalcula resúmenes y líneas de tiempo en la misma transacción
+        justificadas = queryset.update(
+            estado='justificado',
+            observacion=data['observacion'],
+            updated_at=timezone.now()
+        )
+        
+        return Response({
+            'estudiante': data['ci_estudiante'],
+            'periodo': {
+                'fecha_inicio': data['fecha_inicio'],
+                'fecha_fin': data['fecha_fin']
+            },
+            'materias': data['materias'],
+            'ausencias_justificadas': justificadas
+        })
+    
     @action(detail=False, methods=['get'])
     def por_estudiante(self, request):
         """Obtener asistencia de un estudiante específico"""
@@ -176,65 +345,53 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        queryset = self.get_queryset().filter(ci_estudiante=ci_estudiante)
-        
+        filtro = self._filtro_rol()
+        if filtro is None:
+            filtro = Q(pk__in=[])
+        filtro &= Q(ci_estudiante=ci_estudiante)
         if codigo_materia:
-            queryset = queryset.filter(codigo_materia=codigo_materia)
+            filtro &= Q(codigo_materia=codigo_materia)
+        
+        # Estadísticas por materia desde los resúmenes mensuales
+        conteos = ResumenAsistencia.contar_estados(
+            filtro, fecha_inicio, fecha_fin,
+            agrupar_por=('codigo_materia', 'codigo_materia__nombre')
+        )
+        
+        totales = dict.fromkeys(ESTADOS, 0)
+        materias_data = {}
+        for (materia_codigo, materia_nombre), conteo in sorted(conteos.items(), key=lambda item: item[0][1]):
+            for estado in ESTADOS:
+                totales[estado] += conteo[estado]
+            stats_materia = ResumenAsistencia.con_porcentaje(conteo)
+            stats_materia['porcentaje_asistencia'] = round(stats_materia['porcentaje_asistencia'], 2)
+            materias_data[materia_codigo] = {
+                'materia': materia_nombre,
+                'registros': [],
+                'estadisticas': stats_materia
+            }
+        
+        # Calcular porcentaje de asistencia efectiva (presente + tardanza)
+        stats = ResumenAsistencia.con_porcentaje(totales)
+        stats['porcentaje_asistencia'] = round(stats['porcentaje_asistencia'], 2)
+        
+        # Registros individuales sin instanciar modelos
+        queryset = Asistencia.objects.filter(filtro, is_active=True)
         if fecha_inicio:
             queryset = queryset.filter(fecha__gte=fecha_inicio)
         if fecha_fin:
             queryset = queryset.filter(fecha__lte=fecha_fin)
         
-        # Calcular estadísticas detalladas
-        total_clases = queryset.count()
-        stats = {
-            'total_clases': total_clases,
-            'presente': queryset.filter(estado='presente').count(),
-            'ausente': queryset.filter(estado='ausente').count(),
-            'tardanza': queryset.filter(estado='tardanza').count(),
-            'justificado': queryset.filter(estado='justificado').count(),
-        }
-        
-        # Calcular porcentaje de asistencia efectiva (presente + tardanza)
-        asistencias_efectivas = stats['presente'] + stats['tardanza']
-        porcentaje = (asistencias_efectivas / total_clases * 100) if total_clases > 0 else 0
-        stats['porcentaje_asistencia'] = round(porcentaje, 2)
-        
-        # Agrupar por materia
-        materias_data = {}
-        for asistencia in queryset.select_related('codigo_materia'):
-            materia_nombre = asistencia.codigo_materia.nombre
-            if materia_nombre not in materias_data:
-                materias_data[materia_nombre] = {
-                    'materia': materia_nombre,
-                    'registros': [],
-                    'estadisticas': {
-                        'presente': 0,
-                        'ausente': 0,
-                        'tardanza': 0,
-                        'justificado': 0
-                    }
-                }
-            
-            materias_data[materia_nombre]['registros'].append({
-                'fecha': asistencia.fecha,
-                'estado': asistencia.estado,
-                'estado_display': asistencia.get_estado_display(),
-                'observacion': asistencia.observacion
+        estados_display = dict(Asistencia.ESTADO_CHOICES)
+        for registro in queryset.values('codigo_materia', 'fecha', 'estado', 'observacion').order_by('-fecha'):
+            if registro['codigo_materia'] not in materias_data:
+                continue
+            materias_data[registro['codigo_materia']]['registros'].append({
+                'fecha': registro['fecha'],
+                'estado': registro['estado'],
+                'estado_display': estados_display.get(registro['estado']),
+                'observacion': registro['observacion']
             })
-            
-            # Incrementar contador de estadísticas por materia
-            materias_data[materia_nombre]['estadisticas'][asistencia.estado] += 1
-        
-        # Calcular porcentaje por materia
-        for materia_data in materias_data.values():
-            stats_materia = materia_data['estadisticas']
-            total_materia = sum(stats_materia.values())
-            if total_materia > 0:
-                asistencias_materia = stats_materia['presente'] + stats_materia['tardanza']
-                stats_materia['porcentaje_asistencia'] = round((asistencias_materia / total_materia) * 100, 2)
-            else:
-                stats_materia['porcentaje_asistencia'] = 0
         
         return Response({
             'estudiante': ci_estudiante,
@@ -286,15 +443,23 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
                 'porcentaje_justificado': 0
             })
         
-        return Response({
-            'fecha': fecha,
-            'filtros': {
-                'codigo_curso': codigo_curso,
-                'codigo_materia': codigo_materia
-            },
-            'estadisticas': stats,
-            'registros': AsistenciaSerializer(queryset, many=True).data
-        })
+        registros = queryset.select_related(
+            'ci_estudiante', 'codigo_materia', 'codigo_curso'
+        ).order_by('codigo_curso', 'codigo_materia', 'ci_estudiante__apellido', 'ci_estudiante__nombre')
+        page = self.paginate_queryset(registros)
+        
+        return self._respuesta_paginada(
+            page, 'registros',
+            AsistenciaSerializer(page if page is not None else registros, many=True).data,
+            {
+                'fecha': fecha,
+                'filtros': {
+                    'codigo_curso': codigo_curso,
+                    'codigo_materia': codigo_materia
+                },
+                'estadisticas': stats
+            }
+        )
     
     @action(detail=False, methods=['get'])
     def estadisticas_curso(self, request):
@@ -336,46 +501,104 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
         else:
             stats_generales['porcentaje_asistencia'] = 0
         
-        # Estadísticas por estudiante
-        estudiantes_stats = []
-        estudiantes_ids = queryset.values_list('ci_estudiante', flat=True).distinct()
+        # Estadísticas por estudiante en una sola consulta agrupada
+        ordering = request.query_params.get('ordering', 'porcentaje_asistencia')
+        if ordering.lstrip('-') not in self.ORDENAMIENTOS_ESTADISTICAS:
+            ordering = 'porcentaje_asistencia'
         
-        for estudiante_id in estudiantes_ids:
-            estudiante_queryset = queryset.filter(ci_estudiante=estudiante_id)
-            estudiante_obj = estudiante_queryset.first().ci_estudiante
-            
-            estudiante_stats = estudiante_queryset.aggregate(
-                total_clases=Count('id'),
-                presente=Count('id', filter=Q(estado='presente')),
-                ausente=Count('id', filter=Q(estado='ausente')),
-                tardanza=Count('id', filter=Q(estado='tardanza')),
-                justificado=Count('id', filter=Q(estado='justificado'))
-            )
-            
-            if estudiante_stats['total_clases'] > 0:
-                asistencias_efectivas = estudiante_stats['presente'] + estudiante_stats['tardanza']
-                porcentaje = (asistencias_efectivas / estudiante_stats['total_clases']) * 100
-                estudiante_stats['porcentaje_asistencia'] = round(porcentaje, 2)
-            else:
-                estudiante_stats['porcentaje_asistencia'] = 0
-            
-            estudiantes_stats.append({
+        estudiantes_qs = queryset.values(
+            'ci_estudiante', 'ci_estudiante__nombre', 'ci_estudiante__apellido'
+        ).annotate(
+            total_clases=Count('id'),
+            presente=Count('id', filter=Q(estado='presente')),
+            ausente=Count('id', filter=Q(estado='ausente')),
+            tardanza=Count('id', filter=Q(estado='tardanza')),
+            justificado=Count('id', filter=Q(estado='justificado'))
+        ).annotate(
+            porcentaje_asistencia=Cast(F('presente') + F('tardanza'), FloatField()) * 100 / F('total_clases')
+        ).order_by(ordering, 'ci_estudiante__apellido', 'ci_estudiante__nombre')
+        
+        page = self.paginate_queryset(estudiantes_qs)
+        filas = page if page is not None else estudiantes_qs
+        
+        estudiantes_stats = [
+            {
                 'estudiante': {
-                    'ci': estudiante_obj.ci,
-                    'nombre': estudiante_obj.nombre_completo
+                    'ci': fila['ci_estudiante'],
+                    'nombre': f"{fila['ci_estudiante__nombre']} {fila['ci_estudiante__apellido']}"
                 },
-                'estadisticas': estudiante_stats
-            })
+                'estadisticas': {
+                    'total_clases': fila['total_clases'],
+                    'presente': fila['presente'],
+                    'ausente': fila['ausente'],
+                    'tardanza': fila['tardanza'],
+                    'justificado': fila['justificado'],
+                    'porcentaje_asistencia': round(fila['porcentaje_asistencia'] or 0, 2)
+                }
+            } for fila in filas
+        ]
         
-        return Response({
+        return self._respuesta_paginada(page, 'estudiantes', estudiantes_stats, {
             'curso': codigo_curso,
             'materia': codigo_materia,
             'periodo': {
                 'fecha_inicio': fecha_inicio,
                 'fecha_fin': fecha_fin
             },
-            'estadisticas_generales': stats_generales,
-            'estudiantes': estudiantes_stats
+            'estadisticas_generales': stats_generales
+        })
+    
+    @action(detail=False, methods=['get'])
+    def calendario(self, request):
+        """Calendario anual de asistencia de un estudiante en una materia (una sola fila)"""
+        ci_estudiante = request.query_params.get('ci_estudiante')
+        codigo_curso = request.query_params.get('codigo_curso')
+        codigo_materia = request.query_params.get('codigo_materia')
+        gestion = request.query_params.get('gestion', date.today().year)
+        
+        if not all([ci_estudiante, codigo_curso, codigo_materia]):
+            return Response(
+                {'error': 'ci_estudiante, codigo_curso y codigo_materia son requeridos'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            gestion = int(gestion)
+        except ValueError:
+            return Response(
+                {'error': 'gestion debe ser un año numérico'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filtro = self._filtro_rol()
+        linea = None
+        if filtro is not None:
+            linea = LineaTiempoAsistencia.objects.filter(
+                filtro,
+                ci_estudiante=ci_estudiante,
+                codigo_curso=codigo_curso,
+                codigo_materia=codigo_materia,
+                gestion=gestion
+            ).first()
+        
+        if linea is None:
+            return Response(
+                {'error': 'No hay registros de asistencia para esta gestión'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({
+            'estudiante': ci_estudiante,
+            'curso': codigo_curso,
+            'materia': codigo_materia,
+            'gestion': linea.gestion,
+            'porcentaje_asistencia': round(LineaTiempo.porcentaje_rango(linea), 2),
+            'racha_ausencias_mas_larga': LineaTiempo.racha_ausencias_mas_larga(linea),
+            'por_dia_semana': LineaTiempo.patron_dia_semana(linea),
+            'dias': [
+                {'fecha': fecha, 'estado': estado}
+                for fecha, estado in LineaTiempo.calendario(linea)
+            ]
         })
     
     @action(detail=False, methods=['get'])
@@ -386,4 +609,22 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
                 {'valor': choice[0], 'etiqueta': choice[1]} 
                 for choice in Asistencia.ESTADO_CHOICES
             ]
-        })
\ No newline at end of file
+        })
+
+class AlertaAsistenciaViewSet(FiltroRolAsistenciaMixin, viewsets.ReadOnlyModelViewSet):
+    """Alertas generadas por el detector de ausencias"""
+    queryset = AlertaAsistencia.objects.select_related('ci_estudiante', 'codigo_curso', 'codigo_materia')
+    serializer_class = AlertaAsistenciaSerializer
+    permission_classes = [IsAuthenticated, IsDocenteOrAdministrador]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['tipo', 'atendida', 'codigo_curso', 'codigo_materia', 'ci_estudiante']
+    search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido']
+    ordering = ['atendida', '-fecha']
+    
+    @action(detail=True, methods=['post'])
+    def marcar_atendida(self, request, pk=None):
+        """Marcar una alerta como atendida"""
+        alerta = self.get_object()
+        alerta.atendida = True
+        alerta.save()
+        return Response(AlertaAsistenciaSerializer(alerta).data)
@@ -0,0 +1,71 @@
+#apps/authentication/authentication.py:
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .services import UsuariosCache, VersionesToken
+from .tokens import CLAIM_ACTIVO, CLAIM_ROLES, CLAIM_VERSION, UsuarioToken
+
+
+class JWTAutenticacionIdentidad(JWTAuthentication):
+    """
+    JWTAuthentication que en lecturas confía en las claims de identidad del
+    token si su versión sigue vigente, sin cargar el User ni sus grupos.
+    Escrituras, tokens sin claims y versiones desactualizadas resuelven el
+    User a través de UsuariosCache.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS and self.claims_vigentes(validated_token):
+            return UsuarioToken(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def claims_vigentes(self, validated_token):
+        """
+        True si el token trae las claims de un usuario activo y su versión es
+        la vigente (desactivar al usuario incrementa la versión)
+        """
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(CLAIM_VERSION)
+        if user_id is None or version is None or CLAIM_ROLES not in validated_token:
+            return False
+        if validated_token.get(CLAIM_ACTIVO) is not True:
+            return False
+        return version == VersionesToken.actual(user_id)
+
+    def get_user(self, validated_token):
+        """Igual que JWTAuthentication.get_user, pero leyendo el User desde la caché"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = UsuariosCache.obtener(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,153 @@
+#apps/authentication/contexto.py:
+
+from django.db.models import Q
+
+ROL_ADMINISTRADOR = 'Administrador'
+ROL_DOCENTE = 'Docente'
+ROL_ESTUDIANTE = 'Estudiante'
+
+_SIN_RESOLVER = object()
+
+
+class ContextoIdentidad:
+    """
+    Identidad del usuario resuelta una sola vez por solicitud: roles, perfil
+    vinculado (docente o estudiante) y asignaciones activas del docente.
+    Cada parte se consulta de forma perezosa la primera vez que se usa.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = None
+        self._docente = _SIN_RESOLVER
+        self._estudiante = _SIN_RESOLVER
+        self._asignaciones = None
+        
+        # Autenticado con claims de identidad vigentes (ver JWTAutenticacionIdentidad)
+        self._claims = getattr(user, 'claims_identidad', None)
+        if self._claims is not None:
+            self._roles = frozenset(self._claims['roles'])
+        
+        # Usuario resuelto por UsuariosCache: los grupos ya vienen cargados
+        elif getattr(user, 'roles_identidad', None) is not None:
+            self._roles = frozenset(user.roles_identidad)
+
+    @property
+    def autenticado(self):
+        return bool(self.user and self.user.is_authenticated)
+
+    @property
+    def roles(self):
+        """Nombres de los grupos del usuario (una consulta)"""
+        if self._roles is None:
+            if self.autenticado:
+                self._roles = frozenset(self.user.groups.values_list('name', flat=True))
+            else:
+                self._roles = frozenset()
+        return self._roles
+
+    def tiene_rol(self, *roles):
+        return not self.roles.isdisjoint(roles)
+
+    @property
+    def es_administrador(self):
+        return self.tiene_rol(ROL_ADMINISTRADOR)
+
+    @property
+    def es_docente(self):
+        return self.tiene_rol(ROL_DOCENTE)
+
+    @property
+    def es_estudiante(self):
+        return self.tiene_rol(ROL_ESTUDIANTE)
+
+    @property
+    def docente(self):
+        """Docente vinculado al usuario o None"""
+        if self._docente is _SIN_RESOLVER:
+            from apps.teachers.models import Docente
+            self._docente = None
+            if self._claims is not None:
+                if self._claims['ci_docente']:
+                    self._docente = Docente.objects.filter(ci=self._claims['ci_docente']).first()
+            elif self.autenticado:
+                self._docente = Docente.objects.filter(usuario=self.user).first()
+        return self._docente
+
+    @property
+    def estudiante(self):
+        """Estudiante vinculado al usuario o None"""
+        if self._estudiante is _SIN_RESOLVER:
+            from apps.students.models import Estudiante
+            self._estudiante = None
+            if self._claims is not None:
+                if self._claims['ci_estudiante']:
+                    self._estudiante = Estudiante.objects.filter(ci=self._claims['ci_estudiante']).first()
+            elif self.autenticado:
+                self._estudiante = Estudiante.objects.filter(usuario=self.user).first()
+        return self._estudiante
+
+    @property
+    def ci_docente(self):
+        """CI del docente vinculado; sin consulta si viene en el token"""
+        if self._claims is not None:
+            return self._claims['ci_docente']
+        return self.docente.ci if self.docente else None
+
+    @property
+    def ci_estudiante(self):
+        """CI del estudiante vinculado; sin consulta si viene en el token"""
+        if self._claims is not None:
+            return self._claims['ci_estudiante']
+        return self.estudiante.ci if self.estudiante else None
+
+    @property
+    def asignaciones(self):
+        """Pares (codigo_curso, codigo_materia) asignados activamente al docente"""
+        if self._asignaciones is None:
+            self._asignaciones = frozenset()
+            if self.ci_docente is not None:
+                from apps.teachers.models import AsignacionCurso
+                self._asignaciones = frozenset(AsignacionCurso.objects.filter(
+                    ci_docente=self.ci_docente,
+                    is_active=True
+                ).values_list('codigo_curso', 'codigo_materia'))
+        return self._asignaciones
+
+    @property
+    def cursos_asignados(self):
+        return {curso for curso, _ in self.asignaciones}
+
+    def tiene_asignacion(self, codigo_curso, codigo_materia):
+        return (codigo_curso, codigo_materia) in self.asignaciones
+
+    def filtro_asignaciones(self, prefijo=''):
+        """
+        Q que restringe a las materia-curso asignadas al docente, para modelos
+        con codigo_curso y codigo_materia (opcionalmente bajo `prefijo`).
+        None si el docente no tiene asignaciones: quien lo usa devuelve un
+        queryset vacío. Un Q() vacío no filtraría nada y mostraría todas las
+        filas a un docente sin asignaciones.
+        """
+        filtro = Q()
+        for curso, materia in sorted(self.asignaciones):
+            filtro |= Q(**{
+                f'{prefijo}codigo_curso': curso,
+                f'{prefijo}codigo_materia': materia
+            })
+        return filtro if filtro else None
+
+
+def obtener_contexto(request):
+    """
+    Devuelve el ContextoIdentidad del usuario autenticado en la solicitud,
+    creándolo la primera vez. Se guarda sobre la HttpRequest subyacente para
+    que permisos, vistas y serializers de la misma solicitud lo compartan.
+    """
+    http_request = getattr(request, '_request', request)
+    user = request.user
+    contexto = getattr(http_request, '_contexto_identidad', None)
+    if contexto is None or contexto.user is not user:
+        contexto = ContextoIdentidad(user)
+        http_request._contexto_identidad = contexto
+    return contexto
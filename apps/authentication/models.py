@@ -1,8 +1,8 @@
 # apps/authentication/models.py:
 
 from django.db import models
-from django.contrib.auth.models import Group, Permission
-from django.db.models.signals import post_migrate
+from django.contrib.auth.models import User, Group, Permission
+from django.db.models.signals import post_migrate, pre_save, post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 
 class RoleManager:
@@ -24,8 +24,87 @@ class RoleManager:
         
         return admin_group, teacher_group, student_group
 
+class VersionToken(models.Model):
+    """
+    Versión de las claims de identidad de un usuario. Se incrementa cuando
+    cambian sus grupos, banderas o perfil vinculado, invalidando las claims
+    de los tokens emitidos antes del cambio.
+    """
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='version_token')
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'version_token'
+        verbose_name = 'Versión de Token'
+        verbose_name_plural = 'Versiones de Token'
+    
+    def __str__(self):
+        return f"{self.usuario_id} v{self.version}"
+
 @receiver(post_migrate)
 def create_default_groups(sender, **kwargs):
     """Crear grupos automáticamente después de las migraciones"""
     if sender.name == 'apps.authentication':
-        RoleManager.create_default_groups()
\ No newline at end of file
+        RoleManager.create_default_groups()
+
+CAMPOS_CLAIMS_USUARIO = ('is_active', 'is_staff', 'is_superuser')
+
+@receiver(pre_save, sender=User)
+def detectar_cambio_banderas(sender, instance, **kwargs):
+    """Marca al usuario si cambian las banderas que viajan en el token"""
+    instance._banderas_cambiadas = False
+    update_fields = kwargs.get('update_fields')
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(CAMPOS_CLAIMS_USUARIO)):
+        return
+    anteriores = User.objects.filter(pk=instance.pk).values(*CAMPOS_CLAIMS_USUARIO).first()
+    instance._banderas_cambiadas = anteriores is not None and any(
+        anteriores[campo] != getattr(instance, campo) for campo in CAMPOS_CLAIMS_USUARIO
+    )
+
+@receiver(post_save, sender=User)
+def invalidar_usuario(sender, instance, **kwargs):
+    """Cualquier guardado descarta el usuario cacheado; las banderas además invalidan el token"""
+    from .services import UsuariosCache, VersionesToken
+    if getattr(instance, '_banderas_cambiadas', False):
+        VersionesToken.incrementar(instance.pk)
+    else:
+        UsuariosCache.invalidar(instance.pk)
+
+@receiver(post_delete, sender=User)
+def invalidar_usuario_eliminado(sender, instance, **kwargs):
+    from .services import VersionesToken
+    VersionesToken.descartar(instance.pk)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_por_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cambios de grupos, tanto user.groups como group.user_set"""
+    from .services import VersionesToken
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            VersionesToken.incrementar(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        VersionesToken.incrementar(*pk_set)
+    elif action == 'pre_clear':
+        VersionesToken.incrementar(*instance.user_set.values_list('pk', flat=True))
+
+@receiver(pre_delete, sender=Group)
+def invalidar_por_grupo_eliminado(sender, instance, **kwargs):
+    from .services import VersionesToken
+    VersionesToken.incrementar(*instance.user_set.values_list('pk', flat=True))
+
+def detectar_cambio_perfil(sender, instance, **kwargs):
+    """Invalida las claims si el docente/estudiante se vincula a otro usuario"""
+    anterior = sender.objects.filter(pk=instance.pk).values_list('usuario_id', flat=True).first()
+    if anterior != instance.usuario_id:
+        from .services import VersionesToken
+        VersionesToken.incrementar(*(pk for pk in (anterior, instance.usuario_id) if pk))
+
+def invalidar_por_perfil_eliminado(sender, instance, **kwargs):
+    if instance.usuario_id:
+        from .services import VersionesToken
+        VersionesToken.incrementar(instance.usuario_id)
+
+for perfil in ('teachers.Docente', 'students.Estudiante'):
+    pre_save.connect(detectar_cambio_perfil, sender=perfil, dispatch_uid=f'claims_perfil_{perfil}')
+    post_delete.connect(invalidar_por_perfil_eliminado, sender=perfil, dispatch_uid=f'claims_perfil_eliminado_{perfil}')
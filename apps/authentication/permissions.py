@@ -1,6 +1,7 @@
 #apps/authentication/permissions.py:
 
 from rest_framework.permissions import BasePermission
+from .contexto import obtener_contexto
 
 class IsAdministradorOrReadOnly(BasePermission):
     """
@@ -14,7 +15,7 @@ class IsAdministradorOrReadOnly(BasePermission):
         
         # Permisos de escritura solo para administradores
         return (request.user.is_authenticated and 
-                request.user.groups.filter(name='Administrador').exists())
+                obtener_contexto(request).es_administrador)
 
 class IsAdministrador(BasePermission):
     """
@@ -22,7 +23,7 @@ class IsAdministrador(BasePermission):
     """
     def has_permission(self, request, view):
         return (request.user.is_authenticated and 
-                request.user.groups.filter(name='Administrador').exists())
+                obtener_contexto(request).es_administrador)
 
 class IsDocenteOrAdministrador(BasePermission):
     """
@@ -30,7 +31,7 @@ class IsDocenteOrAdministrador(BasePermission):
     """
     def has_permission(self, request, view):
         return (request.user.is_authenticated and 
-                request.user.groups.filter(name__in=['Docente', 'Administrador']).exists())
+                obtener_contexto(request).tiene_rol('Docente', 'Administrador'))
 
 class IsOwnerOrAdministrador(BasePermission):
     """
@@ -38,11 +39,11 @@ class IsOwnerOrAdministrador(BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Administradores tienen acceso total
-        if request.user.groups.filter(name='Administrador').exists():
+        if obtener_contexto(request).es_administrador:
             return True
         
         # Verificar si el usuario es propietario del objeto
         if hasattr(obj, 'usuario'):
-            return obj.usuario == request.user
+            return obj.usuario_id == request.user.pk
         
         return False
\ No newline at end of file
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth.models import User, Group, Permission
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import TokenIdentidad
 from django.contrib.contenttypes.models import ContentType
 
 class UserSerializer(serializers.ModelSerializer):
@@ -82,6 +84,10 @@ class TokenSerializer(serializers.Serializer):
     refresh = serializers.CharField()
     user = UserSerializer()
 
+class TokenRefreshIdentidadSerializer(TokenRefreshSerializer):
+    """Refresh que recalcula las claims de identidad si su versión quedó desactualizada"""
+    token_class = TokenIdentidad
+
 class ContentTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContentType
@@ -0,0 +1,115 @@
+#apps/authentication/services.py:
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from django.utils import timezone
+from .models import VersionToken
+
+
+def cache_compartida():
+    """
+    True si la caché por defecto es compartida entre procesos (Redis,
+    Memcached, base de datos...). Con la caché en memoria local, lo que
+    invalidan las señales solo se borra en el proceso que hizo el cambio.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+class VersionesToken:
+    """
+    Versión vigente de las claims de identidad por usuario (tabla version_token).
+    Se cachea solo si la caché es compartida: con caché local cada proceso
+    consulta la tabla, para que desactivar o cambiar los roles de un usuario
+    se vea en todos los workers en la solicitud siguiente.
+    """
+
+    TTL = 60
+
+    @staticmethod
+    def _clave(user_id):
+        return f'auth:version_token:{user_id}'
+
+    # Versión de un usuario inexistente: no coincide con la de ningún token
+    SIN_USUARIO = -1
+
+    @classmethod
+    def actual(cls, user_id):
+        """Versión vigente del usuario; con caché compartida, una consulta solo si no está en caché"""
+        compartida = cache_compartida()
+        version = cache.get(cls._clave(user_id)) if compartida else None
+        if version is None:
+            filas = list(User.objects.filter(pk=user_id).values_list('version_token__version', flat=True)[:1])
+            version = (filas[0] or 0) if filas else cls.SIN_USUARIO
+            if compartida:
+                cache.set(cls._clave(user_id), version, cls.TTL)
+        return version
+
+    @classmethod
+    def descartar(cls, *user_ids):
+        """Quita de la caché la versión de usuarios eliminados"""
+        cache.delete_many([cls._clave(user_id) for user_id in user_ids])
+        UsuariosCache.invalidar(*user_ids)
+
+    @classmethod
+    def incrementar(cls, *user_ids):
+        """Invalida las claims emitidas para los usuarios indicados"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        existentes = set(VersionToken.objects.filter(
+            usuario_id__in=user_ids
+        ).values_list('usuario_id', flat=True))
+        if existentes:
+            VersionToken.objects.filter(usuario_id__in=existentes).update(
+                version=F('version') + 1, updated_at=timezone.now()
+            )
+        VersionToken.objects.bulk_create(
+            [VersionToken(usuario_id=user_id, version=1) for user_id in user_ids - existentes],
+            ignore_conflicts=True
+        )
+        cache.delete_many([cls._clave(user_id) for user_id in user_ids])
+        UsuariosCache.invalidar(*user_ids)
+
+
+class UsuariosCache:
+    """
+    Caché de la resolución token -> User (con sus grupos) para la autenticación
+    JWT. Cada entrada guarda la versión de token con la que se construyó y deja
+    de usarse si la versión cambia; las señales de User la eliminan ante
+    cualquier guardado o cambio de grupos.
+
+    Con caché local la versión se lee siempre de la base, así que los cambios
+    de roles y banderas se ven enseguida; los demás datos del User (email,
+    nombre) pueden tardar hasta TTL_LOCAL en verse en los otros procesos.
+    """
+
+    TTL = 30
+    TTL_LOCAL = 5
+
+    @staticmethod
+    def _clave(user_id):
+        return f'auth:usuario:{user_id}'
+
+    @classmethod
+    def obtener(cls, user_id):
+        """User con `roles_identidad` precargado, o None si no existe"""
+        version = VersionesToken.actual(user_id)
+        entrada = cache.get(cls._clave(user_id))
+        if entrada is not None and entrada[0] == version:
+            user, roles = entrada[1], entrada[2]
+        else:
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return None
+            roles = list(user.groups.values_list('name', flat=True))
+            ttl = cls.TTL if cache_compartida() else cls.TTL_LOCAL
+            cache.set(cls._clave(user_id), (version, user, roles), ttl)
+        user.roles_identidad = roles
+        return user
+
+    @classmethod
+    def invalidar(cls, *user_ids):
+        cache.delete_many([cls._clave(user_id) for user_id in user_ids])
@@ -1,3 +1,101 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import VersionToken
+from .services import UsuariosCache, VersionesToken, cache_compartida
+from .tokens import CLAIM_ACTIVO, CLAIM_ROLES, CLAIM_VERSION, TokenIdentidad, UsuarioToken
+
+URL_PERFIL = '/api/auth/profile/'
+
+
+class TokenIdentidadTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('docente', password='clave12345')
+        self.usuario.groups.add(Group.objects.get_or_create(name='Docente')[0])
+        self.client = APIClient()
+
+    def autenticar(self):
+        token = TokenIdentidad.for_user(self.usuario).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return token
+
+    def test_claims_de_identidad_en_el_token(self):
+        token = self.autenticar()
+        self.assertEqual(token[CLAIM_ROLES], ['Docente'])
+        self.assertIs(token[CLAIM_ACTIVO], True)
+        self.assertEqual(token[CLAIM_VERSION], VersionesToken.actual(self.usuario.pk))
+        self.assertIs(UsuarioToken(token).is_active, True)
+
+        respuesta = self.client.get(URL_PERFIL)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['username'], 'docente')
+
+    def test_usuario_desactivado_no_puede_leer(self):
+        self.autenticar()
+        self.assertEqual(self.client.get(URL_PERFIL).status_code, 200)
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get(URL_PERFIL).status_code, 401)
+
+    def test_usuario_eliminado_no_puede_leer(self):
+        self.autenticar()
+        self.assertEqual(self.client.get(URL_PERFIL).status_code, 200)
+
+        self.usuario.delete()
+        self.assertEqual(self.client.get(URL_PERFIL).status_code, 401)
+
+    def test_cambio_de_grupos_invalida_las_claims(self):
+        token = self.autenticar()
+        self.usuario.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+        self.assertNotEqual(token[CLAIM_VERSION], VersionesToken.actual(self.usuario.pk))
+        # Las claims viejas ya no se usan: el usuario se resuelve desde la base
+        respuesta = self.client.get(URL_PERFIL)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('Administrador', respuesta.data['groups'])
+
+
+class CacheIdentidadTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('docente', password='clave12345')
+
+    def incrementar_en_otro_proceso(self):
+        # Otro worker incrementa la versión: su señal no borra esta caché
+        VersionToken.objects.update_or_create(usuario=self.usuario, defaults={'version': 7})
+
+    def test_cache_local_lee_la_version_de_la_base(self):
+        self.assertFalse(cache_compartida())
+        cache.set(VersionesToken._clave(self.usuario.pk), 0)
+        self.incrementar_en_otro_proceso()
+        self.assertEqual(VersionesToken.actual(self.usuario.pk), 7)
+
+    def test_usuario_cacheado_se_descarta_si_cambia_la_version(self):
+        self.assertEqual(UsuariosCache.obtener(self.usuario.pk).is_active, True)
+        User.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.incrementar_en_otro_proceso()
+        self.assertEqual(UsuariosCache.obtener(self.usuario.pk).is_active, False)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'aula-tests-cache'),
+    }})
+    def test_cache_compartida_guarda_la_version_y_la_invalida(self):
+        cache.clear()
+        self.assertTrue(cache_compartida())
+        self.assertEqual(VersionesToken.actual(self.usuario.pk), 0)
+        self.assertEqual(cache.get(VersionesToken._clave(self.usuario.pk)), 0)
+
+        self.usuario.groups.add(Group.objects.get_or_create(name='Docente')[0])
+        self.assertIsNone(cache.get(VersionesToken._clave(self.usuario.pk)))
+        self.assertEqual(VersionesToken.actual(self.usuario.pk), 1)
+        cache.clear()
@@ -0,0 +1,98 @@
+#apps/authentication/tokens.py:
+
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .services import UsuariosCache, VersionesToken
+
+CLAIM_ROLES = 'roles'
+CLAIM_DOCENTE = 'ci_docente'
+CLAIM_ESTUDIANTE = 'ci_estudiante'
+CLAIM_ACTIVO = 'is_active'
+CLAIM_STAFF = 'is_staff'
+CLAIM_SUPERUSUARIO = 'is_superuser'
+CLAIM_VERSION = 'ver'
+
+
+def claims_identidad(user):
+    """Claims de identidad que viajan en el token: roles, perfil vinculado y versión"""
+    from apps.teachers.models import Docente
+    from apps.students.models import Estudiante
+    return {
+        CLAIM_ROLES: sorted(user.groups.values_list('name', flat=True)),
+        CLAIM_DOCENTE: Docente.objects.filter(usuario=user).values_list('ci', flat=True).first(),
+        CLAIM_ESTUDIANTE: Estudiante.objects.filter(usuario=user).values_list('ci', flat=True).first(),
+        CLAIM_ACTIVO: user.is_active,
+        CLAIM_STAFF: user.is_staff,
+        CLAIM_SUPERUSUARIO: user.is_superuser,
+        CLAIM_VERSION: VersionesToken.actual(user.pk),
+    }
+
+
+class TokenIdentidad(RefreshToken):
+    """Refresh token que incluye (y copia al access token) las claims de identidad"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(claims_identidad(user))
+        return token
+
+    @property
+    def access_token(self):
+        # Al refrescar, las claims desactualizadas se recalculan desde la base
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None and self.payload.get(CLAIM_VERSION) != VersionesToken.actual(user_id):
+            user = User.objects.filter(pk=user_id).first()
+            if user is not None:
+                self.payload.update(claims_identidad(user))
+        return super().access_token
+
+
+class UsuarioToken:
+    """
+    Usuario autenticado solo con las claims del token: id, roles, perfil y
+    banderas no consultan la base. Cualquier otro atributo (email, groups,
+    permisos...) carga el User real la primera vez que se pide.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.token = token
+        self.id = self.pk = token[api_settings.USER_ID_CLAIM]
+        self.is_active = token.get(CLAIM_ACTIVO, False)
+        self.is_staff = token.get(CLAIM_STAFF, False)
+        self.is_superuser = token.get(CLAIM_SUPERUSUARIO, False)
+
+    @property
+    def claims_identidad(self):
+        return {
+            CLAIM_ROLES: self.token.get(CLAIM_ROLES, []),
+            CLAIM_DOCENTE: self.token.get(CLAIM_DOCENTE),
+            CLAIM_ESTUDIANTE: self.token.get(CLAIM_ESTUDIANTE),
+        }
+
+    @cached_property
+    def usuario_bd(self):
+        user = UsuariosCache.obtener(self.id)
+        if user is None:
+            raise User.DoesNotExist(self.id)
+        return user
+
+    def __getattr__(self, nombre):
+        if nombre.startswith('__'):
+            raise AttributeError(nombre)
+        return getattr(self.usuario_bd, nombre)
+
+    def __eq__(self, otro):
+        if isinstance(otro, (User, UsuarioToken)):
+            return self.pk == otro.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.usuario_bd)
@@ -3,6 +3,7 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import TokenIdentidad
 from django.contrib.auth.models import User, Group, Permission
 from django.contrib.auth import update_session_auth_hash
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -15,6 +16,7 @@ from .serializers import (
     UserUpdateSerializer, PasswordChangeSerializer, ProfileUpdateSerializer,
     AdminPasswordResetSerializer
 )
+from .contexto import obtener_contexto
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -23,7 +25,7 @@ def login_view(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = TokenIdentidad.for_user(user)
         
         return Response({
             'access': str(refresh.access_token),
@@ -37,7 +39,7 @@ def login_view(request):
 def register_view(request):
     """Registrar nuevo usuario (solo administradores)"""
     # Verificar que el usuario que hace la petición es administrador
-    if not request.user.groups.filter(name='Administrador').exists() and not request.user.is_staff:
+    if not obtener_contexto(request).es_administrador and not request.user.is_staff:
         return Response(
             {'error': 'Solo administradores pueden crear usuarios'}, 
             status=status.HTTP_403_FORBIDDEN
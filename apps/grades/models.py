@@ -48,6 +48,9 @@ class Nota(models.Model):
         verbose_name = 'Nota'
         verbose_name_plural = 'Notas'
         unique_together = ('codigo_curso', 'codigo_materia', 'ci_estudiante', 'id_criterio')
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='nota_created_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.ci_estudiante.nombre_completo} - {self.codigo_materia.nombre}: {self.nota}"
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from django.db.models import Avg
+from decimal import Decimal
 from .models import ActaNota, Nota
 
 class ActaNotaSerializer(serializers.ModelSerializer):
@@ -100,4 +101,27 @@ class RendimientoEstudianteSerializer(serializers.Serializer):
     curso = serializers.DictField()
     materias = serializers.ListField()
     promedio_general = serializers.DecimalField(max_digits=5, decimal_places=2)
-    estado_general = serializers.CharField()
\ No newline at end of file
+    estado_general = serializers.CharField()
+
+class CerrarActasSerializer(serializers.Serializer):
+    """Serializer para el cierre masivo de actas de un curso"""
+    FUENTES_CHOICES = [
+        ('notas_finales', 'Notas finales por período'),
+        ('notas', 'Promedio de notas'),
+    ]
+    
+    codigo_curso = serializers.CharField()
+    codigo_materia = serializers.CharField(required=False)
+    fuente = serializers.ChoiceField(choices=FUENTES_CHOICES, default='notas_finales')
+    nota_minima = serializers.DecimalField(max_digits=5, decimal_places=2, default=Decimal('51'))
+    
+    def validate_codigo_curso(self, value):
+        from apps.courses.models import Curso
+        if not Curso.objects.filter(codigo=value).exists():
+            raise serializers.ValidationError("Curso no encontrado")
+        return value
+    
+    def validate_nota_minima(self, value):
+        if value < 0 or value > 100:
+            raise serializers.ValidationError("La nota mínima debe estar entre 0 y 100")
+        return value
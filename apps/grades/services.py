@@ -0,0 +1,91 @@
+#apps/grades/services.py:
+
+import numpy as np
+import pandas as pd
+
+
+class PlanillaNotas:
+    """Servicio para construir la planilla estudiantes × criterios de un período"""
+
+    COLUMNAS = [
+        'ci', 'nombre', 'apellido',
+        'criterio', 'descripcion',
+        'campo', 'campo_nombre', 'campo_valor',
+        'nota'
+    ]
+
+    CAMPOS_CONSULTA = [
+        'ci_estudiante', 'ci_estudiante__nombre', 'ci_estudiante__apellido',
+        'id_criterio', 'id_criterio__descripcion',
+        'id_criterio__codigo_campo', 'id_criterio__codigo_campo__nombre',
+        'id_criterio__codigo_campo__valor',
+        'nota'
+    ]
+
+    @staticmethod
+    def _a_lista(valores):
+        """Convierte un arreglo de floats a lista JSON (NaN -> None)"""
+        return [None if np.isnan(valor) else round(float(valor), 2) for valor in valores]
+
+    @classmethod
+    def construir(cls, queryset):
+        """Obtiene las notas en una sola consulta y las pivotea en memoria"""
+        filas = list(queryset.values_list(*cls.CAMPOS_CONSULTA))
+
+        if not filas:
+            return {
+                'estudiantes': [],
+                'criterios': [],
+                'campos': [],
+                'notas': [],
+                'subtotales': [],
+                'nota_final': []
+            }
+
+        df = pd.DataFrame.from_records(filas, columns=cls.COLUMNAS)
+        df['nota'] = df['nota'].astype(float)
+        df['campo_valor'] = df['campo_valor'].astype(float)
+
+        estudiantes = df[['ci', 'nombre', 'apellido']].drop_duplicates('ci').sort_values(['apellido', 'nombre'])
+        criterios = df[['criterio', 'descripcion', 'campo']].drop_duplicates('criterio').sort_values(['campo', 'criterio'])
+        campos = df[['campo', 'campo_nombre', 'campo_valor']].drop_duplicates('campo').sort_values('campo')
+
+        matriz = df.pivot(index='ci', columns='criterio', values='nota').reindex(
+            index=estudiantes['ci'], columns=criterios['criterio']
+        ).to_numpy()
+
+        # Matriz indicadora criterio -> campo para calcular subtotales vectorialmente
+        indicador = (
+            criterios['campo'].to_numpy()[:, None] == campos['campo'].to_numpy()[None, :]
+        ).astype(float)
+        con_nota = ~np.isnan(matriz)
+        sumas = np.nan_to_num(matriz) @ indicador
+        cantidades = con_nota.astype(float) @ indicador
+        promedios = np.divide(
+            sumas, cantidades,
+            out=np.full_like(sumas, np.nan), where=cantidades > 0
+        )
+
+        # Nota ponderada por campo y nota final del período (igual que CalculadoraNotas)
+        subtotales = promedios * campos['campo_valor'].to_numpy() / 100
+        nota_final = np.where(
+            (cantidades > 0).any(axis=1), np.nansum(subtotales, axis=1), np.nan
+        )
+
+        return {
+            'estudiantes': [
+                {'ci': fila.ci, 'nombre_completo': f"{fila.nombre} {fila.apellido}"}
+                for fila in estudiantes.itertuples()
+            ],
+            'criterios': [
+                {'id': int(fila.criterio), 'descripcion': fila.descripcion, 'campo': fila.campo}
+                for fila in criterios.itertuples()
+            ],
+            'campos': [
+                {'codigo': fila.campo, 'nombre': fila.campo_nombre, 'valor': int(fila.campo_valor)}
+                for fila in campos.itertuples()
+            ],
+            'notas': [cls._a_lista(fila) for fila in matriz],
+            'subtotales': [cls._a_lista(fila) for fila in subtotales],
+            'nota_final': cls._a_lista(nota_final)
+        }
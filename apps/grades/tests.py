@@ -1,3 +1,235 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.db.models import Avg
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.courses.models import Campo, Criterio, Curso, Periodo
+from apps.students.models import Estudiante
+from apps.subjects.models import Materia
+from apps.teachers.models import AsignacionCurso, Docente
+from .models import ActaNota, Nota
+from .views import NotaViewSet
+
+
+class NotasBaseTestCase(TestCase):
+    """Curso, materias, criterios y estudiantes comunes; el cliente entra como administrador"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(codigo='C1', nombre='1A', nivel='1', paralelo='A', gestion=2026)
+        cls.materias = [
+            Materia.objects.create(codigo='M1', nombre='Matemática'),
+            Materia.objects.create(codigo='M2', nombre='Lenguaje'),
+        ]
+        periodo = Periodo.objects.create(codigo='P1', nombre='Primer trimestre')
+        campo = Campo.objects.create(codigo='SABER', nombre='Saber', valor=45)
+        cls.criterios = [
+            Criterio.objects.create(descripcion=f'Criterio {i}', codigo_campo=campo, codigo_periodo=periodo)
+            for i in range(5)
+        ]
+        cls.estudiantes = [
+            Estudiante.objects.create(
+                ci=f'E{i}', nombre=f'Nombre{i}', apellido=f'Apellido{i}',
+                email=f'e{i}@colegio.com', fecha_nacimiento=date(2012, 1, 1)
+            )
+            for i in range(3)
+        ]
+        cls.admin = User.objects.create_user('admin', password='clave12345')
+        cls.admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def calificar(self, estudiante, materia, criterio, nota):
+        return Nota.objects.create(
+            codigo_curso=self.curso, codigo_materia=materia, ci_estudiante=estudiante,
+            id_criterio=criterio, nota=Decimal(nota)
+        )
+
+
+class NotasPorEstudianteTests(NotasBaseTestCase):
+    URL = '/api/grades/notas/por_estudiante/?ci_estudiante=E0'
+
+    def setUp(self):
+        super().setUp()
+        for materia in self.materias:
+            for criterio in self.criterios:
+                self.calificar(self.estudiantes[0], materia, criterio, 80)
+
+    def test_sin_materia_acota_las_notas_de_cada_materia(self):
+        respuesta = self.client.get(f'{self.URL}&page_size=2')
+        self.assertEqual(respuesta.status_code, 200)
+        for materia in respuesta.data:
+            self.assertEqual(materia['total_notas'], 5)
+            self.assertEqual(len(materia['notas']), 2)
+            self.assertTrue(materia['notas_truncadas'])
+            # Se conservan las más recientes
+            self.assertEqual([nota['criterio'] for nota in materia['notas']], ['Criterio 3', 'Criterio 4'])
+
+    def test_con_materia_pagina_el_detalle(self):
+        respuesta = self.client.get(f'{self.URL}&codigo_materia=M1&page_size=2')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['count'], 5)
+        self.assertEqual(len(respuesta.data['results']), 2)
+        self.assertEqual(respuesta.data['resumen']['total_notas'], 5)
+
+    def test_solo_resumen(self):
+        respuesta = self.client.get(f'{self.URL}&solo_resumen=true')
+        self.assertEqual(
+            [(materia['materia_codigo'], materia['promedio']) for materia in respuesta.data],
+            [('M2', 80.0), ('M1', 80.0)]
+        )
+
+
+class CerrarActasTests(NotasBaseTestCase):
+    URL = '/api/grades/actas/cerrar_actas/'
+
+    def setUp(self):
+        super().setUp()
+        notas = {('E0', 'M1'): [60, 70], ('E1', 'M1'): [30, 40], ('E0', 'M2'): [51]}
+        for (ci, codigo_materia), valores in notas.items():
+            estudiante = Estudiante.objects.get(ci=ci)
+            materia = Materia.objects.get(codigo=codigo_materia)
+            for criterio, valor in zip(self.criterios, valores):
+                self.calificar(estudiante, materia, criterio, valor)
+        for estudiante in self.estudiantes:
+            for materia in self.materias:
+                ActaNota.objects.create(codigo_curso=self.curso, codigo_materia=materia, ci_estudiante=estudiante)
+
+    def estados(self):
+        return dict(
+            ((ci, materia), estado) for ci, materia, estado in
+            ActaNota.objects.values_list('ci_estudiante', 'codigo_materia', 'estado')
+        )
+
+    def test_cierra_actas_con_resultado_y_deja_las_demas(self):
+        respuesta = self.client.post(self.URL, {'codigo_curso': 'C1', 'fuente': 'notas'}, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(
+            {clave: respuesta.data[clave] for clave in ('total_actas', 'actas_cerradas', 'aprobados', 'reprobados', 'sin_notas')},
+            {'total_actas': 6, 'actas_cerradas': 3, 'aprobados': 2, 'reprobados': 1, 'sin_notas': 3}
+        )
+        estados = self.estados()
+        self.assertEqual(estados[('E0', 'M1')], 'APROBADO')
+        self.assertEqual(estados[('E0', 'M2')], 'APROBADO')
+        self.assertEqual(estados[('E1', 'M1')], 'REPROBADO')
+        self.assertEqual(estados[('E2', 'M1')], 'EN_CURSO')
+
+    def test_filtra_por_materia_y_no_reabre_actas_cerradas(self):
+        ActaNota.objects.filter(ci_estudiante='E1', codigo_materia='M1').update(estado='APROBADO')
+        respuesta = self.client.post(
+            self.URL, {'codigo_curso': 'C1', 'codigo_materia': 'M1', 'fuente': 'notas'}, format='json'
+        )
+        self.assertEqual(respuesta.data['total_actas'], 2)
+        self.assertEqual(respuesta.data['actas_cerradas'], 1)
+        self.assertEqual(self.estados()[('E1', 'M1')], 'APROBADO')
+        self.assertEqual(self.estados()[('E0', 'M2')], 'EN_CURSO')
+
+    def test_solo_administradores(self):
+        self.client.force_authenticate(User.objects.create_user('docente', password='clave12345'))
+        respuesta = self.client.post(self.URL, {'codigo_curso': 'C1'}, format='json')
+        self.assertEqual(respuesta.status_code, 403)
+
+
+class PlanillaTests(NotasBaseTestCase):
+    URL = '/api/grades/notas/planilla/?codigo_curso=C1&codigo_materia=M1&codigo_periodo=P1'
+
+    def setUp(self):
+        super().setUp()
+        hacer = Campo.objects.create(codigo='HACER', nombre='Hacer', valor=40)
+        periodo = self.criterios[0].codigo_periodo
+        criterios = self.criterios + [
+            Criterio.objects.create(descripcion='Práctica', codigo_campo=hacer, codigo_periodo=periodo)
+        ]
+        valores = {'E0': [70, 80, None, 90, None, 60], 'E1': [55, None, None, None, None, None]}
+        for ci, notas in valores.items():
+            estudiante = Estudiante.objects.get(ci=ci)
+            for criterio, valor in zip(criterios, notas):
+                if valor is not None:
+                    self.calificar(estudiante, self.materias[0], criterio, valor)
+        # Otra materia no entra en la planilla
+        self.calificar(self.estudiantes[0], self.materias[1], self.criterios[0], 10)
+
+    def nota_final_esperada(self, ci):
+        """Regla de CalculadoraNotas: promedio por campo ponderado por su valor"""
+        total = 0
+        for campo in Campo.objects.all():
+            promedio = Nota.objects.filter(
+                ci_estudiante=ci, codigo_materia='M1', id_criterio__codigo_campo=campo
+            ).aggregate(promedio=Avg('nota'))['promedio']
+            if promedio is not None:
+                total += float(promedio) * campo.valor / 100
+        return round(total, 2)
+
+    def test_matriz_y_nota_final_coinciden_con_el_calculo_por_estudiante(self):
+        respuesta = self.client.get(self.URL)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.data
+
+        cis = [estudiante['ci'] for estudiante in datos['estudiantes']]
+        self.assertEqual(cis, ['E0', 'E1'])
+        ids = [criterio['id'] for criterio in datos['criterios']]
+        for ci, fila in zip(cis, datos['notas']):
+            esperadas = dict(Nota.objects.filter(ci_estudiante=ci, codigo_materia='M1').values_list('id_criterio', 'nota'))
+            self.assertEqual(
+                fila, [float(esperadas[i]) if i in esperadas else None for i in ids]
+            )
+        self.assertEqual(datos['nota_final'], [self.nota_final_esperada(ci) for ci in cis])
+
+    def test_periodo_sin_notas(self):
+        respuesta = self.client.get(self.URL.replace('P1', 'P9'))
+        self.assertEqual(respuesta.data['notas'], [])
+
+
+class PaginacionCursorTests(NotasBaseTestCase):
+
+    def test_recorrido_por_cursor_usa_el_indice_de_la_clave(self):
+        indices = {tuple(indice.fields) for indice in Nota._meta.indexes}
+        self.assertIn(NotaViewSet.orden_cursor, indices)
+
+        for estudiante in self.estudiantes:
+            for criterio in self.criterios[:3]:
+                self.calificar(estudiante, self.materias[0], criterio, 70)
+        esperado = list(Nota.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        obtenido = []
+        url = '/api/grades/notas/?paginacion=cursor&page_size=4'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            obtenido += [fila['id'] for fila in respuesta.data['results']]
+            url = respuesta.data['next']
+        self.assertEqual(obtenido, esperado)
+
+
+class FiltroDocenteTests(NotasBaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for materia in self.materias:
+            self.calificar(self.estudiantes[0], materia, self.criterios[0], 70)
+            ActaNota.objects.create(codigo_curso=self.curso, codigo_materia=materia, ci_estudiante=self.estudiantes[0])
+        usuario = User.objects.create_user('docente', password='clave12345')
+        usuario.groups.add(Group.objects.get_or_create(name='Docente')[0])
+        self.docente = Docente.objects.create(
+            ci='D1', nombre='Docente', apellido='Uno', email='d1@colegio.com',
+            telefono='70000000', fecha_ingreso=date(2020, 2, 1), usuario=usuario
+        )
+        self.client.force_authenticate(usuario)
+
+    def materias_visibles(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return sorted({fila['codigo_materia'] for fila in respuesta.data['results']})
+
+    def test_docente_sin_asignaciones_no_ve_notas_ni_actas(self):
+        self.assertEqual(self.materias_visibles('/api/grades/notas/'), [])
+        self.assertEqual(self.materias_visibles('/api/grades/actas/'), [])
 
-# Create your tests here.
+    def test_docente_solo_ve_sus_asignaciones(self):
+        AsignacionCurso.objects.create(codigo_curso=self.curso, codigo_materia=self.materias[1], ci_docente=self.docente)
+        self.assertEqual(self.materias_visibles('/api/grades/notas/'), ['M2'])
+        self.assertEqual(self.materias_visibles('/api/grades/actas/'), ['M2'])
@@ -6,13 +6,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Case, When, Value, Window
+from django.db.models.functions import RowNumber
+from django.db import transaction
+from django.utils import timezone
 from .models import ActaNota, Nota
 from .serializers import (
     ActaNotaSerializer, NotaSerializer, NotaCreateSerializer, 
-    NotaDetailSerializer, RendimientoEstudianteSerializer
+    NotaDetailSerializer, RendimientoEstudianteSerializer, CerrarActasSerializer
 )
 from apps.authentication.permissions import IsAdministradorOrReadOnly, IsDocenteOrAdministrador
+from apps.authentication.contexto import obtener_contexto
 
 class ActaNotaViewSet(viewsets.ModelViewSet):
     queryset = ActaNota.objects.filter(is_active=True)
@@ -25,39 +29,88 @@ class ActaNotaViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        user = self.request.user
+        contexto = obtener_contexto(self.request)
         
         # Si es docente, solo puede ver actas de sus materias
-        if user.groups.filter(name='Docente').exists():
-            from apps.teachers.models import Docente, AsignacionCurso
-            try:
-                docente = Docente.objects.get(usuario=user)
-                asignaciones = AsignacionCurso.objects.filter(
-                    ci_docente=docente,
-                    is_active=True
-                ).values('codigo_curso', 'codigo_materia')
-                
-                # Filtrar por asignaciones del docente
-                filters = Q()
-                for asignacion in asignaciones:
-                    filters |= Q(
-                        codigo_curso=asignacion['codigo_curso'],
-                        codigo_materia=asignacion['codigo_materia']
-                    )
-                queryset = queryset.filter(filters)
-            except Docente.DoesNotExist:
-                queryset = queryset.none()
+        if contexto.es_docente:
+            filtro = contexto.filtro_asignaciones()
+            queryset = queryset.filter(filtro) if filtro is not None else queryset.none()
         
         # Si es estudiante, solo puede ver sus propias actas
-        elif user.groups.filter(name='Estudiante').exists():
-            from apps.students.models import Estudiante
-            try:
-                estudiante = Estudiante.objects.get(usuario=user)
-                queryset = queryset.filter(ci_estudiante=estudiante)
-            except Estudiante.DoesNotExist:
+        elif contexto.es_estudiante:
+            if contexto.ci_estudiante is None:
                 queryset = queryset.none()
+            else:
+                queryset = queryset.filter(ci_estudiante=contexto.ci_estudiante)
         
         return queryset
+    
+    @action(detail=False, methods=['post'])
+    def cerrar_actas(self, request):
+        """Cerrar en lote las actas EN_CURSO de un curso o de un curso-materia"""
+        serializer = CerrarActasSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        filtros = {'codigo_curso': data['codigo_curso'], 'is_active': True}
+        if data.get('codigo_materia'):
+            filtros['codigo_materia'] = data['codigo_materia']
+        
+        # Resultado final por estudiante-materia en una sola consulta agrupada
+        if data['fuente'] == 'notas_finales':
+            from apps.predictions.models import NotaFinalPeriodo
+            promedios = NotaFinalPeriodo.objects.filter(**filtros).values(
+                'ci_estudiante', 'codigo_materia'
+            ).annotate(promedio=Avg('nota_final'))
+        else:
+            promedios = Nota.objects.filter(**filtros).values(
+                'ci_estudiante', 'codigo_materia'
+            ).annotate(promedio=Avg('nota'))
+        
+        resultados = {
+            (fila['ci_estudiante'], fila['codigo_materia']):
+                'APROBADO' if fila['promedio'] >= data['nota_minima'] else 'REPROBADO'
+            for fila in promedios
+        }
+        
+        with transaction.atomic():
+            # Las actas se leen una vez y se cruzan con los resultados en memoria
+            ids = {'APROBADO': [], 'REPROBADO': []}
+            actas = ActaNota.objects.select_for_update().filter(estado='EN_CURSO', **filtros).values_list(
+                'id', 'ci_estudiante', 'codigo_materia'
+            )
+            total_actas = 0
+            for id_acta, ci_estudiante, codigo_materia in actas:
+                total_actas += 1
+                estado = resultados.get((ci_estudiante, codigo_materia))
+                if estado:
+                    ids[estado].append(id_acta)
+            
+            actualizadas = 0
+            if ids['APROBADO'] or ids['REPROBADO']:
+                # Un único UPDATE condicional sobre los ids ya obtenidos
+                actualizadas = ActaNota.objects.filter(
+                    id__in=ids['APROBADO'] + ids['REPROBADO']
+                ).update(
+                    estado=Case(
+                        When(id__in=ids['APROBADO'], then=Value('APROBADO')),
+                        default=Value('REPROBADO')
+                    ),
+                    updated_at=timezone.now()
+                )
+        
+        return Response({
+            'curso': data['codigo_curso'],
+            'materia': data.get('codigo_materia'),
+            'fuente': data['fuente'],
+            'nota_minima': data['nota_minima'],
+            'total_actas': total_actas,
+            'actas_cerradas': actualizadas,
+            'aprobados': len(ids['APROBADO']),
+            'reprobados': len(ids['REPROBADO']),
+            'sin_notas': total_actas - actualizadas
+        })
 
 class NotaViewSet(viewsets.ModelViewSet):
     queryset = Nota.objects.filter(is_active=True)
@@ -74,6 +127,7 @@ class NotaViewSet(viewsets.ModelViewSet):
     ]
     search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido', 'codigo_materia__nombre']
     ordering = ['-created_at']
+    orden_cursor = ('-created_at', '-id')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -84,36 +138,19 @@ class NotaViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        user = self.request.user
+        contexto = obtener_contexto(self.request)
         
         # Si es docente, solo puede ver notas de sus materias
-        if user.groups.filter(name='Docente').exists():
-            from apps.teachers.models import Docente, AsignacionCurso
-            try:
-                docente = Docente.objects.get(usuario=user)
-                asignaciones = AsignacionCurso.objects.filter(
-                    ci_docente=docente,
-                    is_active=True
-                ).values('codigo_curso', 'codigo_materia')
-                
-                filters = Q()
-                for asignacion in asignaciones:
-                    filters |= Q(
-                        codigo_curso=asignacion['codigo_curso'],
-                        codigo_materia=asignacion['codigo_materia']
-                    )
-                queryset = queryset.filter(filters)
-            except Docente.DoesNotExist:
-                queryset = queryset.none()
+        if contexto.es_docente:
+            filtro = contexto.filtro_asignaciones()
+            queryset = queryset.filter(filtro) if filtro is not None else queryset.none()
         
         # Si es estudiante, solo puede ver sus propias notas
-        elif user.groups.filter(name='Estudiante').exists():
-            from apps.students.models import Estudiante
-            try:
-                estudiante = Estudiante.objects.get(usuario=user)
-                queryset = queryset.filter(ci_estudiante=estudiante)
-            except Estudiante.DoesNotExist:
+        elif contexto.es_estudiante:
+            if contexto.ci_estudiante is None:
                 queryset = queryset.none()
+            else:
+                queryset = queryset.filter(ci_estudiante=contexto.ci_estudiante)
         
         return queryset
     
@@ -127,9 +164,17 @@ class NotaViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def por_estudiante(self, request):
-        """Obtener notas agrupadas por estudiante"""
+        """
+        Obtener notas de un estudiante agrupadas por materia.
+        - solo_resumen=true: solo promedios por materia
+        - codigo_materia: detalle paginado de esa materia
+        - sin codigo_materia: las notas más recientes de cada materia, hasta
+          page_size por materia (notas_truncadas indica si hay más)
+        """
         ci_estudiante = request.query_params.get('ci_estudiante')
         codigo_curso = request.query_params.get('codigo_curso')
+        codigo_materia = request.query_params.get('codigo_materia')
+        solo_resumen = request.query_params.get('solo_resumen', 'false').lower() == 'true'
         
         if not ci_estudiante:
             return Response(
@@ -140,32 +185,98 @@ class NotaViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset().filter(ci_estudiante=ci_estudiante)
         if codigo_curso:
             queryset = queryset.filter(codigo_curso=codigo_curso)
+        if codigo_materia:
+            queryset = queryset.filter(codigo_materia=codigo_materia)
+        
+        # Promedios por materia calculados en la base de datos
+        resumen = queryset.values(
+            'codigo_materia', 'codigo_materia__nombre'
+        ).annotate(
+            promedio=Avg('nota'),
+            total_notas=Count('id')
+        ).order_by('codigo_materia__nombre')
         
-        # Agrupar por materia
         materias_data = {}
-        for nota in queryset.select_related('codigo_materia', 'id_criterio'):
-            materia_nombre = nota.id_criterio.descripcion
-            if materia_nombre not in materias_data:
-                materias_data[materia_nombre] = {
-                    'materia': materia_nombre,
-                    'notas': []
-                }
-            
-            materias_data[materia_nombre]['notas'].append({
-                'criterio': nota.id_criterio.descripcion,
-                'nota': float(nota.nota),
-                'fecha': nota.created_at.date(),
-                'observaciones': nota.observaciones
-            })
-        
-        # Calcular promedios por materia
-        for materia_nombre, data in materias_data.items():
-            notas_valores = [nota['nota'] for nota in data['notas']]
-            data['promedio'] = sum(notas_valores) / len(notas_valores) if notas_valores else 0
-            data['total_notas'] = len(notas_valores)
+        for fila in resumen:
+            materias_data[fila['codigo_materia']] = {
+                'materia_codigo': fila['codigo_materia'],
+                'materia': fila['codigo_materia__nombre'],
+                'promedio': round(float(fila['promedio'] or 0), 2),
+                'total_notas': fila['total_notas']
+            }
+        
+        if solo_resumen:
+            return Response(list(materias_data.values()))
+        
+        detalle = queryset.values(
+            'codigo_materia', 'id_criterio__descripcion', 'nota', 'created_at', 'observaciones'
+        ).order_by('codigo_materia', 'created_at', 'id')
+        
+        def formatear(fila):
+            return {
+                'criterio': fila['id_criterio__descripcion'],
+                'nota': float(fila['nota']),
+                'fecha': fila['created_at'].date(),
+                'observaciones': fila['observaciones']
+            }
+        
+        # Detalle paginado de una sola materia
+        if codigo_materia:
+            page = self.paginate_queryset(detalle)
+            if page is not None:
+                response = self.get_paginated_response([formatear(fila) for fila in page])
+                response.data['resumen'] = materias_data.get(codigo_materia)
+                return response
+        
+        # Sin materia se acotan las notas de cada una a las page_size más recientes
+        limite = self.paginator.get_page_size(request) if self.paginator else None
+        if limite:
+            detalle = detalle.annotate(
+                posicion=Window(
+                    RowNumber(),
+                    partition_by='codigo_materia',
+                    order_by=['-created_at', '-id']
+                )
+            ).filter(posicion__lte=limite)
+        
+        for data in materias_data.values():
+            data['notas'] = []
+        for fila in detalle:
+            materias_data[fila['codigo_materia']]['notas'].append(formatear(fila))
+        for data in materias_data.values():
+            data['notas_truncadas'] = len(data['notas']) < data['total_notas']
         
         return Response(list(materias_data.values()))
     
+    @action(detail=False, methods=['get'])
+    def planilla(self, request):
+        """Planilla completa estudiantes × criterios de un curso-materia-período"""
+        codigo_curso = request.query_params.get('codigo_curso')
+        codigo_materia = request.query_params.get('codigo_materia')
+        codigo_periodo = request.query_params.get('codigo_periodo')
+        
+        if not all([codigo_curso, codigo_materia, codigo_periodo]):
+            return Response(
+                {'error': 'codigo_curso, codigo_materia y codigo_periodo son requeridos'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.get_queryset().filter(
+            codigo_curso=codigo_curso,
+            codigo_materia=codigo_materia,
+            id_criterio__codigo_periodo=codigo_periodo
+        )
+        
+        from .services import PlanillaNotas
+        planilla = PlanillaNotas.construir(queryset)
+        
+        return Response({
+            'curso': codigo_curso,
+            'materia': codigo_materia,
+            'periodo': codigo_periodo,
+            **planilla
+        })
+    
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """Obtener estadísticas generales de notas"""
@@ -202,7 +313,8 @@ class NotaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def registro_masivo(self, request):
         """Registrar notas en lote"""
-        if not request.user.groups.filter(name__in=['Docente', 'Administrador']).exists():
+        contexto = obtener_contexto(request)
+        if not contexto.tiene_rol('Docente', 'Administrador'):
             return Response(
                 {'error': 'No tiene permisos para registrar notas'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -231,29 +343,22 @@ class NotaViewSet(viewsets.ModelViewSet):
                 serializer = NotaCreateSerializer(data=nota_data)
                 if serializer.is_valid():
                     # Verificar permisos del docente para esta materia/curso
-                    if request.user.groups.filter(name='Docente').exists():
-                        from apps.teachers.models import Docente, AsignacionCurso
-                        try:
-                            docente = Docente.objects.get(usuario=request.user)
-                            asignacion = AsignacionCurso.objects.filter(
-                                ci_docente=docente,
-                                codigo_curso=nota_data['codigo_curso'],
-                                codigo_materia=nota_data['codigo_materia'],
-                                is_active=True
-                            ).exists()
-                            
-                            if not asignacion:
-                                errores.append({
-                                    'indice': i,
-                                    'error': 'No tiene permisos para registrar notas en esta materia/curso'
-                                })
-                                continue
-                        except Docente.DoesNotExist:
+                    if contexto.es_docente:
+                        if contexto.ci_docente is None:
                             errores.append({
                                 'indice': i,
                                 'error': 'Docente no encontrado'
                             })
                             continue
+                        
+                        if not contexto.tiene_asignacion(
+                            str(nota_data['codigo_curso']), str(nota_data['codigo_materia'])
+                        ):
+                            errores.append({
+                                'indice': i,
+                                'error': 'No tiene permisos para registrar notas en esta materia/curso'
+                            })
+                            continue
                     
                     # Guardar la nota
                     nota = serializer.save()
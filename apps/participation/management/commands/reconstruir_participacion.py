@@ -0,0 +1,30 @@
+# apps/participation/management/commands/reconstruir_participacion.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.participation.services import RankingParticipacion, ResumenParticipacion
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el ranking acumulado y los resúmenes semanales de participación a partir de los registros originales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', help='Código de curso a reconstruir')
+        parser.add_argument('--materia', help='Código de materia a reconstruir')
+        parser.add_argument('--estudiante', help='CI de estudiante a reconstruir')
+
+    def handle(self, *args, **options):
+        filtro = Q()
+        if options['curso']:
+            filtro &= Q(codigo_curso=options['curso'])
+        if options['materia']:
+            filtro &= Q(codigo_materia=options['materia'])
+        if options['estudiante']:
+            filtro &= Q(ci_estudiante=options['estudiante'])
+
+        total = RankingParticipacion.reconstruir(filtro)
+        self.stdout.write(self.style.SUCCESS(f'Se generaron {total} puntajes de participación'))
+
+        total = ResumenParticipacion.reconstruir(filtro)
+        self.stdout.write(self.style.SUCCESS(f'Se generaron {total} resúmenes semanales de participación'))
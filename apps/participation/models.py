@@ -1,7 +1,56 @@
 #apps/participation/models.py:
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils.dateparse import parse_date
+
+# Campos de Participacion que afectan el ranking acumulado
+CAMPOS_DERIVADOS = {
+    'ci_estudiante', 'codigo_curso', 'codigo_materia', 'fecha',
+    'tipo_participacion', 'calificacion', 'is_active'
+}
+CAMPOS_MOVIMIENTO = [
+    'ci_estudiante', 'codigo_curso', 'codigo_materia', 'fecha',
+    'tipo_participacion', 'calificacion'
+]
+
+class ParticipacionQuerySet(models.QuerySet):
+    """QuerySet que mantiene actualizados los datos derivados en operaciones masivas"""
+    
+    def _movimientos(self, signo):
+        """Aportes (+1) o retiros (-1) de las participaciones activas del queryset"""
+        return [
+            (*fila, signo)
+            for fila in self.filter(is_active=True).order_by().values_list(*CAMPOS_MOVIMIENTO)
+        ]
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        from .services import sincronizar_derivados
+        with transaction.atomic(using=self.db):
+            creados = super().bulk_create(objs, *args, **kwargs)
+            sincronizar_derivados(obj.movimiento(1) for obj in creados if obj.is_active)
+        return creados
+    
+    def update(self, **kwargs):
+        from .services import sincronizar_derivados
+        if not CAMPOS_DERIVADOS.intersection(kwargs):
+            return super().update(**kwargs)
+        
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            movimientos = self._movimientos(-1)
+            filas = super().update(**kwargs)
+            movimientos += self.model.objects.filter(pk__in=pks)._movimientos(1)
+            sincronizar_derivados(movimientos)
+        return filas
+    
+    def delete(self):
+        from .services import sincronizar_derivados
+        with transaction.atomic(using=self.db):
+            movimientos = self._movimientos(-1)
+            resultado = super().delete()
+            sincronizar_derivados(movimientos)
+        return resultado
 
 class Participacion(models.Model):
     TIPOS_PARTICIPACION = [
@@ -30,14 +79,56 @@ class Participacion(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    objects = ParticipacionQuerySet.as_manager()
+    
     class Meta:
         db_table = 'participacion'
         verbose_name = 'Participación'
         verbose_name_plural = 'Participaciones'
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='participacion_fecha_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.ci_estudiante.nombre_completo} - {self.tipo_participacion} ({self.calificacion})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Recordar el aporte original para retirarlo si la participación cambia
+        if not (CAMPOS_DERIVADOS & instancia.get_deferred_fields()) and instancia.is_active:
+            instancia._movimiento_original = instancia.movimiento(-1)
+        return instancia
+    
+    def movimiento(self, signo):
+        """Aporte (+1) o retiro (-1) de esta participación en los datos derivados"""
+        # La fecha puede llegar como texto ('2026-03-02') en create()/save()
+        fecha = parse_date(self.fecha) if isinstance(self.fecha, str) else self.fecha
+        return (
+            self.ci_estudiante_id, self.codigo_curso_id, self.codigo_materia_id,
+            fecha, self.tipo_participacion, self.calificacion, signo
+        )
+    
+    def save(self, *args, **kwargs):
+        from .services import sincronizar_derivados
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            movimientos = [getattr(self, '_movimiento_original', None)]
+            if self.is_active:
+                movimientos.append(self.movimiento(1))
+            sincronizar_derivados(movimiento for movimiento in movimientos if movimiento)
+        self._movimiento_original = self.movimiento(-1) if self.is_active else None
+    
+    def delete(self, *args, **kwargs):
+        from .services import sincronizar_derivados
+        with transaction.atomic():
+            movimiento = getattr(
+                self, '_movimiento_original', self.movimiento(-1) if self.is_active else None
+            )
+            resultado = super().delete(*args, **kwargs)
+            sincronizar_derivados([movimiento] if movimiento else [])
+        return resultado
+    
     @classmethod
     def calcular_promedio_participacion(cls, estudiante, materia, curso, fecha_inicio=None, fecha_fin=None):
         """Calcula el promedio de participación de un estudiante en una materia"""
@@ -55,4 +146,55 @@ class Participacion(models.Model):
             
         from django.db.models import Avg
         resultado = queryset.aggregate(promedio=Avg('calificacion'))
-        return resultado['promedio'] or 0
\ No newline at end of file
+        return resultado['promedio'] or 0
+
+
+class PuntajeParticipacion(models.Model):
+    """Suma y cantidad acumuladas de participación por estudiante, curso y materia (ranking)"""
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    suma = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    cantidad = models.IntegerField(default=0)
+    promedio = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'puntaje_participacion'
+        verbose_name = 'Puntaje de Participación'
+        verbose_name_plural = 'Puntajes de Participación'
+        unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia')
+        indexes = [
+            models.Index(
+                fields=['codigo_curso', 'codigo_materia', '-promedio', '-cantidad', 'ci_estudiante'],
+                name='puntaje_part_ranking_idx'
+            ),
+        ]
+        
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.codigo_materia_id} ({self.promedio} / {self.cantidad})"
+
+
+
+class ResumenParticipacionSemanal(models.Model):
+    """Suma y cantidad de participaciones por estudiante, curso, materia, semana ISO y tipo"""
+    ci_estudiante = models.ForeignKey('students.Estudiante', on_delete=models.CASCADE, db_column='ci_estudiante')
+    codigo_curso = models.ForeignKey('courses.Curso', on_delete=models.CASCADE, db_column='codigo_curso')
+    codigo_materia = models.ForeignKey('subjects.Materia', on_delete=models.CASCADE, db_column='codigo_materia')
+    semana = models.DateField(help_text="Lunes de la semana ISO")
+    tipo_participacion = models.CharField(max_length=50, choices=Participacion.TIPOS_PARTICIPACION)
+    suma = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    cantidad = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'resumen_participacion_semanal'
+        verbose_name = 'Resumen Semanal de Participación'
+        verbose_name_plural = 'Resúmenes Semanales de Participación'
+        unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia', 'semana', 'tipo_participacion')
+        indexes = [
+            models.Index(fields=['codigo_curso', 'codigo_materia', 'semana'], name='resumen_part_curso_sem_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.ci_estudiante_id} - {self.codigo_materia_id} {self.semana} ({self.tipo_participacion}: {self.cantidad})"
@@ -82,40 +82,39 @@ class ParticipacionBulkCreateSerializer(serializers.Serializer):
         except Materia.DoesNotExist:
             raise serializers.ValidationError("La materia especificada no existe o no está activa")
         
-        # Validar que todos los estudiantes existen y están inscritos en el curso
+        # Resolver estudiantes, inscripciones y participaciones existentes con consultas IN
+        from apps.students.models import Inscripcion
+        cis = [p['ci_estudiante'] for p in attrs['participaciones']]
+        estudiantes = Estudiante.objects.filter(is_active=True).in_bulk(cis)
+        inscritos = set(Inscripcion.objects.filter(
+            ci_estudiante__in=cis,
+            codigo_curso=curso,
+            estado='ACTIVO'
+        ).values_list('ci_estudiante', flat=True))
+        existentes = set(Participacion.objects.filter(
+            ci_estudiante__in=cis,
+            codigo_curso=curso,
+            codigo_materia=materia,
+            fecha=attrs['fecha'],
+            is_active=True
+        ).values_list('ci_estudiante', 'tipo_participacion'))
+        
         participaciones_validadas = []
         for participacion_data in attrs['participaciones']:
             ci_estudiante = participacion_data['ci_estudiante']
             
-            try:
-                estudiante = Estudiante.objects.get(ci=ci_estudiante, is_active=True)
-            except Estudiante.DoesNotExist:
+            estudiante = estudiantes.get(ci_estudiante)
+            if estudiante is None:
                 raise serializers.ValidationError(f"El estudiante con CI {ci_estudiante} no existe o no está activo")
             
             # Verificar que el estudiante está inscrito en el curso
-            from apps.students.models import Inscripcion
-            inscripcion_exists = Inscripcion.objects.filter(
-                ci_estudiante=estudiante,
-                codigo_curso=curso,
-                estado='ACTIVO'
-            ).exists()
-            
-            if not inscripcion_exists:
+            if ci_estudiante not in inscritos:
                 raise serializers.ValidationError(
                     f"El estudiante {estudiante.nombre_completo} (CI: {ci_estudiante}) no está inscrito en el curso {curso.nombre}"
                 )
             
             # Verificar que no existe ya una participación para este estudiante en la misma fecha, materia y tipo
-            participacion_existente = Participacion.objects.filter(
-                ci_estudiante=estudiante,
-                codigo_curso=curso,
-                codigo_materia=materia,
-                fecha=attrs['fecha'],
-                tipo_participacion=participacion_data['tipo_participacion'],
-                is_active=True
-            ).exists()
-            
-            if participacion_existente:
+            if (ci_estudiante, participacion_data['tipo_participacion']) in existentes:
                 raise serializers.ValidationError(
                     f"Ya existe una participación del tipo '{participacion_data['tipo_participacion']}' "
                     f"para el estudiante {estudiante.nombre_completo} en la fecha {attrs['fecha']}"
@@ -0,0 +1,283 @@
+# apps/participation/services.py
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Participacion, PuntajeParticipacion, ResumenParticipacionSemanal
+
+DOS_DECIMALES = Decimal('0.01')
+
+
+def sincronizar_derivados(movimientos):
+    """
+    Aplica a los datos derivados los movimientos (estudiante, curso, materia,
+    fecha, tipo, calificacion, signo) producidos por una escritura.
+    """
+    movimientos = list(movimientos)
+    if not movimientos:
+        return
+    RankingParticipacion.aplicar(movimientos)
+    ResumenParticipacion.aplicar(movimientos)
+
+
+def _lunes(fecha):
+    """Lunes de la semana ISO de la fecha"""
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def _acumular_deltas(modelo, campos, deltas, campos_extra=(), completar=None):
+    """
+    Suma los deltas {clave: [suma, cantidad]} en las filas de `modelo` cuya
+    clave son los valores de `campos`. Crea las filas faltantes y elimina las
+    que quedan sin participaciones; `completar` recalcula campos derivados.
+    """
+    deltas = {clave: delta for clave, delta in deltas.items() if delta != [0, 0]}
+    if not deltas:
+        return
+
+    def bloquear(claves):
+        # Filtro por valores de cada campo: puede traer filas de más, nunca de menos
+        filtro = Q(**{
+            f'{campo}__in': {clave[i] for clave in claves} for i, campo in enumerate(campos)
+        })
+        return {
+            tuple(getattr(fila, campo) for campo in campos): fila
+            for fila in modelo.objects.select_for_update().filter(filtro)
+        }
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        # Las filas faltantes se insertan en cero ignorando conflictos y luego se
+        # bloquean junto con las existentes: dos escrituras concurrentes que
+        # crean la misma clave se serializan en el bloqueo en lugar de fallar.
+        # Si otra transacción borra la fila mientras se espera, se vuelve a crear.
+        existentes = bloquear(deltas)
+        faltantes = set(deltas) - existentes.keys()
+        while faltantes:
+            modelo.objects.bulk_create(
+                [modelo(**dict(zip(campos, clave)), updated_at=ahora) for clave in faltantes],
+                ignore_conflicts=True
+            )
+            existentes.update(bloquear(faltantes))
+            faltantes -= existentes.keys()
+
+        modificadas, vacias = [], []
+        for clave, (suma, cantidad) in deltas.items():
+            fila = existentes[clave]
+            fila.suma += suma
+            fila.cantidad += cantidad
+            fila.updated_at = ahora
+            if fila.cantidad <= 0:
+                vacias.append(fila)
+            else:
+                if completar:
+                    completar(fila)
+                modificadas.append(fila)
+
+        modelo.objects.bulk_update(modificadas, ['suma', 'cantidad', 'updated_at', *campos_extra])
+        modelo.objects.filter(pk__in=[fila.pk for fila in vacias]).delete()
+
+
+class RankingParticipacion:
+    """Servicio para mantener y consultar el ranking de participación por curso y materia"""
+
+    ORDEN = ['-promedio', '-cantidad', 'ci_estudiante']
+
+    @staticmethod
+    def _promedio(suma, cantidad):
+        return (Decimal(suma) / cantidad).quantize(DOS_DECIMALES) if cantidad else Decimal('0')
+
+    @classmethod
+    def aplicar(cls, movimientos):
+        """Actualiza incrementalmente la suma y cantidad acumuladas de cada estudiante afectado"""
+        deltas = defaultdict(lambda: [Decimal('0'), 0])
+        for ci_estudiante, codigo_curso, codigo_materia, _, _, calificacion, signo in movimientos:
+            delta = deltas[(ci_estudiante, codigo_curso, codigo_materia)]
+            delta[0] += Decimal(calificacion) * signo
+            delta[1] += signo
+
+        def completar(puntaje):
+            puntaje.promedio = cls._promedio(puntaje.suma, puntaje.cantidad)
+
+        _acumular_deltas(
+            PuntajeParticipacion, ['ci_estudiante_id', 'codigo_curso_id', 'codigo_materia_id'],
+            deltas, campos_extra=['promedio'], completar=completar
+        )
+
+    @classmethod
+    def reconstruir(cls, filtro=None):
+        """Reconstruye el ranking de las participaciones que coinciden con el filtro (backfill)"""
+        filtro = filtro or Q()
+        acumulados = Participacion.objects.filter(filtro, is_active=True).order_by().values(
+            'ci_estudiante', 'codigo_curso', 'codigo_materia'
+        ).annotate(suma=Sum('calificacion'), cantidad=Count('id'))
+
+        with transaction.atomic():
+            PuntajeParticipacion.objects.filter(filtro).delete()
+            puntajes = PuntajeParticipacion.objects.bulk_create([
+                PuntajeParticipacion(
+                    ci_estudiante_id=fila['ci_estudiante'],
+                    codigo_curso_id=fila['codigo_curso'],
+                    codigo_materia_id=fila['codigo_materia'],
+                    suma=fila['suma'],
+                    cantidad=fila['cantidad'],
+                    promedio=cls._promedio(fila['suma'], fila['cantidad'])
+                ) for fila in acumulados.iterator()
+            ], batch_size=1000)
+        return len(puntajes)
+
+    @classmethod
+    def tabla(cls, codigo_curso, codigo_materia):
+        """Ranking de un curso y materia ordenado por el índice del ranking"""
+        return PuntajeParticipacion.objects.filter(
+            codigo_curso=codigo_curso, codigo_materia=codigo_materia
+        ).select_related('ci_estudiante').order_by(*cls.ORDEN)
+
+    @staticmethod
+    def posicion(puntaje):
+        """Posición (desde 1) de un puntaje dentro de su curso y materia"""
+        return PuntajeParticipacion.objects.filter(
+            Q(promedio__gt=puntaje.promedio) |
+            Q(promedio=puntaje.promedio, cantidad__gt=puntaje.cantidad) |
+            Q(promedio=puntaje.promedio, cantidad=puntaje.cantidad, ci_estudiante__lt=puntaje.ci_estudiante_id),
+            codigo_curso=puntaje.codigo_curso_id,
+            codigo_materia=puntaje.codigo_materia_id
+        ).count() + 1
+
+
+class ResumenParticipacion:
+    """Servicio para mantener y consultar los resúmenes semanales de participación"""
+
+    @staticmethod
+    def aplicar(movimientos):
+        """Actualiza incrementalmente la suma y cantidad de cada semana y tipo afectados"""
+        deltas = defaultdict(lambda: [Decimal('0'), 0])
+        for ci_estudiante, codigo_curso, codigo_materia, fecha, tipo, calificacion, signo in movimientos:
+            delta = deltas[(ci_estudiante, codigo_curso, codigo_materia, _lunes(fecha), tipo)]
+            delta[0] += Decimal(calificacion) * signo
+            delta[1] += signo
+
+        _acumular_deltas(
+            ResumenParticipacionSemanal,
+            ['ci_estudiante_id', 'codigo_curso_id', 'codigo_materia_id', 'semana', 'tipo_participacion'],
+            deltas
+        )
+
+    @staticmethod
+    def reconstruir(filtro=None):
+        """Reconstruye todos los resúmenes semanales que coinciden con el filtro (backfill)"""
+        filtro = filtro or Q()
+        acumulados = Participacion.objects.filter(filtro, is_active=True).order_by().annotate(
+            semana=TruncWeek('fecha')
+        ).values(
+            'ci_estudiante', 'codigo_curso', 'codigo_materia', 'semana', 'tipo_participacion'
+        ).annotate(suma=Sum('calificacion'), cantidad=Count('id'))
+
+        with transaction.atomic():
+            ResumenParticipacionSemanal.objects.filter(filtro).delete()
+            resumenes = ResumenParticipacionSemanal.objects.bulk_create([
+                ResumenParticipacionSemanal(
+                    ci_estudiante_id=fila['ci_estudiante'],
+                    codigo_curso_id=fila['codigo_curso'],
+                    codigo_materia_id=fila['codigo_materia'],
+                    semana=fila['semana'],
+                    tipo_participacion=fila['tipo_participacion'],
+                    suma=fila['suma'],
+                    cantidad=fila['cantidad']
+                ) for fila in acumulados.iterator()
+            ], batch_size=1000)
+        return len(resumenes)
+
+    @staticmethod
+    def _media_movil(sumas, cantidades, ventana):
+        """Promedio móvil ponderado por cantidad sobre las últimas `ventana` semanas (eje 1)"""
+        def acumulado_movil(matriz):
+            acumulado = np.cumsum(matriz, axis=1)
+            acumulado[:, ventana:] = acumulado[:, ventana:] - acumulado[:, :-ventana]
+            return acumulado
+
+        sumas_moviles = acumulado_movil(sumas)
+        cantidades_moviles = acumulado_movil(cantidades)
+        return np.divide(
+            sumas_moviles, cantidades_moviles,
+            out=np.full_like(sumas_moviles, np.nan), where=cantidades_moviles > 0
+        )
+
+    @staticmethod
+    def _a_lista(valores):
+        """Convierte un arreglo de floats a lista JSON (NaN -> None)"""
+        return [None if np.isnan(valor) else round(float(valor), 2) for valor in valores]
+
+    @classmethod
+    def tendencia(cls, queryset, ventana=3):
+        """
+        Series semanales alineadas de un curso: matrices estudiantes × semanas
+        con promedio, cantidad y media móvil, más la serie agregada del curso.
+        Lee los resúmenes semanales en una sola consulta.
+        """
+        filas = list(queryset.order_by().values_list(
+            'ci_estudiante', 'ci_estudiante__nombre', 'ci_estudiante__apellido',
+            'semana', 'suma', 'cantidad'
+        ))
+        if not filas:
+            return {
+                'estudiantes': [],
+                'semanas': [],
+                'promedio': [],
+                'cantidad': [],
+                'media_movil': [],
+                'curso': {'promedio': [], 'cantidad': [], 'media_movil': []}
+            }
+
+        nombres = {ci: (nombre, apellido) for ci, nombre, apellido, *_ in filas}
+        estudiantes = sorted(nombres, key=lambda ci: (nombres[ci][1], nombres[ci][0]))
+        indice_estudiante = {ci: i for i, ci in enumerate(estudiantes)}
+
+        primera = min(fila[3] for fila in filas)
+        ultima = max(fila[3] for fila in filas)
+        total_semanas = (ultima - primera).days // 7 + 1
+        semanas = [primera + timedelta(weeks=i) for i in range(total_semanas)]
+
+        filas_idx = np.array([indice_estudiante[fila[0]] for fila in filas])
+        columnas_idx = np.array([(fila[3] - primera).days // 7 for fila in filas])
+        sumas = np.zeros((len(estudiantes), total_semanas))
+        cantidades = np.zeros((len(estudiantes), total_semanas))
+        # Cada semana puede tener varias filas (una por tipo): se acumulan
+        np.add.at(sumas, (filas_idx, columnas_idx), np.array([float(fila[4]) for fila in filas]))
+        np.add.at(cantidades, (filas_idx, columnas_idx), np.array([fila[5] for fila in filas], dtype=float))
+
+        promedios = np.divide(sumas, cantidades, out=np.full_like(sumas, np.nan), where=cantidades > 0)
+        medias_moviles = cls._media_movil(sumas, cantidades, ventana)
+
+        sumas_curso = sumas.sum(axis=0, keepdims=True)
+        cantidades_curso = cantidades.sum(axis=0, keepdims=True)
+        promedio_curso = np.divide(
+            sumas_curso, cantidades_curso,
+            out=np.full_like(sumas_curso, np.nan), where=cantidades_curso > 0
+        )
+
+        return {
+            'estudiantes': [
+                {'ci': ci, 'nombre_completo': f"{nombres[ci][0]} {nombres[ci][1]}"}
+                for ci in estudiantes
+            ],
+            'semanas': [
+                {'semana': '%d-W%02d' % semana.isocalendar()[:2], 'inicio': semana}
+                for semana in semanas
+            ],
+            'promedio': [cls._a_lista(fila) for fila in promedios],
+            'cantidad': cantidades.astype(int).tolist(),
+            'media_movil': [cls._a_lista(fila) for fila in medias_moviles],
+            'curso': {
+                'promedio': cls._a_lista(promedio_curso[0]),
+                'cantidad': cantidades_curso[0].astype(int).tolist(),
+                'media_movil': cls._a_lista(cls._media_movil(sumas_curso, cantidades_curso, ventana)[0])
+            }
+        }
@@ -1,3 +1,261 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.db.models import Count, QuerySet, Sum
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.courses.models import Curso
+from apps.students.models import Estudiante
+from apps.subjects.models import Materia
+from .models import Participacion, PuntajeParticipacion, ResumenParticipacionSemanal
+from .services import RankingParticipacion, ResumenParticipacion
+from .views import ParticipacionViewSet
+
+
+class ParticipacionBaseTestCase(TestCase):
+    """Curso, materia y estudiantes comunes; el cliente entra como administrador"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(codigo='C1', nombre='1A', nivel='1', paralelo='A', gestion=2026)
+        cls.materia = Materia.objects.create(codigo='M1', nombre='Matemática')
+        cls.estudiantes = [
+            Estudiante.objects.create(
+                ci=f'E{i}', nombre=f'Nombre{i}', apellido=f'Apellido{i}',
+                email=f'e{i}@colegio.com', fecha_nacimiento=date(2012, 1, 1)
+            )
+            for i in range(3)
+        ]
+        cls.admin = User.objects.create_user('admin', password='clave12345')
+        cls.admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def participar(self, estudiante, fecha, calificacion, tipo='PREGUNTA'):
+        return Participacion.objects.create(
+            codigo_curso=self.curso, codigo_materia=self.materia, ci_estudiante=estudiante,
+            fecha=fecha, tipo_participacion=tipo, calificacion=Decimal(calificacion)
+        )
+
+
+class RankingIncrementalTests(ParticipacionBaseTestCase):
+
+    def assertRankingConsistente(self):
+        """El puntaje acumulado coincide con un agregado recién calculado sobre los registros"""
+        esperado = {
+            fila['ci_estudiante']: (fila['suma'], fila['cantidad'])
+            for fila in Participacion.objects.filter(is_active=True).values('ci_estudiante').annotate(
+                suma=Sum('calificacion'), cantidad=Count('id')
+            )
+        }
+        obtenido = {
+            puntaje.ci_estudiante_id: (puntaje.suma, puntaje.cantidad)
+            for puntaje in PuntajeParticipacion.objects.all()
+        }
+        self.assertEqual(obtenido, esperado)
+        for puntaje in PuntajeParticipacion.objects.all():
+            self.assertEqual(puntaje.promedio, (puntaje.suma / puntaje.cantidad).quantize(Decimal('0.01')))
+
+    def test_ranking_se_mantiene_tras_cada_escritura(self):
+        e0, e1, e2 = self.estudiantes
+        primera = self.participar(e0, date(2026, 3, 2), '4.0')
+        self.participar(e0, date(2026, 3, 3), '5.0')
+        self.participar(e1, date(2026, 3, 2), '3.0')
+        self.assertRankingConsistente()
+
+        # Actualización por instancia, incluido el cambio de estudiante
+        primera.calificacion = Decimal('2.0')
+        primera.ci_estudiante = e2
+        primera.save()
+        self.assertRankingConsistente()
+
+        # Baja lógica y reactivación masivas
+        Participacion.objects.filter(ci_estudiante=e1).update(is_active=False)
+        self.assertRankingConsistente()
+        self.assertFalse(PuntajeParticipacion.objects.filter(ci_estudiante=e1).exists())
+        Participacion.objects.filter(ci_estudiante=e1).update(is_active=True)
+        self.assertRankingConsistente()
+
+        # Eliminación por instancia y masiva
+        primera.delete()
+        self.assertRankingConsistente()
+        Participacion.objects.filter(ci_estudiante=e0).delete()
+        self.assertRankingConsistente()
+
+    def test_clave_creada_por_otra_escritura_concurrente(self):
+        bulk_create = QuerySet.bulk_create
+        concurrentes = []
+
+        def alta_concurrente(queryset, objs, *args, **kwargs):
+            # Otra transacción confirma la misma clave entre el bloqueo y la inserción
+            if queryset.model is PuntajeParticipacion and not concurrentes:
+                concurrentes.append(True)
+                bulk_create(queryset, [PuntajeParticipacion(
+                    ci_estudiante=self.estudiantes[0], codigo_curso=self.curso, codigo_materia=self.materia,
+                    suma=Decimal('3.0'), cantidad=1, promedio=Decimal('3.00')
+                )])
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', alta_concurrente):
+            RankingParticipacion.aplicar([
+                ('E0', 'C1', 'M1', date(2026, 3, 2), 'PREGUNTA', Decimal('5.0'), 1)
+            ])
+
+        puntaje = PuntajeParticipacion.objects.get()
+        self.assertEqual((puntaje.suma, puntaje.cantidad, puntaje.promedio), (Decimal('8.0'), 2, Decimal('4.00')))
+
+    def test_reconstruir_coincide_con_el_incremental(self):
+        for i, estudiante in enumerate(self.estudiantes):
+            self.participar(estudiante, date(2026, 3, 2), f'{i + 2}.5')
+        incremental = list(PuntajeParticipacion.objects.order_by('ci_estudiante').values_list(
+            'ci_estudiante', 'suma', 'cantidad', 'promedio'
+        ))
+        RankingParticipacion.reconstruir()
+        self.assertEqual(
+            list(PuntajeParticipacion.objects.order_by('ci_estudiante').values_list(
+                'ci_estudiante', 'suma', 'cantidad', 'promedio'
+            )),
+            incremental
+        )
+
+    def test_endpoint_ordena_y_cuenta_lo_visible(self):
+        e0, e1, e2 = self.estudiantes
+        self.participar(e0, date(2026, 3, 2), '3.0')
+        self.participar(e1, date(2026, 3, 2), '5.0')
+        self.participar(e2, date(2026, 3, 2), '4.0')
+        url = '/api/participation/ranking/?codigo_curso=C1&codigo_materia=M1'
+
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([fila['ci'] for fila in respuesta.data['ranking']], ['E1', 'E2', 'E0'])
+        self.assertEqual([fila['posicion'] for fila in respuesta.data['ranking']], [1, 2, 3])
+        self.assertEqual(respuesta.data['total_estudiantes'], 3)
+
+        # Un estudiante solo ve su fila, y el total cuenta solo lo visible
+        usuario = User.objects.create_user('estudiante', password='clave12345')
+        usuario.groups.add(Group.objects.get_or_create(name='Estudiante')[0])
+        Estudiante.objects.filter(ci='E2').update(usuario=usuario)
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.get(url)
+        self.assertEqual([fila['ci'] for fila in respuesta.data['ranking']], ['E2'])
+        self.assertEqual(respuesta.data['ranking'][0]['posicion'], 2)
+        self.assertEqual(respuesta.data['total_estudiantes'], 1)
+        self.assertEqual(respuesta.data['mi_posicion']['posicion'], 2)
+
+
+class ResumenSemanalTests(ParticipacionBaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        e0, e1, e2 = self.estudiantes
+        # Semanas del 2 y 16 de marzo con hueco, dos tipos en la misma semana
+        self.participar(e0, date(2026, 3, 2), '4.0')
+        self.participar(e0, date(2026, 3, 6), '2.0', tipo='DEBATE')
+        self.participar(e0, date(2026, 3, 10), '5.0')
+        self.participar(e1, date(2026, 3, 3), '3.0')
+        self.participar(e1, date(2026, 3, 17), '4.5', tipo='EXPOSICION')
+        self.participar(e2, date(2026, 3, 16), '1.0')
+
+    def semanas_desde_registros(self):
+        """Suma y cantidad por estudiante, lunes y tipo calculadas fila por fila"""
+        esperado = defaultdict(lambda: [Decimal('0'), 0])
+        for participacion in Participacion.objects.filter(is_active=True):
+            lunes = participacion.fecha - timedelta(days=participacion.fecha.weekday())
+            clave = (participacion.ci_estudiante_id, lunes, participacion.tipo_participacion)
+            esperado[clave][0] += participacion.calificacion
+            esperado[clave][1] += 1
+        return {clave: tuple(valor) for clave, valor in esperado.items()}
+
+    def semanas_resumidas(self):
+        return {
+            (resumen.ci_estudiante_id, resumen.semana, resumen.tipo_participacion): (resumen.suma, resumen.cantidad)
+            for resumen in ResumenParticipacionSemanal.objects.all()
+        }
+
+    def test_resumen_coincide_con_los_registros(self):
+        self.assertEqual(self.semanas_resumidas(), self.semanas_desde_registros())
+
+        participacion = Participacion.objects.get(ci_estudiante='E0', fecha=date(2026, 3, 10))
+        participacion.fecha = date(2026, 3, 19)
+        participacion.save()
+        Participacion.objects.filter(ci_estudiante='E1', tipo_participacion='EXPOSICION').update(is_active=False)
+        Participacion.objects.filter(ci_estudiante='E2').delete()
+        self.assertEqual(self.semanas_resumidas(), self.semanas_desde_registros())
+
+        ResumenParticipacion.reconstruir()
+        self.assertEqual(self.semanas_resumidas(), self.semanas_desde_registros())
+
+    def test_fecha_como_texto(self):
+        participacion = Participacion.objects.create(
+            codigo_curso=self.curso, codigo_materia=self.materia, ci_estudiante=self.estudiantes[2],
+            fecha='2026-03-04', tipo_participacion='PREGUNTA', calificacion=Decimal('3.0')
+        )
+        resumen = ResumenParticipacionSemanal.objects.get(ci_estudiante='E2', semana=date(2026, 3, 2))
+        self.assertEqual((resumen.suma, resumen.cantidad), (Decimal('3.0'), 1))
+
+        participacion.fecha = '2026-03-11'
+        participacion.save()
+        self.assertFalse(ResumenParticipacionSemanal.objects.filter(ci_estudiante='E2', semana=date(2026, 3, 2)).exists())
+        self.assertEqual(self.semanas_resumidas(), self.semanas_desde_registros())
+
+    def test_tendencia_coincide_con_los_registros(self):
+        ventana = 2
+        respuesta = self.client.get(
+            f'/api/participation/tendencia/?codigo_curso=C1&codigo_materia=M1&ventana={ventana}'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.data
+
+        lunes = [date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)]
+        self.assertEqual([semana['inicio'] for semana in datos['semanas']], lunes)
+        self.assertEqual([semana['semana'] for semana in datos['semanas']], ['2026-W10', '2026-W11', '2026-W12'])
+        cis = [estudiante['ci'] for estudiante in datos['estudiantes']]
+        self.assertEqual(cis, ['E0', 'E1', 'E2'])
+
+        def calificaciones(semanas, ci=None):
+            """Calificaciones de los registros de las semanas indicadas"""
+            filtro = {'ci_estudiante': ci} if ci else {}
+            return [
+                float(participacion.calificacion)
+                for participacion in Participacion.objects.filter(is_active=True, **filtro)
+                if participacion.fecha - timedelta(days=participacion.fecha.weekday()) in semanas
+            ]
+
+        def promedio(valores):
+            return round(sum(valores) / len(valores), 2) if valores else None
+
+        for i, inicio in enumerate(lunes):
+            anteriores = lunes[max(0, i - ventana + 1):i + 1]
+            for fila, ci in enumerate(cis):
+                self.assertEqual(datos['promedio'][fila][i], promedio(calificaciones([inicio], ci)))
+                self.assertEqual(datos['cantidad'][fila][i], len(calificaciones([inicio], ci)))
+                self.assertEqual(datos['media_movil'][fila][i], promedio(calificaciones(anteriores, ci)))
+            self.assertEqual(datos['curso']['promedio'][i], promedio(calificaciones([inicio])))
+            self.assertEqual(datos['curso']['cantidad'][i], len(calificaciones([inicio])))
+            self.assertEqual(datos['curso']['media_movil'][i], promedio(calificaciones(anteriores)))
+
+
+class PaginacionCursorTests(ParticipacionBaseTestCase):
+
+    def test_recorrido_por_cursor_usa_el_indice_de_la_clave(self):
+        indices = {tuple(indice.fields) for indice in Participacion._meta.indexes}
+        self.assertIn(ParticipacionViewSet.orden_cursor, indices)
 
-# Create your tests here.
+        for dia in range(3):
+            for estudiante in self.estudiantes:
+                self.participar(estudiante, date(2026, 3, 2) + timedelta(days=dia), '4.0')
+        esperado = list(Participacion.objects.order_by('-fecha', '-id').values_list('id', flat=True))
+        obtenido = []
+        url = '/api/participation/?paginacion=cursor&page_size=4'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            obtenido += [fila['id'] for fila in respuesta.data['results']]
+            url = respuesta.data['next']
+        self.assertEqual(obtenido, esperado)
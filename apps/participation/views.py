@@ -6,14 +6,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Sum
 from django.db import transaction
-from .models import Participacion
+from datetime import date, timedelta
+from .models import Participacion, ResumenParticipacionSemanal
+from .services import RankingParticipacion, ResumenParticipacion
 from .serializers import (
     ParticipacionSerializer, ParticipacionCreateSerializer, 
     ParticipacionBulkCreateSerializer, EstadisticasParticipacionSerializer
 )
 from apps.authentication.permissions import IsDocenteOrAdministrador
+from apps.authentication.contexto import obtener_contexto
 
 class ParticipacionViewSet(viewsets.ModelViewSet):
     queryset = Participacion.objects.filter(is_active=True)
@@ -23,6 +26,7 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['codigo_curso', 'codigo_materia', 'ci_estudiante', 'tipo_participacion', 'fecha']
     search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido', 'tipo_participacion']
     ordering = ['-fecha', 'ci_estudiante']
+    orden_cursor = ('-fecha', '-id')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -32,39 +36,40 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
         return ParticipacionSerializer
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
+        filtro = self._filtro_rol()
+        if filtro is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(filtro)
+    
+    def _filtro_rol(self):
+        """
+        Filtro de visibilidad según el rol del usuario, aplicable a Participacion
+        y PuntajeParticipacion. None si no puede ver nada.
+        """
+        contexto = obtener_contexto(self.request)
         
         # Si es docente, solo puede ver participación de sus materias
-        if user.groups.filter(name='Docente').exists():
-            from apps.teachers.models import Docente, AsignacionCurso
-            try:
-                docente = Docente.objects.get(usuario=user)
-                asignaciones = AsignacionCurso.objects.filter(
-                    ci_docente=docente,
-                    is_active=True
-                ).values('codigo_curso', 'codigo_materia')
-                
-                filters = Q()
-                for asignacion in asignaciones:
-                    filters |= Q(
-                        codigo_curso=asignacion['codigo_curso'],
-                        codigo_materia=asignacion['codigo_materia']
-                    )
-                queryset = queryset.filter(filters)
-            except Docente.DoesNotExist:
-                queryset = queryset.none()
+        if contexto.es_docente:
+            return contexto.filtro_asignaciones()
         
         # Si es estudiante, solo puede ver su propia participación
-        elif user.groups.filter(name='Estudiante').exists():
-            from apps.students.models import Estudiante
-            try:
-                estudiante = Estudiante.objects.get(usuario=user)
-                queryset = queryset.filter(ci_estudiante=estudiante)
-            except Estudiante.DoesNotExist:
-                queryset = queryset.none()
-        
-        return queryset
+        elif contexto.es_estudiante:
+            if contexto.ci_estudiante is None:
+                return None
+            return Q(ci_estudiante=contexto.ci_estudiante)
+        
+        return Q()
+    
+    def _respuesta_paginada(self, page, clave, items, payload):
+        """Agrega la lista (paginada si corresponde) bajo `clave` al resto del payload"""
+        if page is None:
+            payload[clave] = items
+            return Response(payload)
+        
+        paginado = self.get_paginated_response(items).data
+        payload[clave] = paginado.pop('results')
+        payload['paginacion'] = paginado
+        return Response(payload)
     
     def get_permissions(self):
         """Solo docentes y administradores pueden crear/modificar participación"""
@@ -88,13 +93,12 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
         try:
             with transaction.atomic():
                 participaciones_data = serializer.validated_data['participaciones']
-                participaciones_creadas = []
+                participaciones_creadas = Participacion.objects.bulk_create([
+                    Participacion(**participacion_data) for participacion_data in participaciones_data
+                ])
                 
-                for participacion_data in participaciones_data:
-                    participacion = Participacion.objects.create(**participacion_data)
-                    participaciones_creadas.append(participacion)
-                
-                # Serializar las participaciones creadas para la respuesta
+                # Las instancias ya tienen curso, materia y estudiante resueltos:
+                # el serializer no vuelve a consultar la base de datos
                 response_serializer = ParticipacionSerializer(participaciones_creadas, many=True)
                 
                 return Response({
@@ -111,11 +115,16 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def por_estudiante(self, request):
-        """Obtener participación de un estudiante específico"""
+        """
+        Obtener participación de un estudiante específico.
+        - detalle=false: solo resúmenes (sin participaciones individuales)
+        - en otro caso las participaciones se paginan y se agrupan por materia
+        """
         ci_estudiante = request.query_params.get('ci_estudiante')
         codigo_materia = request.query_params.get('codigo_materia')
         fecha_inicio = request.query_params.get('fecha_inicio')
         fecha_fin = request.query_params.get('fecha_fin')
+        con_detalle = request.query_params.get('detalle', 'true').lower() != 'false'
         
         if not ci_estudiante:
             return Response(
@@ -132,11 +141,25 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
         if fecha_fin:
             queryset = queryset.filter(fecha__lte=fecha_fin)
         
-        # Calcular estadísticas
-        stats = queryset.aggregate(
-            promedio_general=Avg('calificacion'),
-            total_participaciones=Count('id')
-        )
+        # Resumen por materia en una sola consulta agrupada
+        resumen_materias = queryset.values(
+            'codigo_materia', 'codigo_materia__nombre'
+        ).annotate(
+            suma=Sum('calificacion'),
+            total=Count('id')
+        ).order_by('codigo_materia__nombre')
+        
+        materias_data = {}
+        for fila in resumen_materias:
+            materias_data[fila['codigo_materia']] = {
+                'materia': fila['codigo_materia__nombre'],
+                'promedio': round(float(fila['suma']) / fila['total'], 2),
+                'total_participaciones': fila['total']
+            }
+        
+        # El resumen general se deriva de los totales por materia
+        suma_general = sum(float(fila['suma']) for fila in resumen_materias)
+        total_general = sum(fila['total'] for fila in resumen_materias)
         
         # Estadísticas por tipo de participación
         tipos_stats = queryset.values('tipo_participacion').annotate(
@@ -144,49 +167,61 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
             total=Count('id')
         ).order_by('-promedio')
         
-        # Agrupar por materia
-        materias_data = {}
-        for participacion in queryset.select_related('codigo_materia'):
-            materia_nombre = participacion.codigo_materia.nombre
-            if materia_nombre not in materias_data:
-                materias_data[materia_nombre] = {
-                    'materia': materia_nombre,
-                    'participaciones': []
-                }
-            
-            materias_data[materia_nombre]['participaciones'].append({
-                'fecha': participacion.fecha,
-                'tipo': participacion.tipo_participacion,
-                'calificacion': float(participacion.calificacion),
-                'observacion': participacion.observacion
-            })
-        
-        # Calcular promedios por materia
-        for materia_nombre, data in materias_data.items():
-            calificaciones = [p['calificacion'] for p in data['participaciones']]
-            data['promedio'] = sum(calificaciones) / len(calificaciones) if calificaciones else 0
-            data['total_participaciones'] = len(calificaciones)
-        
-        return Response({
+        payload = {
             'estudiante': ci_estudiante,
             'periodo': {
                 'fecha_inicio': fecha_inicio,
                 'fecha_fin': fecha_fin
             },
             'resumen': {
-                'promedio_general': round(stats['promedio_general'] or 0, 1),
-                'total_participaciones': stats['total_participaciones'],
+                'promedio_general': round(suma_general / total_general, 1) if total_general else 0,
+                'total_participaciones': total_general,
                 'por_tipo': tipos_stats
-            },
-            'por_materia': list(materias_data.values())
-        })
+            }
+        }
+        
+        if not con_detalle:
+            payload['por_materia'] = list(materias_data.values())
+            return Response(payload)
+        
+        # Detalle paginado, leído como valores sin instanciar modelos
+        detalle = queryset.values(
+            'codigo_materia', 'fecha', 'tipo_participacion', 'calificacion', 'observacion'
+        ).order_by('codigo_materia__nombre', 'fecha', 'id')
+        page = self.paginate_queryset(detalle)
+        
+        for data in materias_data.values():
+            data['participaciones'] = []
+        for fila in (page if page is not None else detalle):
+            materias_data[fila['codigo_materia']]['participaciones'].append({
+                'fecha': fila['fecha'],
+                'tipo': fila['tipo_participacion'],
+                'calificacion': float(fila['calificacion']),
+                'observacion': fila['observacion']
+            })
+        
+        return self._respuesta_paginada(page, 'por_materia', list(materias_data.values()), payload)
     
     @action(detail=False, methods=['get'])
     def ranking(self, request):
-        """Obtener ranking de estudiantes por participación"""
+        """
+        Obtener ranking de estudiantes por participación.
+        Con curso y materia se lee el ranking acumulado (paginado, con la
+        posición del solicitante); en otro caso se agrega sobre los registros.
+        """
         codigo_curso = request.query_params.get('codigo_curso')
         codigo_materia = request.query_params.get('codigo_materia')
         
+        payload = {
+            'filtros': {
+                'codigo_curso': codigo_curso,
+                'codigo_materia': codigo_materia
+            }
+        }
+        
+        if codigo_curso and codigo_materia:
+            return self._ranking_acumulado(codigo_curso, codigo_materia, payload)
+        
         queryset = self.get_queryset()
         
         if codigo_curso:
@@ -202,11 +237,15 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
         ).annotate(
             promedio_participacion=Avg('calificacion'),
             total_participaciones=Count('id')
-        ).order_by('-promedio_participacion', '-total_participaciones')
+        ).order_by('-promedio_participacion', '-total_participaciones', 'ci_estudiante__ci')
+        
+        page = self.paginate_queryset(ranking)
+        filas = page if page is not None else ranking
+        inicio = self.paginator.posicion_inicial() if page is not None else 1
         
         # Formatear respuesta
         ranking_data = []
-        for i, estudiante in enumerate(ranking, 1):
+        for i, estudiante in enumerate(filas, inicio):
             ranking_data.append({
                 'posicion': i,
                 'ci': estudiante['ci_estudiante__ci'],
@@ -215,13 +254,100 @@ class ParticipacionViewSet(viewsets.ModelViewSet):
                 'total_participaciones': estudiante['total_participaciones']
             })
         
+        payload['total_estudiantes'] = self._total_paginado(page, ranking_data)
+        return self._respuesta_paginada(page, 'ranking', ranking_data, payload)
+    
+    def _total_paginado(self, page, items):
+        """Total de filas del queryset paginado; None en los modos sin conteo"""
+        if page is None:
+            return len(items)
+        if self.paginator.modo == 'numerada':
+            return self.paginator.page.paginator.count
+        return None
+    
+    def _ranking_acumulado(self, codigo_curso, codigo_materia, payload):
+        """Ranking leído del puntaje acumulado: solo se recorren las filas de la página"""
+        filtro = self._filtro_rol()
+        tabla = RankingParticipacion.tabla(codigo_curso, codigo_materia)
+        visibles = tabla.filter(filtro) if filtro is not None else tabla.none()
+        
+        page = self.paginate_queryset(visibles)
+        filas = list(page if page is not None else visibles)
+        
+        # La página es un tramo contiguo del ranking (o la fila propia de un
+        # estudiante): basta ubicar la primera fila
+        inicio = RankingParticipacion.posicion(filas[0]) if filas else 1
+        posiciones = range(inicio, inicio + len(filas))
+        
+        ranking_data = [
+            {
+                'posicion': posicion,
+                'ci': puntaje.ci_estudiante_id,
+                'nombre_completo': puntaje.ci_estudiante.nombre_completo,
+                'promedio_participacion': round(puntaje.promedio, 1),
+                'total_participaciones': puntaje.cantidad
+            }
+            for posicion, puntaje in zip(posiciones, filas)
+        ]
+        
+        # Posición del solicitante si es estudiante del curso
+        ci_estudiante = obtener_contexto(self.request).ci_estudiante
+        propio = tabla.filter(ci_estudiante=ci_estudiante).first() if ci_estudiante else None
+        payload['mi_posicion'] = {
+            'posicion': RankingParticipacion.posicion(propio),
+            'promedio_participacion': round(propio.promedio, 1),
+            'total_participaciones': propio.cantidad
+        } if propio else None
+        
+        # Mismo queryset que la página: respeta el filtro por rol
+        payload['total_estudiantes'] = self._total_paginado(page, ranking_data)
+        return self._respuesta_paginada(page, 'ranking', ranking_data, payload)
+    
+    @action(detail=False, methods=['get'])
+    def tendencia(self, request):
+        """Series semanales de participación de un curso-materia (estudiantes × semanas)"""
+        codigo_curso = request.query_params.get('codigo_curso')
+        codigo_materia = request.query_params.get('codigo_materia')
+        fecha_inicio = request.query_params.get('fecha_inicio')
+        fecha_fin = request.query_params.get('fecha_fin')
+        
+        if not codigo_curso or not codigo_materia:
+            return Response(
+                {'error': 'codigo_curso y codigo_materia son requeridos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            ventana = int(request.query_params.get('ventana', 3))
+            fecha_inicio = date.fromisoformat(fecha_inicio) if fecha_inicio else None
+            fecha_fin = date.fromisoformat(fecha_fin) if fecha_fin else None
+        except ValueError:
+            ventana = 0
+        if ventana < 1:
+            return Response(
+                {'error': 'ventana debe ser un entero positivo y las fechas tener formato AAAA-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filtro = self._filtro_rol()
+        if filtro is None:
+            resumenes = ResumenParticipacionSemanal.objects.none()
+        else:
+            resumenes = ResumenParticipacionSemanal.objects.filter(
+                filtro, codigo_curso=codigo_curso, codigo_materia=codigo_materia
+            )
+        
+        # Las semanas se identifican por su lunes: se incluye la semana de cada extremo
+        if fecha_inicio:
+            resumenes = resumenes.filter(semana__gt=fecha_inicio - timedelta(days=7))
+        if fecha_fin:
+            resumenes = resumenes.filter(semana__lte=fecha_fin)
+        
         return Response({
-            'filtros': {
-                'codigo_curso': codigo_curso,
-                'codigo_materia': codigo_materia
-            },
-            'total_estudiantes': len(ranking_data),
-            'ranking': ranking_data
+            'codigo_curso': codigo_curso,
+            'codigo_materia': codigo_materia,
+            'ventana': ventana,
+            **ResumenParticipacion.tendencia(resumenes, ventana)
         })
     
     @action(detail=False, methods=['get'])
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '__first__'),
+        ('predictions', '0001_initial'),
+        ('students', '__first__'),
+        ('subjects', '__first__'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calculonotaperiodo',
+            index=models.Index(fields=['-fecha_calculo', '-id'], name='calculo_nota_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modeloentrenamiento',
+            index=models.Index(fields=['-fecha_entrenamiento', '-id'], name='modelo_entren_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notafinalperiodo',
+            index=models.Index(fields=['-fecha_calculo', '-id'], name='nota_final_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prediccionnota',
+            index=models.Index(fields=['-fecha_prediccion', '-id'], name='prediccion_fecha_id_idx'),
+        ),
+    ]
@@ -32,6 +32,9 @@ class CalculoNotaPeriodo(models.Model):
         verbose_name = 'Cálculo de Nota por Período'
         verbose_name_plural = 'Cálculos de Notas por Período'
         unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia', 'codigo_periodo', 'codigo_campo')
+        indexes = [
+            models.Index(fields=['-fecha_calculo', '-id'], name='calculo_nota_fecha_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.ci_estudiante.nombre_completo} - {self.codigo_materia.nombre} - {self.codigo_periodo.nombre} - {self.codigo_campo.nombre}"
@@ -59,6 +62,9 @@ class NotaFinalPeriodo(models.Model):
         verbose_name = 'Nota Final por Período'
         verbose_name_plural = 'Notas Finales por Período'
         unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia', 'codigo_periodo')
+        indexes = [
+            models.Index(fields=['-fecha_calculo', '-id'], name='nota_final_fecha_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.ci_estudiante.nombre_completo} - {self.codigo_materia.nombre} - {self.codigo_periodo.nombre}: {self.nota_final}"
@@ -98,6 +104,9 @@ class PrediccionNota(models.Model):
         verbose_name = 'Predicción de Nota'
         verbose_name_plural = 'Predicciones de Notas'
         unique_together = ('ci_estudiante', 'codigo_curso', 'codigo_materia', 'codigo_periodo_objetivo')
+        indexes = [
+            models.Index(fields=['-fecha_prediccion', '-id'], name='prediccion_fecha_id_idx'),
+        ]
         
     def __str__(self):
         return f"Predicción: {self.ci_estudiante.nombre_completo} - {self.codigo_materia.nombre} - {self.codigo_periodo_objetivo.nombre}: {self.nota_predicha}"
@@ -126,6 +135,9 @@ class ModeloEntrenamiento(models.Model):
         db_table = 'modelo_entrenamiento'
         verbose_name = 'Modelo de Entrenamiento'
         verbose_name_plural = 'Modelos de Entrenamiento'
+        indexes = [
+            models.Index(fields=['-fecha_entrenamiento', '-id'], name='modelo_entren_fecha_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.nombre_modelo} - {self.algoritmo} (R²: {self.r2_score})"
\ No newline at end of file
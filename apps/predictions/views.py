@@ -17,6 +17,7 @@ from .serializers import (
 )
 from .services import CalculadoraNotas, ServicioPrediciones
 from apps.authentication.permissions import IsDocenteOrAdministrador
+from apps.authentication.contexto import obtener_contexto
 
 class ReportesViewSet(viewsets.GenericViewSet):
    """ViewSet para reportes de rendimiento académico"""
@@ -316,44 +317,31 @@ class ReportesViewSet(viewsets.GenericViewSet):
    
    def _tiene_permiso_estudiante(self, user, estudiante):
        """Verifica si el usuario tiene permisos para ver al estudiante"""
-       if user.groups.filter(name='Administrador').exists():
+       contexto = obtener_contexto(self.request)
+       if contexto.es_administrador:
            return True
        
-       if user.groups.filter(name='Estudiante').exists():
-           return estudiante.usuario == user
+       if contexto.es_estudiante:
+           return estudiante.usuario_id == user.id
        
-       if user.groups.filter(name='Docente').exists():
-           from apps.teachers.models import Docente, AsignacionCurso
+       if contexto.es_docente:
            from apps.students.models import Inscripcion
            try:
-               docente = Docente.objects.get(usuario=user)
                inscripcion = Inscripcion.objects.get(ci_estudiante=estudiante, estado='ACTIVO')
-               return AsignacionCurso.objects.filter(
-                   ci_docente=docente,
-                   codigo_curso=inscripcion.codigo_curso,
-                   is_active=True
-               ).exists()
            except:
                return False
+           return inscripcion.codigo_curso_id in contexto.cursos_asignados
        
        return False
    
    def _tiene_permiso_curso(self, user, curso):
        """Verifica si el usuario tiene permisos para ver el curso"""
-       if user.groups.filter(name='Administrador').exists():
+       contexto = obtener_contexto(self.request)
+       if contexto.es_administrador:
            return True
        
-       if user.groups.filter(name='Docente').exists():
-           from apps.teachers.models import Docente, AsignacionCurso
-           try:
-               docente = Docente.objects.get(usuario=user)
-               return AsignacionCurso.objects.filter(
-                   ci_docente=docente,
-                   codigo_curso=curso,
-                   is_active=True
-               ).exists()
-           except:
-               return False
+       if contexto.es_docente:
+           return curso.pk in contexto.cursos_asignados
        
        return False
    
@@ -760,6 +748,7 @@ class CalculoNotaPeriodoViewSet(viewsets.ReadOnlyModelViewSet):
    filterset_fields = ['codigo_curso', 'codigo_materia', 'codigo_periodo', 'codigo_campo']
    search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido']
    ordering = ['-fecha_calculo']
+   orden_cursor = ('-fecha_calculo', '-id')
 
 class NotaFinalPeriodoViewSet(viewsets.ReadOnlyModelViewSet):
    """ViewSet de solo lectura para notas finales por período"""
@@ -770,6 +759,7 @@ class NotaFinalPeriodoViewSet(viewsets.ReadOnlyModelViewSet):
    filterset_fields = ['codigo_curso', 'codigo_materia', 'codigo_periodo']
    search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido']
    ordering = ['-fecha_calculo']
+   orden_cursor = ('-fecha_calculo', '-id')
 
 class PrediccionNotaViewSet(viewsets.ReadOnlyModelViewSet):
    """ViewSet de solo lectura para predicciones de notas"""
@@ -780,10 +770,12 @@ class PrediccionNotaViewSet(viewsets.ReadOnlyModelViewSet):
    filterset_fields = ['codigo_curso', 'codigo_materia', 'codigo_periodo_objetivo']
    search_fields = ['ci_estudiante__nombre', 'ci_estudiante__apellido']
    ordering = ['-fecha_prediccion']
+   orden_cursor = ('-fecha_prediccion', '-id')
 
 class ModeloEntrenamientoViewSet(viewsets.ReadOnlyModelViewSet):
    """ViewSet de solo lectura para modelos de entrenamiento"""
    queryset = ModeloEntrenamiento.objects.filter(is_active=True)
    serializer_class = ModeloEntrenamientoSerializer
    permission_classes = [IsAuthenticated, IsDocenteOrAdministrador]
-   ordering = ['-fecha_entrenamiento']
\ No newline at end of file
+   ordering = ['-fecha_entrenamiento']
+   orden_cursor = ('-fecha_entrenamiento', '-id')
\ No newline at end of file
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:30
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models.functions import Cast, Upper
+
+# Personas y campos de la búsqueda (apps.search.services.CAMPOS_BUSQUEDA)
+MODELOS = [('students', 'Estudiante'), ('teachers', 'Docente'), ('tutors', 'Tutor')]
+CAMPOS = ['ci', 'nombre', 'apellido', 'email']
+
+
+def indices(modelo):
+    """
+    Índices GIN de trigramas sobre UPPER(campo::text), la misma expresión que
+    generan icontains e istartswith en PostgreSQL
+    """
+    return [
+        GinIndex(
+            OpClass(Upper(Cast(campo, models.TextField())), name='gin_trgm_ops'),
+            name=f'{modelo._meta.db_table}_{modelo._meta.get_field(campo).column}_trgm_idx'
+        )
+        for campo in CAMPOS
+    ]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for app_label, nombre in MODELOS:
+        modelo = apps.get_model(app_label, nombre)
+        for indice in indices(modelo):
+            schema_editor.add_index(modelo, indice)
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for app_label, nombre in MODELOS:
+        modelo = apps.get_model(app_label, nombre)
+        for indice in indices(modelo):
+            schema_editor.remove_index(modelo, indice)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('students', '__first__'),
+        ('teachers', '__first__'),
+        ('tutors', '__first__'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
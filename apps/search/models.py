@@ -0,0 +1,24 @@
+# apps/search/models.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.students.models import Estudiante
+from apps.teachers.models import Docente
+from apps.tutors.models import Tutor
+from .services import BuscadorPersonas
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_save, sender=Docente)
+@receiver(post_save, sender=Tutor)
+def actualizar_indice_busqueda(sender, instance, **kwargs):
+    """Refleja la escritura en el índice de búsqueda en memoria"""
+    BuscadorPersonas.indice(sender).actualizar(instance)
+
+
+@receiver(post_delete, sender=Estudiante)
+@receiver(post_delete, sender=Docente)
+@receiver(post_delete, sender=Tutor)
+def quitar_de_indice_busqueda(sender, instance, **kwargs):
+    BuscadorPersonas.indice(sender).eliminar(instance.pk)
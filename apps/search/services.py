@@ -0,0 +1,239 @@
+# apps/search/services.py
+
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import connections, DatabaseError
+from django.db.models import Q
+
+# Campos indexados de las personas (estudiantes, docentes y tutores)
+CAMPOS_BUSQUEDA = ['ci', 'nombre', 'apellido', 'email']
+
+# Similitud mínima para considerar un resultado (mismo umbral por defecto que pg_trgm)
+UMBRAL_SIMILITUD = 0.3
+
+# Tiempo máximo de búsqueda en memoria antes de devolver resultados parciales
+PRESUPUESTO_MS = 50
+
+# Segundos tras los cuales el índice en memoria se reconstruye (escrituras de otros procesos)
+VIGENCIA_INDICE = 300
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+
+
+def palabras(texto):
+    """Palabras alfanuméricas del texto normalizado"""
+    limpio = ''.join(caracter if caracter.isalnum() else ' ' for caracter in normalizar(texto))
+    return limpio.split()
+
+
+def trigramas(texto):
+    """Trigramas de cada palabra con el mismo relleno que pg_trgm ('  palabra ')"""
+    resultado = set()
+    for palabra in palabras(texto):
+        relleno = f'  {palabra} '
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido trigrama -> claves primarias de un modelo de personas.
+    Se construye en la primera búsqueda, se actualiza con las escrituras del
+    proceso y se reconstruye al vencer su vigencia.
+    """
+
+    def __init__(self, modelo, campos=CAMPOS_BUSQUEDA, vigencia=VIGENCIA_INDICE):
+        self.modelo = modelo
+        self.campos = campos
+        self.vigencia = vigencia
+        self._lock = threading.RLock()
+        self._documentos = {}
+        self._trigramas = defaultdict(set)
+        self._construido_en = None
+
+    def _agregar(self, pk, valores):
+        texto = ' '.join(str(valor) for valor in valores if valor)
+        claves = trigramas(texto)
+        self._documentos[pk] = (claves, palabras(texto))
+        for clave in claves:
+            self._trigramas[clave].add(pk)
+
+    def _quitar(self, pk):
+        documento = self._documentos.pop(pk, None)
+        if documento is None:
+            return
+        for clave in documento[0]:
+            claves = self._trigramas.get(clave)
+            if claves is not None:
+                claves.discard(pk)
+                if not claves:
+                    del self._trigramas[clave]
+
+    def construir(self):
+        """Construye el índice con una sola consulta de valores"""
+        filas = self.modelo.objects.filter(is_active=True).values_list('pk', *self.campos)
+        with self._lock:
+            self._documentos = {}
+            self._trigramas = defaultdict(set)
+            for pk, *valores in filas.iterator():
+                self._agregar(pk, valores)
+            self._construido_en = time.monotonic()
+
+    def _asegurar_vigente(self):
+        with self._lock:
+            if self._construido_en is None or time.monotonic() - self._construido_en > self.vigencia:
+                self.construir()
+
+    def actualizar(self, instancia):
+        """Refleja una escritura; si el índice aún no se construyó no hace nada"""
+        with self._lock:
+            if self._construido_en is None:
+                return
+            self._quitar(instancia.pk)
+            if instancia.is_active:
+                self._agregar(instancia.pk, [getattr(instancia, campo) for campo in self.campos])
+
+    def eliminar(self, pk):
+        with self._lock:
+            if self._construido_en is not None:
+                self._quitar(pk)
+
+    def buscar(self, termino, limite=10, presupuesto_ms=PRESUPUESTO_MS):
+        """
+        Retorna ([(pk, puntaje)], parcial) ordenados por puntaje. El puntaje es
+        la fracción de trigramas del término presentes en el documento (similar
+        a word_similarity de pg_trgm); las palabras que empiezan con alguna
+        palabra del término se priorizan para el autocompletado. `parcial` es
+        True si se agotó el presupuesto de tiempo.
+        """
+        claves = trigramas(termino)
+        if not claves:
+            return [], False
+        prefijos = palabras(termino)
+
+        self._asegurar_vigente()
+        inicio = time.perf_counter()
+        limite_tiempo = inicio + presupuesto_ms / 1000
+        parcial = False
+
+        with self._lock:
+            coincidencias = Counter()
+            # Los trigramas menos frecuentes primero: si se agota el tiempo
+            # ya se contaron los más selectivos
+            for clave in sorted(claves, key=lambda c: len(self._trigramas.get(c, ()))):
+                coincidencias.update(self._trigramas.get(clave, ()))
+                if time.perf_counter() > limite_tiempo:
+                    parcial = True
+                    break
+
+            resultados = []
+            for posicion, (pk, encontrados) in enumerate(coincidencias.items()):
+                puntaje = encontrados / len(claves)
+                if puntaje < UMBRAL_SIMILITUD:
+                    continue
+                documento_claves, documento_palabras = self._documentos[pk]
+                es_prefijo = all(
+                    any(palabra.startswith(prefijo) for palabra in documento_palabras)
+                    for prefijo in prefijos
+                )
+                jaccard = encontrados / (len(claves) + len(documento_claves) - encontrados)
+                resultados.append((pk, es_prefijo, round(puntaje, 3), jaccard))
+                if posicion % 256 == 0 and time.perf_counter() > limite_tiempo:
+                    parcial = True
+                    break
+
+        resultados.sort(key=lambda r: (not r[1], -r[2], -r[3], r[0]))
+        return [(pk, puntaje) for pk, _, puntaje, _ in resultados[:limite]], parcial
+
+
+class BuscadorPersonas:
+    """Búsqueda clasificada de personas: pg_trgm si está disponible, índice en memoria si no"""
+
+    _indices = {}
+    _pg_trgm = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def indice(cls, modelo):
+        with cls._lock:
+            if modelo not in cls._indices:
+                cls._indices[modelo] = IndiceTrigramas(modelo)
+            return cls._indices[modelo]
+
+    @classmethod
+    def pg_trgm_disponible(cls, alias='default'):
+        """True si la base de datos es PostgreSQL con la extensión pg_trgm instalada"""
+        if alias not in cls._pg_trgm:
+            connection = connections[alias]
+            disponible = False
+            if connection.vendor == 'postgresql':
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                        disponible = cursor.fetchone() is not None
+                except DatabaseError:
+                    disponible = False
+            cls._pg_trgm[alias] = disponible
+        return cls._pg_trgm[alias]
+
+    @classmethod
+    def buscar(cls, queryset, termino, limite=10):
+        """
+        Busca en el queryset (ya filtrado por permisos) y retorna
+        ([{ci, nombre_completo, email, puntaje}], parcial).
+        """
+        if cls.pg_trgm_disponible(queryset.db):
+            return cls._buscar_pg_trgm(queryset, termino, limite), False
+
+        # Se piden candidatos de más porque el queryset puede ocultar algunos
+        candidatos, parcial = cls.indice(queryset.model).buscar(termino, limite * 5)
+        puntajes = dict(candidatos)
+        visibles = {
+            fila['ci']: fila
+            for fila in queryset.filter(pk__in=puntajes).values('ci', 'nombre', 'apellido', 'email')
+        }
+        resultados = [
+            cls._formatear(visibles[pk], puntaje)
+            for pk, puntaje in candidatos if pk in visibles
+        ]
+        return resultados[:limite], parcial
+
+    @classmethod
+    def _buscar_pg_trgm(cls, queryset, termino, limite):
+        """
+        Cada palabra se filtra con ILIKE y el orden se da por similitud de
+        trigramas. Todos los filtros son icontains/istartswith, que PostgreSQL
+        traduce a UPPER(campo::text) LIKE: la expresión de los índices GIN
+        gin_trgm_ops de la migración 0001_indices_trigramas.
+        """
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models.functions import Greatest
+
+        filtro = Q()
+        for palabra in termino.split():
+            filtro &= (
+                Q(nombre__icontains=palabra) | Q(apellido__icontains=palabra) |
+                Q(email__icontains=palabra) | Q(ci__istartswith=palabra)
+            )
+        filas = queryset.filter(filtro).annotate(
+            puntaje=Greatest(*[TrigramWordSimilarity(termino, campo) for campo in CAMPOS_BUSQUEDA])
+        ).order_by('-puntaje', 'apellido', 'nombre').values(
+            'ci', 'nombre', 'apellido', 'email', 'puntaje'
+        )[:limite]
+        return [cls._formatear(fila, round(fila['puntaje'], 3)) for fila in filas]
+
+    @staticmethod
+    def _formatear(fila, puntaje):
+        return {
+            'ci': fila['ci'],
+            'nombre_completo': f"{fila['nombre']} {fila['apellido']}",
+            'email': fila['email'],
+            'puntaje': puntaje
+        }
@@ -0,0 +1,113 @@
+from datetime import date
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.students.models import Estudiante
+from apps.teachers.models import Docente
+from apps.tutors.models import Tutor
+from .services import BuscadorPersonas
+
+PERSONAS = [
+    ('P1', 'José', 'García', 'jgarcia@colegio.com'),
+    ('P2', 'Josefina', 'Pérez', 'jperez@colegio.com'),
+    ('P3', 'Ana', 'Garcés', 'agarces@colegio.com'),
+    ('Q4', 'Luis', 'Rojas', 'lrojas@colegio.com'),
+]
+
+
+class BusquedaBaseTestCase(TestCase):
+    """Estudiantes, docentes y tutores con los mismos nombres; el cliente entra como administrador"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for ci, nombre, apellido, email in PERSONAS:
+            datos = {'ci': ci, 'nombre': nombre, 'apellido': apellido, 'email': email}
+            Estudiante.objects.create(**datos, fecha_nacimiento=date(2012, 1, 1))
+            Docente.objects.create(**datos, telefono='70000000', fecha_ingreso=date(2020, 2, 1))
+            Tutor.objects.create(**datos, telefono='70000000')
+        cls.admin = User.objects.create_user('admin', password='clave12345')
+        cls.admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+    def setUp(self):
+        # El índice en memoria vive en el proceso: no debe arrastrar filas de otra prueba
+        BuscadorPersonas._indices.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class IndiceEnMemoriaTests(BusquedaBaseTestCase):
+
+    def buscar(self, termino, limite=10):
+        resultados, parcial = BuscadorPersonas.buscar(Estudiante.objects.filter(is_active=True), termino, limite)
+        self.assertFalse(parcial)
+        return [resultado['ci'] for resultado in resultados]
+
+    def test_sin_pg_trgm_usa_el_indice_en_memoria(self):
+        self.assertFalse(BuscadorPersonas.pg_trgm_disponible())
+        # Sin tildes ni mayúsculas; los prefijos van primero
+        self.assertEqual(self.buscar('GARCIA')[0], 'P1')
+        self.assertEqual(self.buscar('jose')[:2], ['P1', 'P2'])
+        # Similitud difusa: Garcés también aparece, pero detrás de quien coincide en todo
+        self.assertEqual(self.buscar('jose garc')[0], 'P1')
+        self.assertEqual(self.buscar('q4'), ['Q4'])
+        self.assertEqual(self.buscar('lrojas'), ['Q4'])
+        self.assertEqual(self.buscar('xyz'), [])
+
+    def test_refleja_las_escrituras_del_proceso(self):
+        self.assertEqual(self.buscar('rojas'), ['Q4'])
+
+        Estudiante.objects.create(
+            ci='P5', nombre='Marta', apellido='Rojas', email='mrojas@colegio.com',
+            fecha_nacimiento=date(2012, 1, 1)
+        )
+        self.assertEqual(sorted(self.buscar('rojas')), ['P5', 'Q4'])
+
+        estudiante = Estudiante.objects.get(ci='Q4')
+        estudiante.is_active = False
+        estudiante.save()
+        self.assertEqual(self.buscar('rojas'), ['P5'])
+
+        Estudiante.objects.get(ci='P5').delete()
+        self.assertEqual(self.buscar('rojas'), [])
+
+    def test_respeta_el_queryset_visible(self):
+        resultados, _ = BuscadorPersonas.buscar(Estudiante.objects.filter(ci='P2'), 'jose')
+        self.assertEqual([resultado['ci'] for resultado in resultados], ['P2'])
+
+    def test_presupuesto_agotado_devuelve_resultados_parciales(self):
+        _, parcial = BuscadorPersonas.indice(Estudiante).buscar('garcia', presupuesto_ms=0)
+        self.assertTrue(parcial)
+
+
+class AccionBuscarTests(BusquedaBaseTestCase):
+
+    URLS = ['/api/students/estudiantes/buscar/', '/api/teachers/docentes/buscar/', '/api/tutors/buscar/']
+
+    def test_buscar_en_cada_viewset_de_personas(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                respuesta = self.client.get(url, {'q': 'garcia', 'limite': 1})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(respuesta.data['total'], 1)
+                self.assertEqual(respuesta.data['resultados'][0]['ci'], 'P1')
+                self.assertEqual(respuesta.data['resultados'][0]['nombre_completo'], 'José García')
+
+                respuesta = self.client.get(url, {'q': 'jose'})
+                self.assertEqual([r['ci'] for r in respuesta.data['resultados']][:2], ['P1', 'P2'])
+                self.assertFalse(respuesta.data['parcial'])
+
+    def test_termino_corto_devuelve_400(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, {'q': 'a'}).status_code, 400)
+
+    def test_buscar_aplica_el_filtro_por_rol(self):
+        usuario = User.objects.create_user('docente', password='clave12345')
+        usuario.groups.add(Group.objects.get_or_create(name='Docente')[0])
+        Docente.objects.filter(ci='P2').update(usuario=usuario)
+        self.client.force_authenticate(usuario)
+
+        respuesta = self.client.get('/api/teachers/docentes/buscar/', {'q': 'jose'})
+        self.assertEqual([r['ci'] for r in respuesta.data['resultados']], ['P2'])
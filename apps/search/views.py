@@ -0,0 +1,37 @@
+# apps/search/views.py
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .services import BuscadorPersonas
+
+
+class BusquedaPersonasMixin:
+    """Agrega la acción `buscar` (autocompletado clasificado) a los viewsets de personas"""
+    
+    LIMITE_BUSQUEDA = 50
+    
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """Búsqueda por nombre, apellido, CI o email ordenada por similitud"""
+        termino = request.query_params.get('q', '').strip()
+        if len(termino) < 2:
+            return Response(
+                {'error': 'q debe tener al menos 2 caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limite = min(int(request.query_params.get('limite', 10)), self.LIMITE_BUSQUEDA)
+        except ValueError:
+            limite = 10
+        
+        resultados, parcial = BuscadorPersonas.buscar(self.get_queryset(), termino, max(limite, 1))
+        
+        return Response({
+            'termino': termino,
+            'parcial': parcial,
+            'total': len(resultados),
+            'resultados': resultados
+        })
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.functions import Lower
 
 class Estudiante(models.Model):
     ci = models.CharField(max_length=20, primary_key=True)
@@ -18,6 +19,10 @@ class Estudiante(models.Model):
         db_table = 'estudiante'
         verbose_name = 'Estudiante'
         verbose_name_plural = 'Estudiantes'
+        indexes = [
+            # Unicidad de email sin mayúsculas en la importación masiva
+            models.Index(Lower('email'), name='estudiante_email_lower_idx'),
+        ]
         
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
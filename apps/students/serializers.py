@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.db.models import Prefetch
 from .models import Estudiante, Inscripcion, TutorEstudiante
 
 class EstudianteSerializer(serializers.ModelSerializer):
@@ -13,29 +14,53 @@ class EstudianteSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at', 'usuario']
     
+    @staticmethod
+    def preparar_queryset(queryset):
+        """Carga usuario, inscripción activa y tutores activos en consultas fijas por página"""
+        return queryset.select_related('usuario').prefetch_related(
+            Prefetch(
+                'inscripcion_set',
+                queryset=Inscripcion.objects.filter(estado='ACTIVO').select_related('codigo_curso').order_by('-fecha_inscripcion'),
+                to_attr='inscripciones_activas'
+            ),
+            Prefetch(
+                'tutorestudiante_set',
+                queryset=TutorEstudiante.objects.filter(is_active=True).select_related('ci_tutor'),
+                to_attr='tutores_activos'
+            )
+        )
+    
     def get_curso_actual(self, obj):
         """Obtiene el curso actual del estudiante"""
-        try:
-            inscripcion_activa = Inscripcion.objects.get(
+        if hasattr(obj, 'inscripciones_activas'):
+            inscripcion_activa = obj.inscripciones_activas[0] if obj.inscripciones_activas else None
+        else:
+            inscripcion_activa = Inscripcion.objects.filter(
                 ci_estudiante=obj,
                 estado='ACTIVO'
-            )
-            return {
-                'codigo': inscripcion_activa.codigo_curso.codigo,
-                'nombre': inscripcion_activa.codigo_curso.nombre,
-                'nivel': inscripcion_activa.codigo_curso.nivel,
-                'paralelo': inscripcion_activa.codigo_curso.paralelo,
-                'gestion': inscripcion_activa.codigo_curso.gestion
-            }
-        except Inscripcion.DoesNotExist:
+            ).select_related('codigo_curso').order_by('-fecha_inscripcion').first()
+        
+        if inscripcion_activa is None:
             return None
+        
+        curso = inscripcion_activa.codigo_curso
+        return {
+            'codigo': curso.codigo,
+            'nombre': curso.nombre,
+            'nivel': curso.nivel,
+            'paralelo': curso.paralelo,
+            'gestion': curso.gestion
+        }
     
     def get_tutores(self, obj):
         """Obtiene los tutores del estudiante"""
-        relaciones = TutorEstudiante.objects.filter(
-            ci_estudiante=obj,
-            is_active=True
-        ).select_related('ci_tutor')
+        if hasattr(obj, 'tutores_activos'):
+            relaciones = obj.tutores_activos
+        else:
+            relaciones = TutorEstudiante.objects.filter(
+                ci_estudiante=obj,
+                is_active=True
+            ).select_related('ci_tutor')
         
         return [
             {
@@ -85,6 +110,23 @@ class EstudianteCreateSerializer(serializers.ModelSerializer):
         
         return estudiante
 
+class EstudianteImportacionSerializer(serializers.Serializer):
+    """Fila de la importación masiva de estudiantes (validación sin consultas)"""
+    ci = serializers.CharField(max_length=20)
+    nombre = serializers.CharField(max_length=50)
+    apellido = serializers.CharField(max_length=50)
+    email = serializers.EmailField()
+    fecha_nacimiento = serializers.DateField()
+    codigo_curso = serializers.CharField(max_length=10, required=False)
+    fecha_inscripcion = serializers.DateField(required=False)
+    ci_tutor = serializers.CharField(max_length=20, required=False)
+    parentesco = serializers.ChoiceField(choices=TutorEstudiante.PARENTESCO_CHOICES, required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('ci_tutor') and not attrs.get('parentesco'):
+            raise serializers.ValidationError("parentesco es requerido cuando se indica ci_tutor")
+        return attrs
+
 class EstudianteUpdateSerializer(serializers.ModelSerializer):
     """Serializer para actualizar estudiante existente"""
     
@@ -158,7 +200,7 @@ class TutorEstudianteSerializer(serializers.ModelSerializer):
 class EstudianteDetailSerializer(serializers.ModelSerializer):
     usuario_info = serializers.SerializerMethodField()
     inscripciones = serializers.SerializerMethodField()
-    tutores = TutorEstudianteSerializer(source='tutoresponse_estudiante_set', many=True, read_only=True)
+    tutores = TutorEstudianteSerializer(source='tutorestudiante_set', many=True, read_only=True)
     rendimiento_resumen = serializers.SerializerMethodField()
     
     class Meta:
@@ -177,37 +219,39 @@ class EstudianteDetailSerializer(serializers.ModelSerializer):
         return None
     
     def get_inscripciones(self, obj):
-        inscripciones = Inscripcion.objects.filter(ci_estudiante=obj).order_by('-fecha_inscripcion')
+        inscripciones = Inscripcion.objects.filter(ci_estudiante=obj).select_related(
+            'ci_estudiante', 'codigo_curso'
+        ).order_by('-fecha_inscripcion')
         return InscripcionSerializer(inscripciones, many=True).data
     
     def get_rendimiento_resumen(self, obj):
         """Obtiene un resumen del rendimiento del estudiante"""
         from apps.grades.models import Nota
-        from apps.attendance.models import Asistencia
-        from django.db.models import Avg, Count, Q
+        from apps.attendance.models import ResumenAsistenciaMensual
+        from django.db.models import Avg, Count, Q, Sum
         
-        # Promedio general de notas
-        promedio_notas = Nota.objects.filter(
+        # Promedio y cantidad de notas en una sola consulta
+        notas_stats = Nota.objects.filter(
             ci_estudiante=obj,
             is_active=True
-        ).aggregate(promedio=Avg('nota'))['promedio']
+        ).aggregate(promedio=Avg('nota'), total=Count('id'))
         
-        # Porcentaje de asistencia
-        asistencia_stats = Asistencia.objects.filter(
-            ci_estudiante=obj,
-            is_active=True
+        # Porcentaje de asistencia (presente o tardanza) desde los resúmenes mensuales
+        asistencia_stats = ResumenAsistenciaMensual.objects.filter(
+            ci_estudiante=obj
         ).aggregate(
-            total=Count('id'),
-            presentes=Count('id', filter=Q(asistio=True))
+            clases=Sum('total'),
+            asistidas=Sum('total', filter=Q(estado__in=['presente', 'tardanza']))
         )
+        total_clases = asistencia_stats['clases'] or 0
         
         porcentaje_asistencia = 0
-        if asistencia_stats['total'] > 0:
-            porcentaje_asistencia = (asistencia_stats['presentes'] / asistencia_stats['total']) * 100
+        if total_clases > 0:
+            porcentaje_asistencia = ((asistencia_stats['asistidas'] or 0) / total_clases) * 100
         
         return {
-            'promedio_general': round(promedio_notas or 0, 2),
+            'promedio_general': round(notas_stats['promedio'] or 0, 2),
             'porcentaje_asistencia': round(porcentaje_asistencia, 2),
-            'total_notas': Nota.objects.filter(ci_estudiante=obj, is_active=True).count(),
-            'total_clases': asistencia_stats['total']
-        }
\ No newline at end of file
+            'total_notas': notas_stats['total'],
+            'total_clases': total_clases
+        }
@@ -0,0 +1,177 @@
+# apps/students/services.py
+
+from datetime import date
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .models import Estudiante, Inscripcion, TutorEstudiante
+from .serializers import EstudianteImportacionSerializer
+
+
+class ImportadorEstudiantes:
+    """
+    Importación masiva de estudiantes con inscripción y tutor opcionales.
+    Las filas se procesan por bloques: cada bloque valida unicidad de CI y
+    email y resuelve cursos y tutores con consultas IN, y luego inserta con
+    bulk_create dentro de su propia transacción. Las filas con errores se
+    omiten y se informan con su número de línea; si el bloque choca con una
+    restricción de la base (p. ej. un alta concurrente), se reintenta fila
+    por fila para informar solo las filas en conflicto.
+    """
+
+    TAMANIO_BLOQUE = 500
+
+    def __init__(self, tamanio_bloque=TAMANIO_BLOQUE):
+        self.tamanio_bloque = tamanio_bloque
+        self.cis_vistos = set()
+        self.emails_vistos = set()
+        self.cursos = {}
+        self.tutores = {}
+        self.creados = []
+        self.inscripciones = 0
+        self.tutores_asignados = 0
+        self.errores = []
+
+    @staticmethod
+    def _limpiar(fila):
+        """Descarta columnas vacías y espacios (las celdas vacías de CSV equivalen a omitidas)"""
+        return {
+            clave.strip(): valor.strip() if isinstance(valor, str) else valor
+            for clave, valor in fila.items()
+            if clave and valor is not None and not (isinstance(valor, str) and not valor.strip())
+        }
+
+    def importar(self, filas, primera_linea=1):
+        """
+        Importa un iterable de dicts (filas CSV o elementos JSON). `primera_linea`
+        es el número de línea de la primera fila (2 en CSV por el encabezado).
+        """
+        numeradas = enumerate(filas, primera_linea)
+        while True:
+            bloque = list(islice(numeradas, self.tamanio_bloque))
+            if not bloque:
+                break
+            self._importar_bloque(bloque)
+
+        self.errores.sort(key=lambda error: error['linea'])
+        return {
+            'estudiantes_creados': len(self.creados),
+            'inscripciones_creadas': self.inscripciones,
+            'tutores_asignados': self.tutores_asignados,
+            'total_errores': len(self.errores),
+            'errores': self.errores
+        }
+
+    def _error(self, linea, fila, errores):
+        self.errores.append({'linea': linea, 'ci': fila.get('ci'), 'errores': errores})
+
+    def _importar_bloque(self, bloque):
+        # Validación de formato sin consultas
+        validas = []
+        for linea, fila in bloque:
+            if not isinstance(fila, dict):
+                self._error(linea, {}, {'fila': ['Formato de fila inválido']})
+                continue
+            serializer = EstudianteImportacionSerializer(data=self._limpiar(fila))
+            if serializer.is_valid():
+                validas.append((linea, serializer.validated_data))
+            else:
+                self._error(linea, fila, serializer.errors)
+
+        # Unicidad y referencias resueltas con una consulta IN por tipo
+        cis = {datos['ci'] for _, datos in validas}
+        emails = {datos['email'].lower() for _, datos in validas}
+        cis_existentes = set(Estudiante.objects.filter(ci__in=cis).values_list('ci', flat=True))
+        # LOWER(email) IN (...) usa el índice funcional estudiante_email_lower_idx
+        emails_existentes = set(
+            Estudiante.objects.annotate(email_normalizado=Lower('email')).filter(
+                email_normalizado__in=emails
+            ).values_list('email_normalizado', flat=True)
+        )
+        self._resolver(self.cursos, {datos.get('codigo_curso') for _, datos in validas}, 'curso')
+        self._resolver(self.tutores, {datos.get('ci_tutor') for _, datos in validas}, 'tutor')
+
+        altas = []
+        for linea, datos in validas:
+            errores = {}
+            email = datos['email'].lower()
+            if datos['ci'] in cis_existentes:
+                errores['ci'] = ['Ya existe un estudiante con este CI']
+            elif datos['ci'] in self.cis_vistos:
+                errores['ci'] = ['CI duplicado en el archivo']
+            if email in emails_existentes:
+                errores['email'] = ['Ya existe un estudiante con este email']
+            elif email in self.emails_vistos:
+                errores['email'] = ['Email duplicado en el archivo']
+            curso = self.cursos.get(datos.get('codigo_curso'))
+            if datos.get('codigo_curso') and curso is None:
+                errores['codigo_curso'] = ['El curso no existe o no está activo']
+            tutor = self.tutores.get(datos.get('ci_tutor'))
+            if datos.get('ci_tutor') and tutor is None:
+                errores['ci_tutor'] = ['El tutor no existe o no está activo']
+            if errores:
+                self._error(linea, datos, errores)
+                continue
+
+            self.cis_vistos.add(datos['ci'])
+            self.emails_vistos.add(email)
+            estudiante = Estudiante(
+                ci=datos['ci'],
+                nombre=datos['nombre'],
+                apellido=datos['apellido'],
+                email=datos['email'],
+                fecha_nacimiento=datos['fecha_nacimiento']
+            )
+            inscripcion = relacion = None
+            if curso is not None:
+                inscripcion = Inscripcion(
+                    ci_estudiante=estudiante,
+                    codigo_curso=curso,
+                    fecha_inscripcion=datos.get('fecha_inscripcion') or date.today(),
+                    estado='ACTIVO'
+                )
+            if tutor is not None:
+                relacion = TutorEstudiante(
+                    ci_tutor=tutor,
+                    ci_estudiante=estudiante,
+                    parentesco=datos['parentesco']
+                )
+            altas.append((linea, estudiante, inscripcion, relacion))
+
+        try:
+            self._insertar(altas)
+        except IntegrityError:
+            for alta in altas:
+                try:
+                    self._insertar([alta])
+                except IntegrityError as e:
+                    self._error(alta[0], {'ci': alta[1].ci}, {'fila': [f'Conflicto al guardar: {e}']})
+
+    def _insertar(self, altas):
+        """Inserta estudiantes, inscripciones y tutores de `altas` en una transacción"""
+        with transaction.atomic():
+            creados = Estudiante.objects.bulk_create([estudiante for _, estudiante, _, _ in altas])
+            inscripciones = Inscripcion.objects.bulk_create(
+                [inscripcion for _, _, inscripcion, _ in altas if inscripcion is not None]
+            )
+            relaciones = TutorEstudiante.objects.bulk_create(
+                [relacion for _, _, _, relacion in altas if relacion is not None]
+            )
+        self.creados += creados
+        self.inscripciones += len(inscripciones)
+        self.tutores_asignados += len(relaciones)
+
+    def _resolver(self, cache, claves, tipo):
+        """Carga en `cache` los cursos o tutores activos aún no consultados"""
+        from apps.courses.models import Curso
+        from apps.tutors.models import Tutor
+
+        faltantes = {clave for clave in claves if clave and clave not in cache}
+        if not faltantes:
+            return
+        modelo = Curso if tipo == 'curso' else Tutor
+        encontrados = modelo.objects.filter(is_active=True).in_bulk(faltantes)
+        for clave in faltantes:
+            cache[clave] = encontrados.get(clave)
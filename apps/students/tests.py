@@ -1,3 +1,123 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.courses.models import Curso
+from apps.tutors.models import Tutor
+from .models import Estudiante, Inscripcion, TutorEstudiante
+from .services import ImportadorEstudiantes
+
+URL_IMPORTAR = '/api/students/estudiantes/importar/'
+
+
+def fila(ci, email=None, **extra):
+    datos = {
+        'ci': ci, 'nombre': f'Nombre{ci}', 'apellido': f'Apellido{ci}',
+        'email': email or f'{ci.lower()}@colegio.com', 'fecha_nacimiento': '2012-05-01'
+    }
+    datos.update(extra)
+    return datos
+
+
+class ImportacionEstudiantesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(codigo='C1', nombre='1A', nivel='1', paralelo='A', gestion=2026)
+        cls.tutor = Tutor.objects.create(
+            ci='T1', nombre='Tutor', apellido='Uno', email='tutor@colegio.com', telefono='700'
+        )
+        cls.admin = User.objects.create_user('admin', password='clave12345')
+        cls.admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_importacion_json_con_inscripcion_y_tutor(self):
+        respuesta = self.client.post(URL_IMPORTAR, {'estudiantes': [
+            fila('E1', codigo_curso='C1', ci_tutor='T1', parentesco='MADRE'),
+            fila('E2', codigo_curso='C1'),
+            fila('E3'),
+        ]}, format='json')
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['estudiantes_creados'], 3)
+        self.assertEqual(respuesta.data['inscripciones_creadas'], 2)
+        self.assertEqual(respuesta.data['tutores_asignados'], 1)
+        self.assertEqual(Inscripcion.objects.filter(codigo_curso=self.curso, estado='ACTIVO').count(), 2)
+        self.assertTrue(TutorEstudiante.objects.filter(ci_tutor=self.tutor, ci_estudiante='E1').exists())
+
+    def test_importacion_csv_informa_lineas_con_errores(self):
+        contenido = (
+            'ci,nombre,apellido,email,fecha_nacimiento,codigo_curso\n'
+            'E1,Ana,Pérez,ana@colegio.com,2012-01-01,C1\n'
+            'E1,Ana,Pérez,otra@colegio.com,2012-01-01,\n'
+            'E2,Luis,Soto,no-es-email,2012-01-01,\n'
+            'E3,Eva,Ruiz,eva@colegio.com,2012-01-01,NOEXISTE\n'
+        ).encode('utf-8')
+        archivo = SimpleUploadedFile('estudiantes.csv', contenido, content_type='text/csv')
+        respuesta = self.client.post(URL_IMPORTAR, {'archivo': archivo}, format='multipart')
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['estudiantes_creados'], 1)
+        self.assertEqual([error['linea'] for error in respuesta.data['errores']], [3, 4, 5])
+
+    def test_email_existente_se_compara_sin_mayusculas(self):
+        Estudiante.objects.create(
+            ci='X1', nombre='Previo', apellido='Existente',
+            email='Mixed@X.com', fecha_nacimiento=date(2012, 1, 1)
+        )
+        respuesta = self.client.post(URL_IMPORTAR, {'estudiantes': [
+            fila('E1', email='Mixed@X.com'),
+            fila('E2', email='MIXED@x.com'),
+        ]}, format='json')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data['estudiantes_creados'], 0)
+        self.assertEqual(
+            [error['errores']['email'] for error in respuesta.data['errores']],
+            [['Ya existe un estudiante con este email']] * 2
+        )
+
+    def test_email_sin_mayusculas_filtra_por_el_indice_funcional(self):
+        restricciones = connection.introspection.get_constraints(connection.cursor(), Estudiante._meta.db_table)
+        self.assertIn('estudiante_email_lower_idx', restricciones)
+        with CaptureQueriesContext(connection) as consultas:
+            ImportadorEstudiantes().importar([fila('E1', email='Nuevo@X.com')])
+        self.assertTrue(any(
+            'LOWER("estudiante"."email") IN' in consulta['sql'] for consulta in consultas.captured_queries
+        ))
+
+    def test_conflicto_en_la_base_se_informa_por_fila(self):
+        resolver = ImportadorEstudiantes._resolver
+
+        def alta_concurrente(importador, *args):
+            # Otro proceso inserta E2 entre la validación y el bulk_create
+            Estudiante.objects.get_or_create(
+                ci='E2', defaults={
+                    'nombre': 'Otro', 'apellido': 'Proceso',
+                    'email': 'concurrente@colegio.com', 'fecha_nacimiento': date(2012, 1, 1)
+                }
+            )
+            return resolver(importador, *args)
+
+        with mock.patch.object(ImportadorEstudiantes, '_resolver', alta_concurrente):
+            resultado = ImportadorEstudiantes().importar([fila('E1'), fila('E2'), fila('E3')])
+
+        self.assertEqual(resultado['estudiantes_creados'], 2)
+        self.assertEqual([error['linea'] for error in resultado['errores']], [2])
+        self.assertEqual(set(Estudiante.objects.values_list('ci', flat=True)), {'E1', 'E2', 'E3'})
+        self.assertEqual(Estudiante.objects.get(ci='E2').nombre, 'Otro')
 
-# Create your tests here.
+    def test_solo_administradores_importan(self):
+        usuario = User.objects.create_user('docente', password='clave12345')
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.post(URL_IMPORTAR, {'estudiantes': [fila('E1')]}, format='json')
+        self.assertEqual(respuesta.status_code, 403)
@@ -1,14 +1,17 @@
 #apps/students/views.py:
 
+import codecs
+import csv
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Q
+from django.db.models import Q, Prefetch
 from django.db import transaction
 from .models import Estudiante, Inscripcion, TutorEstudiante
+from .services import ImportadorEstudiantes
 from django.contrib.auth.models import User
 from .serializers import (
     EstudianteSerializer, EstudianteCreateSerializer, EstudianteDetailSerializer,
@@ -16,8 +19,11 @@ from .serializers import (
     EstudianteUpdateSerializer, AsignarUsuarioSerializer
 )
 from apps.authentication.permissions import IsAdministradorOrReadOnly, IsAdministrador, IsOwnerOrAdministrador
+from apps.authentication.contexto import obtener_contexto
+from apps.search.views import BusquedaPersonasMixin
+from apps.search.services import BuscadorPersonas
 
-class EstudianteViewSet(viewsets.ModelViewSet):
+class EstudianteViewSet(BusquedaPersonasMixin, viewsets.ModelViewSet):
     queryset = Estudiante.objects.filter(is_active=True)
     serializer_class = EstudianteSerializer
     permission_classes = [IsAuthenticated]
@@ -38,39 +44,40 @@ class EstudianteViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        user = self.request.user
+        contexto = obtener_contexto(self.request)
         
         # Si es estudiante, solo puede ver su propia información
-        if user.groups.filter(name='Estudiante').exists():
-            try:
-                estudiante = Estudiante.objects.get(usuario=user)
-                queryset = queryset.filter(ci=estudiante.ci)
-            except Estudiante.DoesNotExist:
+        if contexto.es_estudiante:
+            if contexto.ci_estudiante is None:
                 queryset = queryset.none()
+            else:
+                queryset = queryset.filter(ci=contexto.ci_estudiante)
         
         # Si es docente, puede ver estudiantes de sus cursos
-        elif user.groups.filter(name='Docente').exists():
-            from apps.teachers.models import Docente, AsignacionCurso
-            try:
-                docente = Docente.objects.get(usuario=user)
-                # Obtener cursos asignados al docente
-                asignaciones = AsignacionCurso.objects.filter(
-                    ci_docente=docente,
-                    is_active=True
-                ).values_list('codigo_curso', flat=True)
-                
-                # Obtener estudiantes inscritos en esos cursos
+        elif contexto.es_docente:
+            if contexto.ci_docente is None:
+                queryset = queryset.none()
+            else:
+                # Obtener estudiantes inscritos en los cursos asignados
                 inscripciones = Inscripcion.objects.filter(
-                    codigo_curso__in=asignaciones,
+                    codigo_curso__in=contexto.cursos_asignados,
                     estado='ACTIVO'
                 ).values_list('ci_estudiante', flat=True)
                 
                 queryset = queryset.filter(ci__in=inscripciones)
-            except Docente.DoesNotExist:
-                queryset = queryset.none()
         
         # Administradores pueden ver todo (no se modifica queryset)
         
+        if self.action == 'list':
+            queryset = EstudianteSerializer.preparar_queryset(queryset)
+        elif self.action == 'retrieve':
+            queryset = queryset.select_related('usuario').prefetch_related(
+                Prefetch(
+                    'tutorestudiante_set',
+                    queryset=TutorEstudiante.objects.select_related('ci_tutor', 'ci_estudiante')
+                )
+            )
+        
         return queryset
     
     def get_permissions(self):
@@ -87,7 +94,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def asignar_usuario(self, request, pk=None):
         """Asignar usuario existente a estudiante"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden asignar usuarios'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -119,7 +126,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def desasignar_usuario(self, request, pk=None):
         """Desasignar usuario de estudiante"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden desasignar usuarios'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -144,7 +151,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def inscribir_curso(self, request, pk=None):
         """Inscribir estudiante en un curso"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden inscribir estudiantes'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -176,7 +183,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def dar_baja(self, request, pk=None):
         """Dar de baja a un estudiante de su curso actual"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden dar de baja estudiantes'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -210,15 +217,59 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'Estudiante dado de baja exitosamente'})
     
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """
+        Importación masiva de estudiantes con inscripción y tutor opcionales.
+        Acepta un archivo CSV (campo `archivo`) o JSON {"estudiantes": [...]}
+        con columnas ci, nombre, apellido, email, fecha_nacimiento y
+        opcionalmente codigo_curso, fecha_inscripcion, ci_tutor y parentesco.
+        """
+        if not obtener_contexto(request).es_administrador:
+            return Response(
+                {'error': 'Solo administradores pueden importar estudiantes'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        importador = ImportadorEstudiantes()
+        archivo = request.FILES.get('archivo')
+        if archivo is not None:
+            # Lectura en streaming: las líneas se decodifican a medida que se procesan
+            filas = csv.DictReader(codecs.iterdecode(archivo, 'utf-8-sig'))
+            try:
+                resultado = importador.importar(filas, primera_linea=2)
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response(
+                    {'error': f'Archivo CSV inválido: {str(e)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            filas = request.data.get('estudiantes')
+            if not isinstance(filas, list):
+                return Response(
+                    {'error': 'Debe enviar un archivo CSV o una lista "estudiantes"'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            resultado = importador.importar(filas)
+        
+        # bulk_create no emite señales: se actualiza el índice de búsqueda
+        indice = BuscadorPersonas.indice(Estudiante)
+        for estudiante in importador.creados:
+            indice.actualizar(estudiante)
+        
+        return Response(
+            resultado,
+            status=status.HTTP_201_CREATED if resultado['estudiantes_creados'] else status.HTTP_400_BAD_REQUEST
+        )
+    
     @action(detail=True, methods=['get'])
     def rendimiento(self, request, pk=None):
-        """Obtener rendimiento académico del estudiante"""
+        """Obtener rendimiento académico del estudiante (detalle=false omite las notas individuales)"""
         estudiante = self.get_object()
         
         # Verificar permisos: estudiante solo puede ver su propio rendimiento
-        user = request.user
-        if user.groups.filter(name='Estudiante').exists():
-            if estudiante.usuario != user:
+        if obtener_contexto(request).es_estudiante:
+            if estudiante.usuario_id != request.user.id:
                 return Response(
                     {'error': 'No puede ver rendimiento de otros estudiantes'}, 
                     status=status.HTTP_403_FORBIDDEN
@@ -226,64 +277,69 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         
         from apps.grades.models import Nota
         from apps.attendance.models import Asistencia
-        from apps.participation.models import Participacion
+        from apps.participation.models import PuntajeParticipacion
+        from apps.teachers.models import AsignacionCurso
+        from django.db.models import Avg
         
-        # Obtener datos por materia
-        rendimiento_por_materia = {}
+        con_detalle = request.query_params.get('detalle', 'true').lower() != 'false'
         
         # Inscripción actual
-        try:
-            inscripcion_activa = Inscripcion.objects.get(
-                ci_estudiante=estudiante,
-                estado='ACTIVO'
-            )
-            curso = inscripcion_activa.codigo_curso
-            
-            # Obtener materias del curso
-            from apps.teachers.models import AsignacionCurso
-            asignaciones = AsignacionCurso.objects.filter(
-                codigo_curso=curso,
-                is_active=True
-            ).select_related('codigo_materia')
-            
-            for asignacion in asignaciones:
-                materia = asignacion.codigo_materia
-                
-                # Notas
-                notas = Nota.objects.filter(
-                    ci_estudiante=estudiante,
-                    codigo_materia=materia,
-                    codigo_curso=curso,
-                    is_active=True
-                ).order_by('created_at')
-                
-                # Asistencia
-                porcentaje_asistencia = Asistencia.calcular_porcentaje_asistencia(
-                    estudiante, materia, curso
-                )
-                
-                # Participación
-                promedio_participacion = Participacion.calcular_promedio_participacion(
-                    estudiante, materia, curso
-                )
-                
-                rendimiento_por_materia[materia.nombre] = {
-                    'materia_codigo': materia.codigo,
-                    'docente': asignacion.ci_docente.nombre_completo,
-                    'notas': [
-                        {
-                            'criterio': nota.id_criterio.descripcion,
-                            'nota': float(nota.nota),
-                            'fecha': nota.created_at.date()
-                        } for nota in notas
-                    ],
-                    'promedio_notas': sum(float(nota.nota) for nota in notas) / len(notas) if notas else 0,
-                    'porcentaje_asistencia': porcentaje_asistencia,
-                    'promedio_participacion': float(promedio_participacion)
-                }
-            
-        except Inscripcion.DoesNotExist:
-            return Response({'error': 'Estudiante no tiene inscripción activa'}, status=status.HTTP_404)
+        inscripcion_activa = Inscripcion.objects.filter(
+            ci_estudiante=estudiante,
+            estado='ACTIVO'
+        ).select_related('codigo_curso').first()
+        if inscripcion_activa is None:
+            return Response({'error': 'Estudiante no tiene inscripción activa'}, status=status.HTTP_404_NOT_FOUND)
+        curso = inscripcion_activa.codigo_curso
+        
+        # Obtener materias del curso
+        asignaciones = list(AsignacionCurso.objects.filter(
+            codigo_curso=curso,
+            is_active=True
+        ).select_related('codigo_materia', 'ci_docente'))
+        codigos = [asignacion.codigo_materia_id for asignacion in asignaciones]
+        
+        # Una consulta agrupada por dominio, indexada por materia
+        notas_qs = Nota.objects.filter(
+            ci_estudiante=estudiante,
+            codigo_curso=curso,
+            codigo_materia__in=codigos,
+            is_active=True
+        )
+        promedios_notas = dict(
+            notas_qs.values('codigo_materia').annotate(promedio=Avg('nota')).values_list('codigo_materia', 'promedio')
+        )
+        asistencias = Asistencia.obtener_estadisticas_lote([estudiante], codigos, curso)
+        participaciones = dict(PuntajeParticipacion.objects.filter(
+            ci_estudiante=estudiante,
+            codigo_curso=curso,
+            codigo_materia__in=codigos
+        ).values_list('codigo_materia', 'promedio'))
+        
+        notas_por_materia = {}
+        if con_detalle:
+            for fila in notas_qs.values(
+                'codigo_materia', 'id_criterio__descripcion', 'nota', 'created_at'
+            ).order_by('created_at', 'id'):
+                notas_por_materia.setdefault(fila['codigo_materia'], []).append({
+                    'criterio': fila['id_criterio__descripcion'],
+                    'nota': float(fila['nota']),
+                    'fecha': fila['created_at'].date()
+                })
+        
+        rendimiento_por_materia = {}
+        for asignacion in asignaciones:
+            materia = asignacion.codigo_materia
+            datos = {
+                'materia_codigo': materia.codigo,
+                'docente': asignacion.ci_docente.nombre_completo,
+                'promedio_notas': float(promedios_notas.get(materia.codigo) or 0),
+                'porcentaje_asistencia': asistencias[(estudiante.ci, materia.codigo)]['porcentaje_asistencia'],
+                'promedio_participacion': float(participaciones.get(materia.codigo) or 0)
+            }
+            if con_detalle:
+                datos['notas'] = notas_por_materia.get(materia.codigo, [])
+            rendimiento_por_materia[materia.nombre] = datos
         
         return Response({
             'estudiante': EstudianteSerializer(estudiante).data,
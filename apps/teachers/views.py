@@ -16,8 +16,10 @@ from .serializers import (
     DocenteUpdateSerializer, AsignarUsuarioDocenteSerializer
 )
 from apps.authentication.permissions import IsAdministradorOrReadOnly, IsAdministrador
+from apps.authentication.contexto import obtener_contexto
+from apps.search.views import BusquedaPersonasMixin
 
-class DocenteViewSet(viewsets.ModelViewSet):
+class DocenteViewSet(BusquedaPersonasMixin, viewsets.ModelViewSet):
     queryset = Docente.objects.filter(is_active=True)
     serializer_class = DocenteSerializer
     permission_classes = [IsAuthenticated, IsAdministradorOrReadOnly]
@@ -38,19 +40,19 @@ class DocenteViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         
         # Si es docente, solo puede ver su propia información
-        if self.request.user.groups.filter(name='Docente').exists():
-            try:
-                docente = Docente.objects.get(usuario=self.request.user)
-                queryset = queryset.filter(ci=docente.ci)
-            except Docente.DoesNotExist:
+        contexto = obtener_contexto(self.request)
+        if contexto.es_docente:
+            if contexto.ci_docente is None:
                 queryset = queryset.none()
+            else:
+                queryset = queryset.filter(ci=contexto.ci_docente)
         
         return queryset
     @action(detail=True, methods=['post'])
 
     def asignar_usuario(self, request, pk=None):
         """Asignar usuario existente a docente"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden asignar usuarios'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -82,7 +84,7 @@ class DocenteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def desasignar_usuario(self, request, pk=None):
         """Desasignar usuario de docente"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden desasignar usuarios'}, 
                 status=status.HTTP_403_FORBIDDEN
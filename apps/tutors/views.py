@@ -9,8 +9,10 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Tutor
 from .serializers import TutorSerializer, TutorCreateSerializer, TutorDetailSerializer
 from apps.authentication.permissions import IsAdministradorOrReadOnly
+from apps.authentication.contexto import obtener_contexto
+from apps.search.views import BusquedaPersonasMixin
 
-class TutorViewSet(viewsets.ModelViewSet):
+class TutorViewSet(BusquedaPersonasMixin, viewsets.ModelViewSet):
     queryset = Tutor.objects.filter(is_active=True)
     serializer_class = TutorSerializer
     permission_classes = [IsAuthenticated, IsAdministradorOrReadOnly]
@@ -28,7 +30,7 @@ class TutorViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def asignar_estudiante(self, request, pk=None):
         """Asignar un estudiante al tutor"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden asignar estudiantes a tutores'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -97,7 +99,7 @@ class TutorViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['delete'])
     def desasignar_estudiante(self, request, pk=None):
         """Desasignar un estudiante del tutor"""
-        if not request.user.groups.filter(name='Administrador').exists():
+        if not obtener_contexto(request).es_administrador:
             return Response(
                 {'error': 'Solo administradores pueden desasignar estudiantes de tutores'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -0,0 +1,167 @@
+# core/pagination.py
+
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+from django.db.models.query import ModelIterable
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PaginacionFlexible(PageNumberPagination):
+    """
+    Paginación por número de página (comportamiento por defecto) con dos
+    modos opcionales para listas grandes:
+
+    - ?paginacion=cursor (o ?cursor=...): paginación por clave (keyset) sobre
+      el orden estable `orden_cursor` de la vista, p. ej. ('-fecha', '-id').
+      Cada página filtra desde la última fila de la anterior: no hay COUNT ni
+      OFFSET y las páginas profundas cuestan lo mismo que la primera. Solo
+      se avanza: `previous` es siempre null. Los querysets agrupados o de
+      values() (estadísticas, rankings) no admiten cursor y se paginan sin
+      conteo.
+    - ?sin_conteo=true: páginas numeradas sin COUNT(*); se consulta una fila
+      de más para saber si existe la página siguiente.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.modo = 'numerada'
+
+        orden = getattr(view, 'orden_cursor', None)
+        pide_cursor = (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get('paginacion') == 'cursor'
+        )
+        if pide_cursor and orden and self._admite_cursor(queryset):
+            self.modo = 'cursor'
+            return self._paginar_cursor(queryset, request, orden)
+
+        if pide_cursor or request.query_params.get('sin_conteo', 'false').lower() == 'true':
+            self.modo = 'sin_conteo'
+            return self._paginar_sin_conteo(queryset, request)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def posicion_inicial(self):
+        """Posición (desde 1) de la primera fila de la página, None en modo cursor"""
+        if self.modo == 'numerada':
+            return self.page.start_index()
+        if self.modo == 'sin_conteo':
+            return self.desplazamiento + 1
+        return None
+
+    def get_paginated_response(self, data):
+        if self.modo == 'numerada':
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.siguiente),
+            ('previous', self.anterior),
+            ('results', data)
+        ]))
+
+    def _paginar_sin_conteo(self, queryset, request):
+        try:
+            numero = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            numero = 1
+        numero = max(numero, 1)
+        tamanio = self.get_page_size(request)
+        self.desplazamiento = (numero - 1) * tamanio
+
+        filas = list(queryset[self.desplazamiento:self.desplazamiento + tamanio + 1])
+        url = request.build_absolute_uri()
+        self.siguiente = replace_query_param(url, self.page_query_param, numero + 1) if len(filas) > tamanio else None
+        self.anterior = None
+        if numero > 1:
+            self.anterior = (
+                replace_query_param(url, self.page_query_param, numero - 1) if numero > 2
+                else remove_query_param(url, self.page_query_param)
+            )
+        return filas[:tamanio]
+
+    # --- Paginación por clave -------------------------------------------------
+
+    @staticmethod
+    def _admite_cursor(queryset):
+        """
+        Solo querysets de instancias sin agregados: reordenar un values()
+        agrupado por `orden_cursor` cambiaría su GROUP BY.
+        """
+        query = getattr(queryset, 'query', None)
+        if query is None or queryset._iterable_class is not ModelIterable:
+            return False
+        if query.group_by is not None:
+            return False
+        return not any(
+            getattr(anotacion, 'contains_aggregate', False)
+            for anotacion in query.annotations.values()
+        )
+
+    @staticmethod
+    def _valor(fila, campo):
+        if isinstance(fila, dict):
+            return fila[campo] if campo in fila else fila[f'{campo}_id']
+        return getattr(fila, fila._meta.get_field(campo).attname)
+
+    @staticmethod
+    def _campos(orden):
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+
+    @staticmethod
+    def _codificar(valores):
+        def serializar(valor):
+            if isinstance(valor, (date, datetime)):
+                return valor.isoformat()
+            if isinstance(valor, Decimal):
+                return str(valor)
+            return valor
+        contenido = json.dumps([serializar(valor) for valor in valores])
+        return base64.urlsafe_b64encode(contenido.encode()).decode()
+
+    def _decodificar(self, cursor, cantidad):
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound('Cursor inválido')
+        if not isinstance(valores, list) or len(valores) != cantidad:
+            raise NotFound('Cursor inválido')
+        return valores
+
+    def _paginar_cursor(self, queryset, request, orden):
+        campos = self._campos(orden)
+        queryset = queryset.order_by(*orden)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            valores = self._decodificar(cursor, len(campos))
+            # (a, b) > (x, y) expandido: a > x  o  (a = x y b > y), según dirección
+            filtro = Q()
+            for i, (campo, descendente) in enumerate(campos):
+                condicion = Q(**{f'{campo}__{"lt" if descendente else "gt"}': valores[i]})
+                for j in range(i):
+                    condicion &= Q(**{campos[j][0]: valores[j]})
+                filtro |= condicion
+            queryset = queryset.filter(filtro)
+
+        tamanio = self.get_page_size(request)
+        filas = list(queryset[:tamanio + 1])
+        pagina = filas[:tamanio]
+
+        url = request.build_absolute_uri()
+        self.anterior = None
+        self.siguiente = None
+        if len(filas) > tamanio:
+            valores = [self._valor(pagina[-1], campo) for campo, _ in campos]
+            self.siguiente = replace_query_param(url, self.cursor_query_param, self._codificar(valores))
+        return pagina
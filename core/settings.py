@@ -50,6 +50,7 @@ LOCAL_APPS = [
     'apps.attendance',
     'apps.participation',
     'apps.predictions',  # ✅ Nueva app
+    'apps.search',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -134,12 +135,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.JWTAutenticacionIdentidad',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.PaginacionFlexible',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -163,6 +164,21 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.authentication.serializers.TokenRefreshIdentidadSerializer',
+}
+
+# Caché (memoria local por defecto). La autenticación JWT cachea la versión de
+# las claims y el User de cada token, y las señales solo pueden invalidar la
+# caché del proceso que hizo el cambio. Con la caché local la versión se lee
+# siempre de la base (una consulta por solicitud) y el User se cachea 5 s; en
+# producción con varios workers conviene un backend compartido, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache y
+# CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='aula-inteligente'),
+    }
 }
 
 # CORS settings